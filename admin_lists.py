@@ -0,0 +1,231 @@
+import base64
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import archive
+
+# Keyset-paginated, filterable admin listings of bookings and food orders.
+# Pages continue from the last row seen (an opaque cursor) instead of using
+# OFFSET, so page N costs the same as page 1. Exports walk the same pages,
+# so memory stays flat however large the tables grow. Every page is read
+# from the live and the archive tables alike and the two are merged.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+EXPORT_BATCH = 1000
+
+BOOKING_COLUMNS = ['id', 'name', 'email', 'phone', 'date', 'time', 'guests', 'table_no',
+                   'category', 'subcategory', 'status', 'total_amount']
+
+FOOD_ORDER_COLUMNS = ['id', 'booking_id', 'customer_name', 'customer_email', 'table_no',
+                      'item_name', 'item_price', 'quantity', 'food_paid', 'created_at']
+
+
+class BadFilter(ValueError):
+    pass
+
+
+# --- cursors ---
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise BadFilter("invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise BadFilter("invalid cursor")
+    return values
+
+
+# --- filters ---
+def _parse_date(value, name):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise BadFilter(f"{name} must be YYYY-MM-DD")
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except ValueError:
+        raise BadFilter(f"{name} must be a number")
+
+
+def page_size(args):
+    limit = args.get('limit')
+    if not limit:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(_parse_int(limit, 'limit'), MAX_PAGE_SIZE))
+
+
+def _booking_filters(args):
+    clauses, params = [], []
+    if args.get('date_from'):
+        clauses.append("date >= %s")
+        params.append(_parse_date(args['date_from'], 'date_from').isoformat())
+    if args.get('date_to'):
+        clauses.append("date <= %s")
+        params.append(_parse_date(args['date_to'], 'date_to').isoformat())
+    if args.get('status'):
+        clauses.append("status = %s")
+        params.append(args['status'])
+    if args.get('category'):
+        clauses.append("category = %s")
+        params.append(args['category'])
+    if args.get('table'):
+        clauses.append("table_no = %s")
+        params.append(_parse_int(args['table'], 'table'))
+    return clauses, params
+
+
+def _food_order_filters(args, tier=archive.LIVE):
+    clauses, params = [], []
+    if args.get('date_from'):
+        clauses.append("f.created_at >= %s")
+        params.append(_parse_date(args['date_from'], 'date_from').isoformat())
+    if args.get('date_to'):
+        day_after = _parse_date(args['date_to'], 'date_to') + timedelta(days=1)
+        clauses.append("f.created_at < %s")
+        params.append(day_after.isoformat())
+    if args.get('paid') in ('0', '1'):
+        clauses.append("f.food_paid = %s")
+        params.append(int(args['paid']))
+    # Booking filters go in a correlated EXISTS rather than on the joined b:
+    # with b.status etc. in the WHERE the planner drives from bookings and
+    # sorts every match, instead of walking food_orders newest first and
+    # stopping at LIMIT.
+    booking_clauses, booking_params = [], []
+    if args.get('status'):
+        booking_clauses.append("fb.status = %s")
+        booking_params.append(args['status'])
+    if args.get('category'):
+        booking_clauses.append("fb.category = %s")
+        booking_params.append(args['category'])
+    if args.get('table'):
+        booking_clauses.append("fb.table_no = %s")
+        booking_params.append(_parse_int(args['table'], 'table'))
+    if booking_clauses:
+        clauses.append(f"EXISTS (SELECT 1 FROM {tier.bookings} fb WHERE fb.id = f.booking_id AND "
+                       + " AND ".join(booking_clauses) + ")")
+        params += booking_params
+    return clauses, params
+
+
+def check_filters(args):
+    """Raise BadFilter for malformed filter values."""
+    _booking_filters(args)
+    _food_order_filters(args)
+
+
+def _where(clauses):
+    return ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+
+def plain_row(row):
+    """Make a DB row JSON/CSV friendly."""
+    out = {}
+    for key, value in row.items():
+        if isinstance(value, (date, datetime)):
+            value = value.isoformat()
+        elif isinstance(value, Decimal):
+            value = float(value)
+        out[key] = value
+    return out
+
+
+# --- pages ---
+def fetch_bookings(conn, args, limit, cursor_token=None):
+    """Return (rows, next_cursor) ordered newest date first."""
+    clauses, params = _booking_filters(args)
+    if cursor_token:
+        last_date, last_id = decode_cursor(cursor_token, 2)
+        clauses.append("(date < %s OR (date = %s AND id < %s))")
+        params += [last_date, last_date, last_id]
+    cursor = conn.cursor(dictionary=True)
+    try:
+        pages = []
+        for tier in archive.TIERS:
+            cursor.execute(f"""
+                SELECT {', '.join(BOOKING_COLUMNS)}
+                FROM {tier.bookings}
+                {_where(clauses)}
+                ORDER BY date DESC, id DESC
+                LIMIT %s
+            """, tuple(params) + (limit + 1,))
+            pages.append([plain_row(r) for r in cursor.fetchall()])
+    finally:
+        cursor.close()
+    rows = archive.merge_newest(pages, lambda row: (row['date'], row['id']), limit)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['date'], rows[-1]['id']])
+    return rows, next_cursor
+
+
+def fetch_food_orders(conn, args, limit, cursor_token=None):
+    """Return (rows, next_cursor) ordered newest order first."""
+    last_id = decode_cursor(cursor_token, 1)[0] if cursor_token else None
+    cursor = conn.cursor(dictionary=True)
+    try:
+        pages = []
+        for tier in archive.TIERS:
+            clauses, params = _food_order_filters(args, tier)
+            if last_id is not None:
+                clauses.append("f.id < %s")
+                params.append(last_id)
+            cursor.execute(f"""
+                SELECT f.id, f.booking_id, b.name AS customer_name, b.email AS customer_email,
+                       b.table_no, f.item_name, f.item_price, f.quantity, f.food_paid, f.created_at
+                FROM {tier.food_orders} f
+                JOIN {tier.bookings} b ON f.booking_id = b.id
+                {_where(clauses)}
+                ORDER BY f.id DESC
+                LIMIT %s
+            """, tuple(params) + (limit + 1,))
+            pages.append([plain_row(r) for r in cursor.fetchall()])
+    finally:
+        cursor.close()
+    rows = archive.merge_newest(pages, lambda row: row['id'], limit)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1]['id']])
+    return rows, next_cursor
+
+
+# --- exports ---
+def iter_all(fetch, conn, args, batch=EXPORT_BATCH):
+    """Yield every matching row, one keyset page at a time."""
+    token = None
+    while True:
+        rows, token = fetch(conn, args, batch, token)
+        yield from rows
+        if token is None:
+            return
+
+
+def csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row) + "\n"
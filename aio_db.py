@@ -0,0 +1,180 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import config
+from db import PoolTimeout
+
+# Async counterpart of db.py for the ASGI routes in asgi.py: a bounded pool
+# of aiomysql (or aiosqlite) connections. The same MySQL-style SQL (%s
+# placeholders, NOW()) runs on both backends.
+#
+# Optional dependencies: pip install -r requirements-async.txt
+
+
+class _AsyncMySQL:
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def _run(self, sql, params, many=False):
+        import aiomysql
+        async with self._conn.cursor(aiomysql.DictCursor) as cursor:
+            if many:
+                await cursor.executemany(sql, params)
+            else:
+                await cursor.execute(sql, params)
+            return cursor, await cursor.fetchall() if cursor.description else []
+
+    async def fetchall(self, sql, params=()):
+        _, rows = await self._run(sql, params)
+        return list(rows)
+
+    async def execute(self, sql, params=()):
+        cursor, _ = await self._run(sql, params)
+        return cursor.lastrowid
+
+    async def executemany(self, sql, seq_of_params):
+        await self._run(sql, seq_of_params, many=True)
+
+    async def commit(self):
+        await self._conn.commit()
+
+    async def rollback(self):
+        await self._conn.rollback()
+
+    async def close(self):
+        self._conn.close()
+
+
+class _AsyncSQLite:
+    def __init__(self, conn):
+        self._conn = conn
+
+    async def fetchall(self, sql, params=()):
+        async with self._conn.execute(sql.replace('%s', '?'), params) as cursor:
+            rows = await cursor.fetchall()
+            if not cursor.description:
+                return []
+            columns = [c[0] for c in cursor.description]
+        return [dict(zip(columns, row)) for row in rows]
+
+    async def execute(self, sql, params=()):
+        async with self._conn.execute(sql.replace('%s', '?'), params) as cursor:
+            return cursor.lastrowid
+
+    async def executemany(self, sql, seq_of_params):
+        await self._conn.executemany(sql.replace('%s', '?'), seq_of_params)
+
+    async def commit(self):
+        await self._conn.commit()
+
+    async def rollback(self):
+        await self._conn.rollback()
+
+    async def close(self):
+        await self._conn.close()
+
+
+async def _connect():
+    if config.DB_BACKEND == 'sqlite':
+        import aiosqlite
+        conn = await aiosqlite.connect(config.SQLITE_PATH, timeout=config.DB_POOL_TIMEOUT)
+        await conn.create_function(
+            "NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA foreign_keys=ON")
+        return _AsyncSQLite(conn)
+
+    import aiomysql
+    conn = await aiomysql.connect(
+        host=config.DB_HOST,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        db=config.DB_NAME,
+        autocommit=False,
+    )
+    return _AsyncMySQL(conn)
+
+
+class AsyncPool:
+    def __init__(self, size=None, timeout=None):
+        self.size = size or config.AIO_POOL_SIZE
+        self.timeout = config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self._idle = asyncio.LifoQueue()
+        self._created = 0
+        self._in_use = 0
+        self._stats = {'checkouts': 0, 'waits': 0, 'timeouts': 0,
+                       'total_wait_ms': 0.0, 'max_wait_ms': 0.0}
+
+    async def _checkout(self):
+        if self._idle.empty() and self._created < self.size:
+            self._created += 1
+            try:
+                return await _connect(), False
+            except Exception:
+                self._created -= 1
+                raise
+        waited = self._idle.empty()
+        try:
+            conn = await asyncio.wait_for(self._idle.get(), self.timeout)
+        except asyncio.TimeoutError:
+            self._stats['timeouts'] += 1
+            raise PoolTimeout(f"no DB connection available after {self.timeout}s "
+                              f"(async pool size {self.size})")
+        if conn is None:
+            # Slot freed by a discarded connection: open a replacement
+            try:
+                conn = await _connect()
+            except Exception:
+                self._idle.put_nowait(None)
+                raise
+        return conn, waited
+
+    @asynccontextmanager
+    async def acquire(self):
+        start = time.perf_counter()
+        conn, waited = await self._checkout()
+        wait_ms = (time.perf_counter() - start) * 1000
+        self._in_use += 1
+        self._stats['checkouts'] += 1
+        self._stats['waits'] += waited
+        self._stats['total_wait_ms'] += wait_ms
+        self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+        try:
+            yield conn
+        finally:
+            self._in_use -= 1
+            try:
+                # Never hand a half-finished transaction to the next request.
+                await conn.rollback()
+            except Exception:
+                self._idle.put_nowait(None)
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+            else:
+                self._idle.put_nowait(conn)
+
+    async def close(self):
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            if conn is not None:
+                await conn.close()
+            self._created -= 1
+
+    def stats(self):
+        data = dict(self._stats)
+        checkouts = data['checkouts'] or 1
+        data.update({
+            'size': self.size,
+            'created': self._created,
+            'in_use': self._in_use,
+            'idle': self._idle.qsize(),
+            'avg_wait_ms': round(data['total_wait_ms'] / checkouts, 3),
+            'total_wait_ms': round(data['total_wait_ms'], 3),
+            'max_wait_ms': round(data['max_wait_ms'], 3),
+        })
+        return data
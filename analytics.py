@@ -0,0 +1,342 @@
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process may refresh at a time
+    fcntl = None
+
+import archive
+import config
+from reservations import now
+
+# Admin analytics over a columnar copy of the bookings and food orders.
+#
+# refresh() extracts rows past a high-water mark on id and appends them to
+# one flat binary file per column under ANALYTICS_DIR (strings such as item
+# names are stored as codes into a dictionary). Reports memory-map the
+# columns and aggregate them with NumPy, so they never touch the database.
+# meta.json (row counts, high-water marks, dictionaries) is replaced last:
+# readers in every worker see either the old or the new cube, and a refresh
+# cut short is rolled back by truncating to the recorded row counts.
+#
+# Only settled rows are copied: paid bookings, and paid food lines of
+# bookings dated before today, when the cart can no longer change. Rows past
+# the mark that are not settled yet (a hold, a cart still open) are kept in
+# a short deferred list and re-read by id on later refreshes.
+#
+# Rows are read from the live and the archive tables (see archive.py), so a
+# cube rebuilt after old bookings were archived still has all of them.
+
+FACTS = {
+    'bookings': (('id', 'i8'), ('day', 'i4'), ('slot', 'i2'), ('table_no', 'i2'),
+                 ('guests', 'i2'), ('category', 'i2'), ('amount', 'f8')),
+    'sales': (('id', 'i8'), ('booking_id', 'i8'), ('day', 'i4'), ('slot', 'i2'),
+              ('table_no', 'i2'), ('item', 'i4'), ('quantity', 'i4'), ('revenue', 'f8')),
+}
+
+EXTRACT = {
+    'bookings': """
+        SELECT id, date, time, table_no, guests, category, status, hold_expires_at, total_amount
+        FROM {tier.bookings} WHERE {where}
+    """,
+    'sales': """
+        SELECT f.id, f.booking_id, b.date, b.time, b.table_no, f.item_name, f.item_price,
+               f.quantity, f.food_paid
+        FROM {tier.food_orders} f JOIN {tier.bookings} b ON b.id = f.booking_id
+        WHERE {where}
+    """,
+}
+ID_COLUMN = {'bookings': 'id', 'sales': 'f.id'}
+
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+BUCKETS = ('day', 'week', 'month')
+META = 'meta.json'
+
+
+class BadReport(ValueError):
+    pass
+
+
+def _day(value):
+    """Days since 1970-01-01 of a DATE column value."""
+    return (date.fromisoformat(str(value)[:10]) - date(1970, 1, 1)).days
+
+
+def _iso(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+def parse_day(value, name):
+    if not value:
+        return None
+    try:
+        return _day(datetime.strptime(value, "%Y-%m-%d").date())
+    except ValueError:
+        raise BadReport(f"{name} must be YYYY-MM-DD")
+
+
+# --- Extraction ---
+def _settle(fact, row, today, current):
+    """(settled, keep): settled rows never change again; kept ones are copied."""
+    if fact == 'bookings':
+        if row['status'] == 'pending':
+            # An expired hold is about to be purged; a live one may still be paid
+            expired = row['hold_expires_at'] is not None and str(row['hold_expires_at']) < current
+            return expired, False
+        return True, row['status'] == 'paid'
+    return _day(row['date']) < today, bool(row['food_paid'])
+
+
+class _Dictionary:
+    def __init__(self, values):
+        self.values = list(values)
+        self._codes = {v: i for i, v in enumerate(self.values)}
+
+    def code(self, value):
+        value = '' if value is None else str(value)
+        if value not in self._codes:
+            self._codes[value] = len(self.values)
+            self.values.append(value)
+        return self._codes[value]
+
+
+def _encode(fact, rows, dicts):
+    slot, category, item = dicts['slot'], dicts['category'], dicts['item']
+    if fact == 'bookings':
+        values = [(r['id'], _day(r['date']), slot.code(r['time']), r['table_no'], r['guests'],
+                   category.code(r['category']), float(r['total_amount'] or 0)) for r in rows]
+    else:
+        values = [(r['id'], r['booking_id'], _day(r['date']), slot.code(r['time']), r['table_no'],
+                   item.code(r['item_name']), r['quantity'],
+                   float(r['item_price']) * r['quantity']) for r in rows]
+    columns = list(zip(*values)) if values else [()] * len(FACTS[fact])
+    return {name: np.asarray(column, dtype=dtype)
+            for (name, dtype), column in zip(FACTS[fact], columns)}
+
+
+class Cube:
+    def __init__(self, directory=None, chunk=None, refresh_interval=None):
+        self.directory = directory or config.ANALYTICS_DIR
+        self.chunk = chunk or config.ANALYTICS_CHUNK
+        self.refresh_interval = (config.ANALYTICS_REFRESH if refresh_interval is None
+                                 else refresh_interval)
+        self._lock = threading.Lock()
+        self._refreshed_at = None
+        self._loaded = None  # (meta mtime, meta, {fact: {column: array}})
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._path(META)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'rows': dict.fromkeys(FACTS, 0), 'hwm': dict.fromkeys(FACTS, 0),
+                    'deferred': {fact: [] for fact in FACTS},
+                    'dicts': {'slot': [], 'category': [], 'item': []}}
+
+    # --- refresh ---
+    def refresh(self, conn):
+        """Copy newly settled rows; return the number appended per fact, or
+        None if another process is refreshing right now."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, open(self._path('refresh.lock'), 'a') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return None
+            meta = self._read_meta()
+            dicts = {name: _Dictionary(values) for name, values in meta['dicts'].items()}
+            today, current = _day(date.today()), now()
+            appended = {}
+            cursor = conn.cursor(dictionary=True)
+            try:
+                for fact in FACTS:
+                    appended[fact], deferred = 0, []
+                    for rows in self._extract(cursor, fact, meta):
+                        keep = []
+                        for row in rows:
+                            settled, wanted = _settle(fact, row, today, current)
+                            if not settled:
+                                deferred.append(row['id'])
+                            elif wanted:
+                                keep.append(row)
+                        self._append(fact, meta['rows'][fact], _encode(fact, keep, dicts))
+                        meta['rows'][fact] += len(keep)
+                        appended[fact] += len(keep)
+                    meta['deferred'][fact] = deferred
+            finally:
+                cursor.close()
+            meta['dicts'] = {name: d.values for name, d in dicts.items()}
+            meta['refreshed_at'] = datetime.now().isoformat(timespec='seconds')
+            tmp = self._path(f"{META}.{os.getpid()}.tmp")
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, self._path(META))
+            self._refreshed_at = time.monotonic()
+            return appended
+
+    def _read(self, cursor, fact, where, params, limit=None):
+        """Rows of both tiers in id order, live first (see archive.merge_newest)."""
+        rows = {}
+        for tier in archive.TIERS:
+            cursor.execute(EXTRACT[fact].format(tier=tier, where=where), params)
+            for row in cursor.fetchall():
+                rows.setdefault(row['id'], row)
+        return [rows[i] for i in sorted(rows)[:limit]]
+
+    def _extract(self, cursor, fact, meta):
+        """Batches of rows: deferred ones by id, then those past the high-water mark."""
+        id_column = ID_COLUMN[fact]
+        deferred = meta['deferred'][fact]
+        for i in range(0, len(deferred), 500):
+            ids = deferred[i:i + 500]
+            yield self._read(cursor, fact, f"{id_column} IN ({', '.join(['%s'] * len(ids))})",
+                             tuple(ids))
+        while True:
+            # Each tier returns at most chunk rows past the mark, so the
+            # first chunk of the two together are the next chunk overall
+            rows = self._read(cursor, fact, f"{id_column} > %s ORDER BY {id_column} LIMIT %s",
+                              (meta['hwm'][fact], self.chunk), self.chunk)
+            if rows:
+                meta['hwm'][fact] = rows[-1]['id']
+            yield rows
+            if len(rows) < self.chunk:
+                return
+
+    def _append(self, fact, rows, columns):
+        for name, dtype in FACTS[fact]:
+            with open(self._path(f"{fact}.{name}.bin"), 'ab') as f:
+                # Drop whatever an interrupted refresh wrote past the last meta
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                columns[name].tofile(f)
+
+    def refresh_if_stale(self, get_conn):
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self.refresh(get_conn())
+
+    # --- reading ---
+    def _columns(self):
+        """(meta, {fact: {column: read-only array}}), re-mapped when meta changes."""
+        try:
+            mtime = os.stat(self._path(META)).st_mtime_ns
+        except OSError:
+            return self._read_meta(), {fact: {name: np.zeros(0, dtype) for name, dtype in columns}
+                                       for fact, columns in FACTS.items()}
+        loaded = self._loaded
+        if loaded is None or loaded[0] != mtime:
+            meta = self._read_meta()
+            data = {}
+            for fact, columns in FACTS.items():
+                rows = meta['rows'][fact]
+                data[fact] = {name: np.memmap(self._path(f"{fact}.{name}.bin"), dtype=dtype,
+                                              mode='r', shape=(rows,))
+                              if rows else np.zeros(0, dtype) for name, dtype in columns}
+            loaded = self._loaded = (mtime, meta, data)
+        return loaded[1], loaded[2]
+
+    def _window(self, columns, date_from, date_to):
+        if date_from is None and date_to is None:
+            return columns
+        day = columns['day']
+        mask = np.ones(len(day), dtype=bool)
+        if date_from is not None:
+            mask &= day >= date_from
+        if date_to is not None:
+            mask &= day <= date_to
+        return {name: column[mask] for name, column in columns.items()}
+
+    def status(self):
+        meta, _ = self._columns()
+        return {'rows': meta['rows'], 'refreshed_at': meta.get('refreshed_at'),
+                'pending': {fact: len(ids) for fact, ids in meta['deferred'].items()}}
+
+    # --- reports ---
+    def utilisation(self, tables, date_from=None, date_to=None):
+        """Share of table-slots booked, by weekday and slot."""
+        meta, data = self._columns()
+        b = self._window(data['bookings'], date_from, date_to)
+        slots = meta['dicts']['slot']
+        counts = np.bincount((b['day'] + 3) % 7 * len(slots) + b['slot'],
+                             minlength=7 * len(slots)).reshape(7, len(slots))
+        if len(b['day']):
+            first = date_from if date_from is not None else int(b['day'].min())
+            last = date_to if date_to is not None else int(b['day'].max())
+            days = np.bincount((np.arange(first, last + 1) + 3) % 7, minlength=7)
+        else:
+            first = last = None
+            days = np.zeros(7, dtype=int)
+        share = counts / np.maximum(days * tables, 1)[:, None]
+        return {'from': _iso(first) if first is not None else None,
+                'to': _iso(last) if last is not None else None,
+                'weekdays': WEEKDAYS, 'slots': slots, 'days': days.tolist(),
+                'bookings': counts.tolist(), 'utilisation': np.round(share, 4).tolist()}
+
+    def item_sales(self, bucket='day', date_from=None, date_to=None, items=None):
+        """Quantity and revenue per item per day, week (from Monday) or month."""
+        if bucket not in BUCKETS:
+            raise BadReport(f"bucket must be one of {', '.join(BUCKETS)}")
+        meta, data = self._columns()
+        s = self._window(data['sales'], date_from, date_to)
+        names = meta['dicts']['item']
+        if items:
+            wanted = [names.index(name) for name in items if name in names]
+            keep = np.isin(s['item'], wanted)
+            s = {name: column[keep] for name, column in s.items()}
+        if bucket == 'day':
+            period = s['day'].astype(np.int64)
+        elif bucket == 'week':
+            period = (s['day'].astype(np.int64) + 3) // 7
+        else:
+            period = s['day'].astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+        if not len(period):
+            return {'bucket': bucket, 'periods': [], 'items': {}}
+        start = int(period.min())
+        periods = int(period.max()) - start + 1
+        key = (period - start) * len(names) + s['item']
+        size = periods * len(names)
+        quantity = np.bincount(key, weights=s['quantity'], minlength=size).reshape(periods, len(names))
+        revenue = np.bincount(key, weights=s['revenue'], minlength=size).reshape(periods, len(names))
+        if bucket == 'day':
+            labels = [_iso(start + p) for p in range(periods)]
+        elif bucket == 'week':
+            labels = [_iso((start + p) * 7 - 3) for p in range(periods)]
+        else:
+            labels = [str(np.datetime64(start + p, 'M')) for p in range(periods)]
+        sold = np.flatnonzero(quantity.sum(axis=0))
+        return {'bucket': bucket, 'periods': labels,
+                'items': {names[i]: {'quantity': quantity[:, i].astype(int).tolist(),
+                                     'revenue': np.round(revenue[:, i], 2).tolist()}
+                          for i in sold}}
+
+    def table_revenue(self, date_from=None, date_to=None):
+        """Bookings, table revenue and food revenue per table."""
+        _, data = self._columns()
+        b = self._window(data['bookings'], date_from, date_to)
+        s = self._window(data['sales'], date_from, date_to)
+        size = int(max(b['table_no'].max(initial=0), s['table_no'].max(initial=0))) + 1
+        bookings = np.bincount(b['table_no'], minlength=size)
+        booking_revenue = np.bincount(b['table_no'], weights=b['amount'], minlength=size)
+        food_revenue = np.bincount(s['table_no'], weights=s['revenue'], minlength=size)
+        return {'tables': [{'table_no': t, 'bookings': int(bookings[t]),
+                            'booking_revenue': round(float(booking_revenue[t]), 2),
+                            'food_revenue': round(float(food_revenue[t]), 2),
+                            'revenue': round(float(booking_revenue[t] + food_revenue[t]), 2)}
+                           for t in np.flatnonzero(bookings + (food_revenue > 0)).tolist()]}
+
+    def guest_counts(self, date_from=None, date_to=None):
+        """How many bookings came with each party size."""
+        _, data = self._columns()
+        guests = self._window(data['bookings'], date_from, date_to)['guests']
+        counts = np.bincount(guests, minlength=1)
+        return {'bookings': int(len(guests)),
+                'mean': round(float(guests.mean()), 2) if len(guests) else None,
+                'distribution': {int(g): int(counts[g]) for g in np.flatnonzero(counts)}}
@@ -1,31 +1,111 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
-import qrcode
-from io import BytesIO
-import base64
-import mysql.connector
+from flask import (Flask, Response, render_template, request, redirect, url_for, session,
+                   jsonify, stream_with_context)
+from werkzeug.middleware.proxy_fix import ProxyFix
+from itsdangerous import BadSignature, URLSafeSerializer
+from markupsafe import Markup
+import click
+import logging
+import math
 import re
-
-def generate_qr_base64(data):
-    qr = qrcode.QRCode(box_size=8, border=2)
-    qr.add_data(data)
-    qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white")
-    buffer = BytesIO()
-    img.save(buffer, format="PNG")
-    return "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode()
+from collections import Counter
+
+import db
+from db import get_db
+from events import EventBus, TooManyListeners
+from availability import AvailabilityIndex
+from coherence import CacheBus
+from floor import FloorPlan
+import reservations
+from rollups import DashboardRollups
+import admin_lists
+import analytics
+import archive
+import assets
+from page_cache import RenderCache, cached_page
+from qr_cache import QRCache, etag_for
+import config
+import cart
+from catalog import CatalogStore
+import history
+import profiles
+import sessions
+import instrumentation
+from passwords import HasherBusy, PasswordHasher
+from ratelimit import RateLimiter
+from write_queue import QueueFull, WriteQueue
 
 app = Flask(__name__)
 app.secret_key = "your_secret_key_here"
 
 # --- Database ---
-def get_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="Blackjk",
-        database="swiftcafe"
-    )
+# Connections come from a bounded pool (see db.py); conn.close() hands the
+# connection back and anything still checked out is returned at teardown.
+db.init_app(app)
+
+# --- Instrumentation ---
+# Request, query, template and QR timings, JSON logs and ?__profile=1 for
+# admins (see instrumentation.py); served below at /metrics.
+instrumentation.init_app(app)
+log = logging.getLogger('swiftcafe')
+
+# --- Static assets ---
+# Templates link fingerprinted, resized copies of static/ once
+# `flask --app app build-assets` has run (see assets.py); pages are gzipped.
+asset_manifest = assets.Manifest()
+app.jinja_env.globals.update(asset_url=asset_manifest.url, picture=asset_manifest.picture)
+app.after_request(assets.compress_response)
+
+@app.route('/assets/<path:filename>')
+def asset_file(filename):
+    return assets.send_asset(asset_manifest.build_dir, filename)
+
+# --- Page cache ---
+# Public pages, and the menu grid, rendered once per worker and version
+# (asset build, catalog); see page_cache.py.
+page_cache = RenderCache()
+fragment_cache = RenderCache()
+
+# --- Sessions ---
+# The cookie holds only a session id; the data is in SESSION_BACKEND (see
+# sessions.py). Profile details are read through user_profiles instead.
+session_store = sessions.make_store()
+app.session_interface = sessions.ServerSessionInterface(session_store)
+user_profiles = profiles.UserProfiles()
+
+def current_user():
+    """Profile of the logged-in user, or None."""
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    return user_profiles.get(user_id, lambda: profiles.load(get_db(), user_id))
+
+# Admin dashboard totals, updated by the write paths below
+rollups = DashboardRollups()
+
+# First page of each customer's /my_orders, dropped when their orders change
+recent_orders = history.RecentOrders()
+
+# Contact messages and feedback are spooled and inserted in the background
+writes = WriteQueue()
+
+# --- Cache coherence ---
+# Write paths update this worker's caches themselves and publish what went
+# stale to the others, which pick it up at the start of a request (see
+# coherence.py). Rendered pages carry the 'pages' version in their keys.
+cache_bus = CacheBus()
+cache_bus.subscribe('rollups', lambda key: rollups.invalidate())
+cache_bus.subscribe('recent_orders', lambda key: recent_orders.clear() if key is None
+                    else recent_orders.invalidate(int(key)))
+cache_bus.subscribe('profiles', lambda key: user_profiles.clear() if key is None
+                    else user_profiles.invalidate(int(key)))
+
+@app.before_request
+def poll_cache_bus():
+    cache_bus.poll_if_due(get_db)
+
+def _orders_changed(user_id):
+    """Invalidation of a customer's cached order history, if logged in."""
+    return [('recent_orders', user_id)] if user_id is not None else []
 
 # --- Validation helpers ---
 def is_valid_email(email):
@@ -43,6 +123,7 @@ def is_valid_phone(phone):
 
 # --- Routes ---
 @app.route('/')
+@cached_page(page_cache, lambda: (asset_manifest.version, cache_bus.version('pages')))
 def landing_page():
     return render_template('landing.html')
 
@@ -50,12 +131,67 @@ def landing_page():
 def home():
     if 'user_id' not in session or session.get('role') != 'customer':
         return redirect(url_for('login_page'))
-    return render_template('home.html', user_name=session.get('name'))
+    return render_template('home.html', user_name=(current_user() or {}).get('name'))
 
 @app.route('/about')
+@cached_page(page_cache, lambda: (asset_manifest.version, cache_bus.version('pages')))
 def about():
     return render_template('about.html')
 
+# --- Health check ---
+@app.route('/health')
+def health():
+    pool = db.get_pool()
+    try:
+        healthy = pool.health_check()
+    except Exception:
+        log.exception("DB health check failed")
+        healthy = False
+    status = 200 if healthy else 503
+    return jsonify({"status": "ok" if healthy else "error", "pool": pool.stats(),
+                    "write_queue": writes.stats()}), status
+
+# --- Metrics ---
+# Pool and cache state is read at scrape time; the objects are defined below.
+instrumentation.registry.derived(
+    'swiftcafe_db_pool', 'gauge', 'Connection pool state (cumulative counts included).',
+    ('stat',), lambda: [((k,), v) for k, v in db.get_pool().stats().items()])
+instrumentation.registry.derived(
+    'swiftcafe_cache_hits_total', 'counter', 'In-process cache hits.', ('cache',),
+    lambda: [(('qr',), qr_codes.stats()['hits']),
+             (('recent_orders',), recent_orders.stats()['hits']),
+             (('profiles',), user_profiles.stats()['hits']),
+             (('pages',), page_cache.stats()['hits']),
+             (('fragments',), fragment_cache.stats()['hits'])])
+instrumentation.registry.derived(
+    'swiftcafe_cache_misses_total', 'counter', 'In-process cache misses.', ('cache',),
+    lambda: [(('qr',), qr_codes.stats()['misses']),
+             (('recent_orders',), recent_orders.stats()['misses']),
+             (('profiles',), user_profiles.stats()['misses']),
+             (('pages',), page_cache.stats()['misses']),
+             (('fragments',), fragment_cache.stats()['misses'])])
+instrumentation.registry.derived(
+    'swiftcafe_cache_entries', 'gauge', 'In-process cache size.', ('cache',),
+    lambda: [(('qr',), qr_codes.stats()['entries']),
+             (('recent_orders',), recent_orders.stats()['users']),
+             (('profiles',), user_profiles.stats()['users']),
+             (('pages',), page_cache.stats()['entries']),
+             (('fragments',), fragment_cache.stats()['entries'])])
+instrumentation.registry.derived(
+    'swiftcafe_write_queue', 'gauge', 'Contact/feedback write queue (depth = rows not yet committed).',
+    ('stat',), lambda: [((k,), v) for k, v in writes.stats().items()])
+instrumentation.registry.derived(
+    'swiftcafe_cache_bus', 'gauge', 'Cache invalidations published and applied from other workers.',
+    ('stat',), lambda: [((k,), v) for k, v in cache_bus.stats().items()])
+
+@app.route('/metrics')
+def metrics():
+    if config.METRICS_TOKEN and \
+            request.headers.get('Authorization') != f"Bearer {config.METRICS_TOKEN}":
+        return "Forbidden", 403
+    return Response(instrumentation.registry.render(),
+                    mimetype='text/plain; version=0.0.4')
+
 #-----admin-----#
 @app.route('/admin')
 def admin_panel():
@@ -63,7 +199,7 @@ def admin_panel():
         return redirect(url_for('login_page'))
 
     data = {
-        'admin_name': session.get('name'),
+        'admin_name': (current_user() or {}).get('name'),
         'total_users': 0,
         'total_bookings': 0,
         'total_food_orders': 0,
@@ -73,62 +209,20 @@ def admin_panel():
 
     bookings = []
     food_orders = []
+    bookings_cursor = food_orders_cursor = None
 
     try:
+        # Counts, revenue and top foods come from the cached rollups
+        data.update(rollups.snapshot(get_db))
+
         conn = get_db()
         cursor = conn.cursor(dictionary=True)
 
-        # Total Registered Users
-        cursor.execute("SELECT COUNT(*) AS total_users FROM users WHERE role='customer'")
-        data['total_users'] = cursor.fetchone()['total_users']
-
-        # Total Bookings
-        cursor.execute("SELECT COUNT(*) AS total_bookings FROM bookings")
-        data['total_bookings'] = cursor.fetchone()['total_bookings']
-
-        # Total Booking Revenue
-        cursor.execute("SELECT IFNULL(SUM(total_amount),0) AS booking_revenue FROM bookings")
-        data['booking_revenue'] = cursor.fetchone()['booking_revenue']
-
-        # Total Food Orders
-        cursor.execute("SELECT COUNT(*) AS total_food_orders FROM food_orders")
-        data['total_food_orders'] = cursor.fetchone()['total_food_orders']
-
-        # Total Food Revenue
-        cursor.execute("SELECT IFNULL(SUM(item_price*quantity),0) AS food_revenue FROM food_orders WHERE food_paid=1")
-        data['food_revenue'] = cursor.fetchone()['food_revenue']
-
-         # Total Revenue (Bookings + Food)
-        data['total_revenue'] = data['booking_revenue'] + data['food_revenue']
-
-        # Fetch all bookings
-        cursor.execute("""
-            SELECT id, name, email, phone, date, time, guests, table_no, category, subcategory, status, total_amount
-            FROM bookings
-            ORDER BY date DESC, time DESC
-        """)
-        bookings = cursor.fetchall()
-
-        # Fetch all food orders with customer info
-        cursor.execute("""
-            SELECT f.id, f.booking_id, f.item_name, f.item_price, f.quantity, f.food_paid,
-                   b.name AS customer_name, b.email AS customer_email
-            FROM food_orders f
-            JOIN bookings b ON f.booking_id = b.id
-            ORDER BY f.created_at DESC
-        """)
-        food_orders = cursor.fetchall()
-        
-
-        # Top Ordered Foods
-        cursor.execute("""
-            SELECT item_name, SUM(quantity) AS total_quantity
-            FROM food_orders
-            GROUP BY item_name
-            ORDER BY total_quantity DESC
-            LIMIT 3
-        """)
-        data['top_foods'] = cursor.fetchall()
+        # First page of each list; the rest is fetched from the JSON APIs
+        bookings, bookings_cursor = admin_lists.fetch_bookings(
+            conn, {}, admin_lists.DEFAULT_PAGE_SIZE)
+        food_orders, food_orders_cursor = admin_lists.fetch_food_orders(
+            conn, {}, admin_lists.DEFAULT_PAGE_SIZE)
 
         # Latest Customer Feedbacks (limit 5)
         cursor.execute("""
@@ -139,8 +233,8 @@ def admin_panel():
         """)
         data['feedbacks'] = cursor.fetchall()
 
-    except Exception as e:
-        print("DB error:", e)
+    except Exception:
+        log.exception("Admin dashboard query failed")
 
     finally:
         if 'cursor' in locals():
@@ -151,9 +245,108 @@ def admin_panel():
     return render_template('admin.html',
                            data=data,
                            bookings=bookings,
-                           food_orders=food_orders)
-
-
+                           food_orders=food_orders,
+                           bookings_cursor=bookings_cursor,
+                           food_orders_cursor=food_orders_cursor)
+
+def _is_admin():
+    return 'user_id' in session and session.get('role') == 'admin'
+
+# --- Admin: paginated lists ---
+ADMIN_LISTS = {
+    'bookings': (admin_lists.fetch_bookings, admin_lists.BOOKING_COLUMNS),
+    'food_orders': (admin_lists.fetch_food_orders, admin_lists.FOOD_ORDER_COLUMNS),
+}
+
+@app.route('/api/admin/<kind>')
+def api_admin_list(kind):
+    if not _is_admin():
+        return jsonify({"success": False, "message": "Admin login required"}), 403
+    if kind not in ADMIN_LISTS:
+        return jsonify({"success": False, "message": "Unknown list"}), 404
+    fetch, _ = ADMIN_LISTS[kind]
+    try:
+        rows, next_cursor = fetch(get_db(), request.args,
+                                  admin_lists.page_size(request.args),
+                                  request.args.get('cursor'))
+    except admin_lists.BadFilter as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": True, kind: rows, "next_cursor": next_cursor})
+
+# --- Admin: streamed exports ---
+@app.route('/admin/export/<kind>.<fmt>')
+def admin_export(kind, fmt):
+    if not _is_admin():
+        return redirect(url_for('login_page'))
+    if kind not in ADMIN_LISTS or fmt not in ('csv', 'ndjson'):
+        return "Unknown export", 404
+    fetch, columns = ADMIN_LISTS[kind]
+    args = request.args.to_dict()
+    try:
+        # Validate up front; an error mid-stream can no longer change the status
+        admin_lists.check_filters(args)
+    except admin_lists.BadFilter as e:
+        return str(e), 400
+
+    rows = admin_lists.iter_all(fetch, get_db(), args)
+    if fmt == 'csv':
+        body, mimetype = admin_lists.csv_lines(rows, columns), 'text/csv'
+    else:
+        body, mimetype = admin_lists.ndjson_lines(rows), 'application/x-ndjson'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={kind}.{fmt}'})
+
+
+# --- Admin: analytics ---
+# Reports computed from a columnar copy of the bookings and food orders
+# (see analytics.py); the copy catches up at most every ANALYTICS_REFRESH.
+analytics_cube = analytics.Cube()
+
+ANALYTICS_REPORTS = {
+    'utilisation': lambda args, **window: analytics_cube.utilisation(len(ALL_TABLES), **window),
+    'item_sales': lambda args, **window: analytics_cube.item_sales(
+        args.get('bucket', 'day'), items=args.getlist('item'), **window),
+    'table_revenue': lambda args, **window: analytics_cube.table_revenue(**window),
+    'guests': lambda args, **window: analytics_cube.guest_counts(**window),
+}
+
+@app.route('/api/admin/analytics/<report>')
+def api_admin_analytics(report):
+    if not _is_admin():
+        return jsonify({"success": False, "message": "Admin login required"}), 403
+    if report not in ANALYTICS_REPORTS:
+        return jsonify({"success": False, "message": "Unknown report"}), 404
+    try:
+        window = {'date_from': analytics.parse_day(request.args.get('date_from'), 'date_from'),
+                  'date_to': analytics.parse_day(request.args.get('date_to'), 'date_to')}
+        analytics_cube.refresh_if_stale(get_db)
+        result = ANALYTICS_REPORTS[report](request.args, **window)
+    except analytics.BadReport as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": True, report: result, "cube": analytics_cube.status()})
+
+
+# --- Passwords & login limits ---
+# Hashes run in a process pool (see passwords.py); the limits are checked
+# before any hashing so brute-force traffic cannot use up the CPU.
+passwords = PasswordHasher()
+login_ip_limit = RateLimiter(config.LOGIN_IP_LIMIT, config.LOGIN_IP_WINDOW)
+login_account_limit = RateLimiter(config.LOGIN_ACCOUNT_LIMIT, config.LOGIN_ACCOUNT_WINDOW)
+auth_rejected = instrumentation.registry.counter(
+    'swiftcafe_auth_rejected_total', 'Register/login attempts refused before hashing.',
+    ('reason',))
+
+def _too_many_attempts(retry_after):
+    auth_rejected.inc('rate_limited')
+    response = jsonify({"success": False, "message": "Too many attempts, try again later"})
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response, 429
+
+def _hasher_busy():
+    auth_rejected.inc('busy')
+    response = jsonify({"success": False, "message": "Server busy, try again"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
 
 # --- Login & Register Pages ---
 @app.route('/register')
@@ -188,7 +381,13 @@ def api_register():
     if len(password) < 6:
         return jsonify({"success": False, "message": "Password too short"}), 400
 
-    hashed_password = generate_password_hash(password)
+    retry_after = login_ip_limit.hit(request.remote_addr)
+    if retry_after:
+        return _too_many_attempts(retry_after)
+    try:
+        hashed_password = passwords.hash(password)
+    except HasherBusy:
+        return _hasher_busy()
 
     try:
         conn = get_db()
@@ -198,7 +397,10 @@ def api_register():
             (username, full_name, email, role, hashed_password, phone)
         )
         conn.commit()
-    except mysql.connector.IntegrityError:
+        if role == 'customer':
+            rollups.add('total_users')
+            cache_bus.publish(conn, ('rollups', None))
+    except db.IntegrityError:
         return jsonify({"success": False, "message": "Username or Email already exists"}), 400
     except Exception as e:
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
@@ -220,10 +422,17 @@ def api_login():
     if not email or not password:
         return jsonify({"success": False, "message": "Email and password required"}), 400
 
+    retry_after = max(login_ip_limit.hit(request.remote_addr), login_account_limit.check(email))
+    if retry_after:
+        return _too_many_attempts(retry_after)
+
     try:
         conn = get_db()
         cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE email=%s", (email,))
+        # users.email is UNIQUE, so this is a single index lookup
+        cursor.execute(
+            "SELECT id, username, name, email, phone, role, password FROM users WHERE email=%s",
+            (email,))
         user = cursor.fetchone()
     except Exception as e:
         return jsonify({"success": False, "message": f"Server error: {str(e)}"}), 500
@@ -233,17 +442,39 @@ def api_login():
         if 'conn' in locals():
             conn.close()
 
-    if user and check_password_hash(user['password'], password):
+    # Unknown emails skip hashing; /api/register already reveals which exist
+    matches, new_hash = False, None
+    if user:
+        try:
+            matches, new_hash = passwords.verify(user['password'], password)
+        except HasherBusy:
+            return _hasher_busy()
+
+    if matches:
+        login_account_limit.reset(email)
+        if new_hash:
+            _rehash(user['id'], new_hash)
+        # Only ids go in the session; current_user() loads the profile
         session['user_id'] = user['id']
-        session['username'] = user['username']
-        session['name'] = user['name']
-        session['email'] = user['email']
-        session["phone"] = user["phone"]   # ✅ Added phone to session
         session['role'] = user['role']
+        session.regenerate()
         return jsonify({"success": True, "role": user['role']})
     else:
+        login_account_limit.hit(email)
         return jsonify({"success": False, "message": "Invalid email or password"}), 401
 
+def _rehash(user_id, new_hash):
+    """Store a hash made with the current PASSWORD_HASH_METHOD."""
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET password=%s WHERE id=%s", (new_hash, user_id))
+        conn.commit()
+        cursor.close()
+    except Exception:
+        # The old hash still works; try again at the next login
+        log.exception("Password rehash failed")
+
 # --- Logout ---
 @app.route('/logout')
 def logout():
@@ -265,18 +496,14 @@ def contact():
             error = "All fields are required!"
         else:
             try:
-                conn = get_db()
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO contact_messages (name, email, subject, message) VALUES (%s, %s, %s, %s)",
-                    (name, email, subject, message)
-                )
-                conn.commit()
-                cursor.close()
-                conn.close()
+                writes.submit('contact', {'name': name, 'email': email,
+                                          'subject': subject, 'message': message})
                 success = "Your message has been sent successfully!"
-            except Exception as e:
-                error = f"Error: {str(e)}"
+            except QueueFull:
+                error = "We're receiving a lot of messages right now. Please try again in a minute."
+            except Exception:
+                log.exception("Queueing contact message failed")
+                error = "Something went wrong. Try again."
 
     return render_template('contact.html', success=success, error=error)
 
@@ -291,18 +518,13 @@ def feedback():
             return render_template('feedback.html', error="All fields are required.")
 
         try:
-            conn = get_db()
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO feedbacks (name, email, message) VALUES (%s, %s, %s)",
-                (name, email, message)
-            )
-            conn.commit()
-            cursor.close()
-            conn.close()
+            writes.submit('feedback', {'name': name, 'email': email, 'message': message})
             return render_template('feedback.html', success="Thank you for your feedback!")
-        except Exception as e:
-            print("DB Error:", e)
+        except QueueFull:
+            return render_template('feedback.html', error="We're receiving a lot of feedback "
+                                   "right now. Please try again in a minute.")
+        except Exception:
+            log.exception("Queueing feedback failed")
             return render_template('feedback.html', error="Something went wrong. Try again.")
     
     return render_template('feedback.html')
@@ -310,36 +532,35 @@ def feedback():
 # ------------------- PROFILE PAGE -------------------
 @app.route("/profile")
 def profile():
-    if "user_id" not in session:
-        return redirect(url_for("login"))
-
-    # ✅ Getting user data directly from session
-    user = {
-        "name": session.get("name"),
-        "email": session.get("email"),
-        "phone": session.get("phone"),
-        "role": session.get("role"),
-        "username": session.get("username"),
-    }
+    user = current_user()
+    if user is None:
+        return redirect(url_for("login_page"))
     return render_template("profile.html", user=user)
 
 # Swiftcafe: Booking route with slots + table availability
-ALL_SLOTS = [
-    "10:00 AM - 12:00 PM",
-    "12:00 PM - 2:00 PM",
-    "2:00 PM - 4:00 PM",
-    "4:00 PM - 6:00 PM",
-    "6:00 PM - 8:00 PM",
-    "8:00 PM - 10:00 PM"
-]
+# Tables, seats and opening hours come from the floor model (floor.json)
+floor = FloorPlan.load().branch(config.FLOOR_BRANCH)
+ALL_SLOTS = list(floor.slots)
+ALL_TABLES = [table.no for table in floor.tables]
+TABLE_SEATS = floor.seats
+
+def _load_booked_tables(date):
+    cursor = get_db().cursor(dictionary=True)
+    cursor.execute(
+        "SELECT time, table_no FROM bookings WHERE date=%s AND " + reservations.OCCUPYING,
+        (date, reservations.now()))
+    rows = [(row['time'], row['table_no']) for row in cursor.fetchall()]
+    cursor.close()
+    return rows
 
-ALL_TABLES = [1, 2, 3, 4, 5]  # Example: 5 tables
+# Per-date slot x table occupancy, loaded on first use and kept current by
+# the booking write paths below. Slots the branch is closed are never free.
+availability = AvailabilityIndex(ALL_SLOTS, ALL_TABLES, loader=_load_booked_tables,
+                                 open_slots=floor.open_mask)
+cache_bus.subscribe('availability', availability.invalidate)
 
 @app.route('/booking', methods=['GET', 'POST'])
 def booking():
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-
     # Default available slots & tables
     available_slots = ALL_SLOTS[:]
     available_tables = ALL_TABLES[:]
@@ -350,35 +571,41 @@ def booking():
         phone = request.form['phone']
         date = request.form['date']
         time = request.form['time']
-        guests = request.form['guests']
         category = request.form['category']
         subcategory = request.form['subcategory']
-        table_no = int(request.form['table_no'])
-
-        # ✅ Double-check slot + table availability
-        cursor.execute("""
-            SELECT id FROM bookings 
-            WHERE date=%s AND time=%s AND table_no=%s
-        """, (date, time, table_no))
-        conflict = cursor.fetchone()
+        try:
+            guests = int(request.form['guests'])
+        except ValueError:
+            guests = 0
+        if guests < 1:
+            return "Please enter the number of guests."
+        if not floor.is_open(date, time):
+            return "Sorry, we are closed at that time. Please choose another slot."
+
+        # "auto" lets the floor model pick the smallest free table that fits
+        table_no = request.form.get('table_no', 'auto')
+        if table_no in ('', 'auto'):
+            tables = floor.allocate(guests, availability.taken(date, [time]), combine=False)
+            if tables is None:
+                return "Sorry, no free table seats that many guests at that time. Please choose another slot."
+            table_no = tables[0]
+        else:
+            table_no = int(table_no)
+            if TABLE_SEATS.get(table_no, 0) < guests:
+                return "Sorry, that table does not seat that many guests. Please choose another table."
 
-        if conflict:
-            cursor.close()
-            conn.close()
+        # ✅ The unique (date, time, table_no) key decides who gets the table
+        try:
+            booking_id = reservations.reserve_table(
+                get_db(), name, email, phone, date, time, guests, table_no,
+                category, subcategory, user_id=session.get('user_id'))
+        except reservations.SlotTaken:
+            availability.invalidate(date)
             return "Sorry, this table is already booked for the selected time. Please choose another slot."
 
-        # Insert booking
-        cursor.execute("""
-            INSERT INTO bookings 
-            (name, email, phone, date, time, guests, table_no, category, subcategory, status)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """, (name, email, phone, date, time, guests, table_no, category, subcategory, 'pending'))
-
-        booking_id = cursor.lastrowid
-        conn.commit()
-
-        cursor.close()
-        conn.close()
+        availability.mark_booked(date, time, table_no)
+        rollups.add('total_bookings')
+        cache_bus.publish(get_db(), ('availability', date), ('rollups', None))
 
         session['booking_id'] = booking_id
         session['customer_name'] = name
@@ -389,36 +616,152 @@ def booking():
     time = request.args.get("time")
 
     if date:
-        # Exclude slots already booked (all tables taken)
-        cursor.execute("""
-            SELECT time, COUNT(table_no) as booked_tables
-            FROM bookings
-            WHERE date=%s
-            GROUP BY time
-        """, (date,))
-        booked_data = cursor.fetchall()
-
-        # If all tables are booked for a slot → remove it
-        for row in booked_data:
-            if row['booked_tables'] >= len(ALL_TABLES):
-                if row['time'] in available_slots:
-                    available_slots.remove(row['time'])
+        # Slots where every table is already taken are dropped
+        available_slots = availability.free_slots(date)
 
     if date and time:
         # Exclude tables booked for selected slot
-        cursor.execute("""
-            SELECT table_no FROM bookings WHERE date=%s AND time=%s
-        """, (date, time))
-        booked_tables = [row['table_no'] for row in cursor.fetchall()]
-        available_tables = [t for t in ALL_TABLES if t not in booked_tables]
-
-    cursor.close()
-    conn.close()
-
-    return render_template('booking.html', slots=available_slots, tables=available_tables)
+        available_tables = availability.free_tables(date, time)
+
+    return render_template('booking.html', slots=available_slots, tables=available_tables,
+                           seats=TABLE_SEATS)
+
+@app.route('/api/availability')
+def api_availability():
+    date = request.args.get("date", "").strip()
+    time = request.args.get("time", "").strip()
+    if not date:
+        return jsonify({"success": False, "message": "date is required"}), 400
+
+    result = {"success": True, "date": date, "slots": availability.free_slots(date)}
+    if time:
+        result["time"] = time
+        result["tables"] = availability.free_tables(date, time)
+        result["seats"] = {str(t): TABLE_SEATS[t] for t in result["tables"]}
+        guests = request.args.get("guests", type=int)
+        if guests:
+            best = floor.allocate(guests, availability.taken(date, [time]), combine=False)
+            result["suggested"] = best[0] if best else None
+    return jsonify(result)
+
+# --- Party bookings ---
+# Several tables over consecutive slots, reserved together or not at all
+def _party_error(message, status=400):
+    return jsonify({"success": False, "message": message}), status
+
+@app.route('/api/party_bookings', methods=['POST'])
+def api_party_booking():
+    if 'user_id' not in session:
+        return _party_error("Login required", 401)
+    data = request.get_json(silent=True) or {}
+    name = str(data.get('name', '')).strip()
+    email = str(data.get('email', '')).strip()
+    phone = str(data.get('phone', '')).strip()
+    date = str(data.get('date', '')).strip()
+    first_slot = data.get('start_slot')
+    last_slot = data.get('end_slot', first_slot)
+    category = str(data.get('category', 'party')).strip()
+    subcategory = str(data.get('subcategory', '')).strip()
+
+    if not (name and is_valid_email(email) and is_valid_phone(phone)):
+        return _party_error("name, a valid email and a valid phone are required")
+    if not re.match(r'^\d{4}-\d{2}-\d{2}$', date):
+        return _party_error("date must be YYYY-MM-DD")
+    if first_slot not in ALL_SLOTS or last_slot not in ALL_SLOTS:
+        return _party_error("start_slot and end_slot must be booking slots")
+    start, end = ALL_SLOTS.index(first_slot), ALL_SLOTS.index(last_slot)
+    if end < start:
+        return _party_error("end_slot is before start_slot")
+    try:
+        guests = int(data.get('guests'))
+    except (TypeError, ValueError):
+        guests = 0
+    if guests < 1:
+        return _party_error("guests must be a positive number")
+    slots = ALL_SLOTS[start:end + 1]
+    if not all(floor.is_open(date, slot) for slot in slots):
+        return _party_error("We are closed for part of that time")
+
+    # The index may be a moment behind other workers: on a conflict, reload
+    # the date and try the next best tables once more. A table (or a set the
+    # floor model says can be pushed together) that fits is preferred over
+    # an arbitrary mix of free tables.
+    for attempt in range(2):
+        tables = floor.allocate(guests, availability.taken(date, slots)) or \
+            reservations.choose_tables(availability.free_tables_across(date, slots),
+                                       TABLE_SEATS, guests)
+        if tables is None:
+            return _party_error("Not enough free tables for that party and time", 409)
+        seated = reservations.seat_guests(tables, TABLE_SEATS, guests)
+        try:
+            party_id, booking_ids = reservations.reserve_party(
+                get_db(), name, email, phone, date, slots, seated, category, subcategory,
+                user_id=session['user_id'])
+            break
+        except reservations.SlotTaken:
+            availability.invalidate(date)
+    else:
+        return _party_error("Those tables were just taken. Please try again.", 409)
+
+    for slot in slots:
+        for table_no in tables:
+            availability.mark_booked(date, slot, table_no)
+    rollups.add('total_bookings', len(booking_ids))
+    cache_bus.publish(get_db(), ('availability', date), ('rollups', None))
+    return jsonify({"success": True, "party_id": party_id, "date": date, "slots": slots,
+                    "tables": [{"table_no": t, "guests": n} for t, n in seated.items()],
+                    "booking_ids": booking_ids,
+                    "hold_minutes": config.HOLD_MINUTES}), 201
+
+@app.route('/api/party_bookings/<party_id>/confirm', methods=['POST'])
+def api_party_confirm(party_id):
+    # Staff confirm once the party has paid
+    if not _is_admin():
+        return _party_error("Admin login required", 403)
+    confirmed = reservations.confirm_party(get_db(), party_id, TABLE_PRICE)
+    if confirmed is None:
+        return _party_error("No such party, or its hold expired", 404)
+    date, user_id, newly_paid = confirmed
+    rollups.add('booking_revenue', TABLE_PRICE * newly_paid)
+    availability.invalidate(date)
+    recent_orders.invalidate(user_id)
+    cache_bus.publish(get_db(), ('availability', date), ('rollups', None),
+                      *_orders_changed(user_id))
+    return jsonify({"success": True, "party_id": party_id})
 
 # ---------------- UPI Payment ----------------
 UPI_ID = "sakshiparab639@oksbi"  # Replace with your UPI ID
+TABLE_PRICE = 500  # Fixed table price, stored as bookings.total_amount
+
+# Rendered QR codes are cached by UPI URI; the booking QR is the same for
+# every customer, so it is only drawn once per worker.
+qr_codes = QRCache()
+
+def _qr_tokens():
+    return URLSafeSerializer(app.secret_key, salt='qr')
+
+def qr_link_for(upi_uri):
+    """Image src for a payment QR: a cacheable /qr URL, or an inline data URI."""
+    if config.QR_INLINE:
+        return qr_codes.data_uri(upi_uri)
+    return f"/qr/{_qr_tokens().dumps(upi_uri)}.png"
+
+@app.route('/qr/<token>.png')
+def qr_image(token):
+    try:
+        upi_uri = _qr_tokens().loads(token)
+    except BadSignature:
+        return "Not found", 404
+
+    etag = etag_for(upi_uri)
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(qr_codes.png(upi_uri), mimetype='image/png')
+    response.set_etag(etag)
+    # The token encodes the full URI, so its image never changes
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 
 # ---------------- Booking Payment ----------------
@@ -429,28 +772,94 @@ def booking_payment():
 
     booking_id = session['booking_id']
     customer_name = session.get('customer_name')
-    table_price = 500  # Fixed table price
-
-    upi_uri = f"upi://pay?pa={UPI_ID}&pn=Swift Cafe&am={table_price}&cu=INR"
-    qr_link = generate_qr_base64(upi_uri)
 
     if request.method == 'POST':
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE bookings SET status='paid' WHERE id=%s", (booking_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        confirmed = reservations.confirm_booking(get_db(), booking_id, TABLE_PRICE)
+        if confirmed is None:
+            # Hold expired and the table was given to someone else
+            session.pop('booking_id', None)
+            return render_template('booking.html', slots=ALL_SLOTS, tables=ALL_TABLES,
+                                   message="Your table hold expired before payment. Please book again.")
+        date, newly_paid = confirmed
+        if newly_paid:
+            rollups.add('booking_revenue', TABLE_PRICE)
+        availability.invalidate(date)
+        recent_orders.invalidate(session.get('user_id'))
+        cache_bus.publish(get_db(), ('availability', date), ('rollups', None),
+                          *_orders_changed(session.get('user_id')))
         return redirect(url_for('menu'))
 
+    upi_uri = f"upi://pay?pa={UPI_ID}&pn=Swift Cafe&am={TABLE_PRICE}&cu=INR"
+    qr_link = qr_link_for(upi_uri)
+
     return render_template('food_payment.html',  # Using universal template
                            payment_type='booking',
-                           total_price=table_price,
+                           total_price=TABLE_PRICE,
                            customer_name=customer_name,
                            qr_link=qr_link,
                            upi_uri=upi_uri)
 
 
+# ---------------- Cart ----------------
+# Menu items and prices, reloaded when menu_catalog.json changes
+menu_catalog = CatalogStore()
+# The grid is keyed by catalog version anyway; this drops the stale copy at once
+menu_catalog.on_change(lambda catalog: fragment_cache.invalidate('menu_grid'))
+
+def _record_cart_rollups(before, after):
+    # Only unpaid lines change here, so food revenue never does
+    rollups.add('total_food_orders', len(after) - len(before))
+    quantities = Counter()
+    for row in after:
+        quantities[row['item_name']] += row['quantity']
+    for row in before:
+        quantities[row['item_name']] -= row['quantity']
+    for name, delta in quantities.items():
+        if delta:
+            rollups.add_item(name, delta)
+
+def _apply_cart(booking_id, changes):
+    before, after = cart.apply_changes(get_db(), booking_id, changes, menu_catalog.current())
+    _record_cart_rollups(before, after)
+    recent_orders.invalidate(session.get('user_id'))
+    if after != before:
+        cache_bus.publish(get_db(), ('rollups', None), *_orders_changed(session.get('user_id')))
+        _publish_ticket(booking_id, after, 'cart')
+    return after
+
+def _cart_json(rows):
+    items = [{
+        'id': row['id'],
+        'item_name': row['item_name'],
+        'item_price': float(row['item_price']),
+        'quantity': row['quantity'],
+        'food_paid': bool(row['food_paid']),
+    } for row in rows]
+    summary = cart.summarize(rows)
+    return {"success": True, "cart": items, "total": summary['subtotal'],
+            "paid_total": summary['paid_total'],
+            "due": summary['due']}
+
+@app.route('/api/cart', methods=['GET', 'POST'])
+def api_cart():
+    booking_id = session.get('booking_id')
+    if not booking_id:
+        return jsonify({"success": False, "message": "Book a table first"}), 400
+
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        changes = data.get('changes')
+        if not isinstance(changes, list) or not changes:
+            return jsonify({"success": False, "message": "changes must be a non-empty list"}), 400
+        try:
+            rows = _apply_cart(booking_id, changes)
+        except cart.CartError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+    else:
+        rows = cart.load(get_db(), booking_id)
+
+    return jsonify(_cart_json(rows))
+
 # ---------------- Menu ----------------
 @app.route('/menu', methods=['GET', 'POST'])
 def menu():
@@ -458,133 +867,48 @@ def menu():
         return redirect(url_for('booking'))
 
     booking_id = session['booking_id']
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
 
     if request.method == 'POST':
         action = request.form.get('action')
         order_id = request.form.get('order_id')
+        item_id = request.form.get('item_id')
         item_name = request.form.get('item_name')
-        item_price = request.form.get('item_price')
 
-        try:
-            # ---------- ADD ITEM ----------
-            if action == 'add' and item_name and item_price:
-                item_price = float(item_price)
-
-                # Check if item already exists
-                cursor.execute(
-                    "SELECT * FROM food_orders WHERE booking_id=%s AND item_name=%s",
-                    (booking_id, item_name)
-                )
-                existing = cursor.fetchone()
-
-                if existing:
-                    # Update quantity
-                    new_qty = existing['quantity'] + 1
-                    cursor.execute(
-                        "UPDATE food_orders SET quantity=%s WHERE id=%s",
-                        (new_qty, existing['id'])
-                    )
-                else:
-                    # Insert new row
-                    cursor.execute("""
-                        INSERT INTO food_orders 
-                        (booking_id, item_name, item_price, food_paid, quantity)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (booking_id, item_name, item_price, 0, 1))
-
-            # ---------- INCREASE QUANTITY ----------
-            elif action == 'increase' and order_id:
-                cursor.execute("SELECT * FROM food_orders WHERE id=%s", (order_id,))
-                order = cursor.fetchone()
-                if order:
-                    new_qty = order['quantity'] + 1
-                    cursor.execute(
-                        "UPDATE food_orders SET quantity=%s WHERE id=%s",
-                        (new_qty, order_id)
-                    )
-
-            # ---------- DECREASE QUANTITY ----------
-            elif action == 'decrease' and order_id:
-                cursor.execute("SELECT * FROM food_orders WHERE id=%s", (order_id,))
-                order = cursor.fetchone()
-                if order:
-                    if order['quantity'] > 1:
-                        new_qty = order['quantity'] - 1
-                        cursor.execute(
-                            "UPDATE food_orders SET quantity=%s WHERE id=%s",
-                            (new_qty, order_id)
-                        )
-                    else:
-                        cursor.execute("DELETE FROM food_orders WHERE id=%s", (order_id,))
-
-            # ---------- DELETE ITEM ----------
-            elif action == 'delete' and order_id:
-                cursor.execute("DELETE FROM food_orders WHERE id=%s", (order_id,))
-
-            conn.commit()
-
-        except Exception as e:
-            conn.rollback()
-            print("Error storing food order:", e)
+        # Form buttons become the same cart changes /api/cart accepts;
+        # prices always come from the catalog, never from the form
+        change = None
+        if action == 'add' and (item_id or item_name):
+            change = {'item_id': item_id, 'item_name': item_name, 'delta': 1}
+        elif action == 'increase' and order_id:
+            change = {'order_id': order_id, 'delta': 1}
+        elif action == 'decrease' and order_id:
+            change = {'order_id': order_id, 'delta': -1}
+        elif action == 'delete' and order_id:
+            change = {'order_id': order_id, 'remove': True}
+
+        if change:
+            try:
+                _apply_cart(booking_id, [change])
+            except cart.BookingNotConfirmed:
+                return redirect(url_for('booking_payment'))
+            except Exception:
+                log.exception("Storing food order failed")
 
         return redirect(url_for('menu'))
 
     # ---------- FETCH CURRENT ORDERS ----------
-    cursor.execute(
-        "SELECT id, item_name, item_price, quantity FROM food_orders WHERE booking_id=%s",
-        (booking_id,)
-    )
-    orders = cursor.fetchall()
+    orders = cart.load(get_db(), booking_id)
 
-    # Calculate total dynamically
-    total = sum(order['quantity'] * float(order['item_price']) for order in orders)
+    # The order header keeps the total; no need to re-add the lines
+    total = cart.totals(get_db(), booking_id)['subtotal']
 
-    cursor.close()
-    conn.close()
-
-    # ---------- STATIC MENU ITEMS ----------
-    menu_items = {
-        "Pizza": [
-            {"name": "Margherita", "price": 200, "image": "margherita.jpg"},
-            {"name": "Pepperoni", "price": 250, "image": "pepperoni.jpg"},
-            {"name": "Paneer Tikka", "price": 250, "image": "paneer_tikka.jpg"},
-            {"name": "BBQ Chicken", "price": 300, "image": "bbq_chicken.jpg"},
-            {"name": "Peri Peri", "price": 280, "image": "peri_peri.jpg"},
-            {"name": "Cheese Burst", "price": 320, "image": "cheese_burst.jpg"},
-            {"name": "Mexican Green Wave", "price": 290, "image": "mexican_green_wave.jpg"},
-            {"name": "Farmhouse", "price": 260, "image": "farmhouse.jpg"},
-            {"name": "Veggie Delight", "price": 240, "image": "veggie_delight.jpg"},
-            {"name": "Tandoori Paneer", "price": 270, "image": "tandoori_paneer.jpg"}
-        ],
-        "Drinks": [
-            {"name": "Coke", "price": 50, "image": "coke.jpg"},
-            {"name": "Lemonade", "price": 60, "image": "lemonade.jpg"},
-            {"name": "Smoothies", "price": 85, "image": "smoothie.jpg"},
-            {"name": "Milkshake", "price": 100, "image": "milkshake.jpg"},
-            {"name": "Mojito", "price": 80, "image": "mojito.jpg"},
-            {"name": "Expresso", "price": 90, "image": "espresso.jpg"},
-            {"name": "Cold Coffee", "price": 110, "image": "cold_coffee.jpg"},
-            {"name": "Iced Tea", "price": 70, "image": "iced_tea.jpg"},
-            {"name": "Hot Chocolate", "price": 95, "image": "hot_chocolate.jpg"},
-            {"name": "Green Tea", "price": 60, "image": "green_tea.jpg"},
-            {"name": "Blue Lagoon", "price": 130, "image": "blue_lagoon.jpg"}
-        ],
-        "Entradas": [
-            {"name": "Nachos", "price": 120, "image": "nachos.jpg"},
-            {"name": "Spring Rolls", "price": 150, "image": "spring_rolls.jpg"},
-            {"name": "Cheese Balls", "price": 130, "image": "cheese_balls.jpg"},
-            {"name": "Garlic Bread", "price": 100, "image": "garlic_bread.jpg"},
-            {"name": "French Fries", "price": 90, "image": "french_fries.jpg"},
-            {"name": "Tomato Salad", "price": 80, "image": "tomato_salad.jpg"},
-            {"name": "Tandoori Momos", "price": 140, "image": "tandoori_momos.jpg"},
-            {"name": "Stuffed Mushroom", "price": 160, "image": "stuffed_mushrooms.jpg"},
-            {"name": "Loaded Nachos", "price": 180, "image": "loaded_nachos.jpg"},
-            {"name": "Bruschetta", "price": 120, "image": "bruschetta.jpg"}
-        ]
-    }
-    return render_template("menu.html", orders=orders, menu_items=menu_items, total=total)
+    # ---------- MENU ITEMS ----------
+    # The same for every visitor: rendered once per catalog and asset version
+    catalog = menu_catalog.current()
+    menu_grid = fragment_cache.get(
+        'menu_grid', (catalog.version, asset_manifest.version, cache_bus.version('pages')),
+        lambda: Markup(render_template('menu_grid.html', menu_items=catalog.by_category)))
+    return render_template("menu.html", orders=orders, menu_grid=menu_grid, total=total)
 
 
 # ---------------- Food Payment ----------------
@@ -594,33 +918,84 @@ def food_payment():
     if not booking_id:
         return redirect(url_for('booking'))
 
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM food_orders WHERE booking_id=%s", (booking_id,))
-    food_orders = cursor.fetchall()
-    total_price = sum(o['item_price']*o['quantity'] for o in food_orders)
-    cursor.close()
-    conn.close()
-
-    upi_uri = f"upi://pay?pa={UPI_ID}&pn=Swift Cafe&am={total_price}&cu=INR"
-    qr_link = generate_qr_base64(upi_uri)
+    # The order header keeps the unpaid amount; no need to read the lines.
+    # cart.pay() works out the charge itself, under the header lock.
+    total_price = cart.totals(get_db(), booking_id)['due']
 
     if request.method == 'POST' and total_price > 0:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("UPDATE food_orders SET food_paid=1 WHERE booking_id=%s", (booking_id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        try:
+            rollups.add('food_revenue', cart.pay(get_db(), booking_id))
+        except cart.BookingNotConfirmed:
+            return redirect(url_for('booking_payment'))
+        recent_orders.invalidate(session.get('user_id'))
+        cache_bus.publish(get_db(), ('rollups', None), *_orders_changed(session.get('user_id')))
+        _publish_ticket(booking_id, cart.load(get_db(), booking_id), 'paid')
         return redirect(url_for('order_success'))
 
+    upi_uri = f"upi://pay?pa={UPI_ID}&pn=Swift Cafe&am={total_price}&cu=INR"
+    qr_link = qr_link_for(upi_uri)
+
     return render_template('food_payment.html',
                            payment_type='food',
                            total_price=total_price,
                            customer_name=session.get('customer_name'),
                            qr_link=qr_link,
-                           upi_uri=upi_uri,
-                           food_orders=food_orders)
+                           upi_uri=upi_uri)
+
+# --- Kitchen tickets ---
+# Cart changes and payments are published on an in-process bus (events.py)
+# and pushed to the kitchen display as Server-Sent Events, so the kitchen
+# never polls the food_orders table. Each worker has its own bus.
+kitchen_events = EventBus()
+
+def _publish_ticket(booking_id, rows, change):
+    # The order is already saved; a missed ticket must not fail the request
+    try:
+        conn = get_db()
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(cart.TICKET_BOOKING, (booking_id,))
+            booking = cursor.fetchone()
+        finally:
+            cursor.close()
+        kitchen_events.publish('ticket', cart.ticket(booking_id, booking, rows, change))
+    except Exception:
+        log.exception("Publishing kitchen ticket failed")
+
+def _kitchen_stream(events, table):
+    yield "retry: 3000\n\n"
+    for event in events:
+        if event is None:
+            yield ": keep-alive\n\n"
+        elif event is False:
+            # Events were missed (or came from another worker): start over
+            yield "event: reset\ndata: {}\n\n"
+        elif event is not True and (table is None or event.data['table_no'] == table):
+            yield event.sse()
+
+@app.route('/kitchen')
+def kitchen():
+    if not _is_admin():
+        return redirect(url_for('login_page'))
+    return render_template('kitchen.html')
+
+@app.route('/kitchen/stream')
+def kitchen_stream():
+    if not _is_admin():
+        return jsonify({"success": False, "message": "Admin login required"}), 403
+    table = request.args.get('table', type=int)
+    last_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+    try:
+        events = kitchen_events.listen(last_id, heartbeat=config.EVENT_HEARTBEAT)
+    except TooManyListeners:
+        return jsonify({"success": False, "message": "Too many kitchen displays"}), 503, {'Retry-After': '5'}
+    # No stream_with_context: the stream must not hold a pooled connection
+    return Response(_kitchen_stream(events, table), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+instrumentation.registry.derived(
+    'swiftcafe_kitchen_events', 'gauge', 'Kitchen ticket bus (published is cumulative).',
+    ('stat',), lambda: [((k,), v) for k, v in kitchen_events.stats().items()])
 
 # ---------------- Order_sucess ----------------
 @app.route('/order_success')
@@ -634,61 +1009,119 @@ def my_bookings():
     if 'user_id' not in session or session.get('role') != 'customer':
         return redirect(url_for('login_page'))
 
-    user_email = session.get('email')
-
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("""
-        SELECT id, date, time, table_no, guests, category, subcategory, status, total_amount
-        FROM bookings
-        WHERE email=%s AND status='paid'
-        ORDER BY date DESC, time DESC
-    """, (user_email,))
-    bookings = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    try:
+        bookings, next_cursor = history.fetch_bookings(
+            get_db(), session['user_id'], history.DEFAULT_PAGE_SIZE, request.args.get('cursor'))
+    except history.BadFilter as e:
+        return str(e), 400
 
-    return render_template('my_bookings.html', bookings=bookings)
+    return render_template('my_bookings.html', bookings=bookings, next_cursor=next_cursor)
 
 
 # ---------------- Customer: My Orders ----------------
 @app.route('/my_orders')
 def my_orders():
     # Check if user is logged in
-    if 'email' not in session:
-        return redirect(url_for('login'))
-
-    user_email = session['email']
-
-    conn = get_db()
-    cursor = conn.cursor(dictionary=True)
-
-    # Fetch orders for the logged-in user
-    query = """
-        SELECT 
-            f.id AS order_id,
-            f.item_name,
-            f.item_price,
-            f.quantity,
-            (f.item_price * f.quantity) AS total_amount,
-            f.food_paid,
-            f.created_at,
-            b.id AS booking_id,
-            b.date,
-            b.time,
-            b.table_no,
-            b.status,
-            b.total_amount AS booking_total
-        FROM bookings b
-        JOIN food_orders f ON f.booking_id = b.id
-        WHERE b.email = %s
-        ORDER BY f.created_at DESC
-    """
+    if 'user_id' not in session:
+        return redirect(url_for('login_page'))
+
+    user_id = session['user_id']
+    cursor_token = request.args.get('cursor')
 
-    cursor.execute(query, (user_email,))
-    orders = cursor.fetchall()
+    def load():
+        return history.fetch_orders(get_db(), user_id, history.DEFAULT_PAGE_SIZE, cursor_token)
 
-    return render_template('my_orders.html', orders=orders)
+    try:
+        if cursor_token:
+            orders, next_cursor = load()
+        else:
+            orders, next_cursor = recent_orders.get(user_id, load)
+    except history.BadFilter as e:
+        return str(e), 400
+
+    return render_template('my_orders.html', orders=orders, next_cursor=next_cursor)
+
+@app.cli.command('purge-holds')
+def purge_holds_command():
+    """Release tables held by bookings that were never paid."""
+    removed = reservations.purge_expired_holds(get_db())
+    availability.invalidate()
+    rollups.invalidate()
+    recent_orders.clear()
+    # The running workers hold these too
+    cache_bus.publish(get_db(), ('availability', None), ('rollups', None), ('recent_orders', None))
+    print(f"Released {removed} expired hold(s)")
+
+@app.cli.command('invalidate-cache')
+@click.argument('namespace', type=click.Choice(['availability', 'rollups', 'recent_orders',
+                                                'profiles', 'pages']))
+@click.argument('key', required=False)
+def invalidate_cache_command(namespace, key):
+    """Make every worker drop KEY (default: everything) from a cache."""
+    if not config.COHERENCE:
+        raise click.ClickException("COHERENCE is off; workers rely on their cache TTLs")
+    cache_bus.publish(get_db(), (namespace, key))
+    print(f"Published; workers drop it within {config.COHERENCE_INTERVAL:g}s of their next request")
+
+@app.cli.command('purge-sessions')
+def purge_sessions_command():
+    """Delete expired sessions."""
+    print(f"Removed {session_store.purge()} expired session(s)")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Resize, fingerprint and precompress the static folder into ASSET_BUILD_DIR."""
+    manifest = assets.build(app.static_folder, log=print)
+    print(f"{len(manifest['images'])} image(s) and {len(manifest['files'])} other file(s) "
+          f"in {asset_manifest.build_dir}")
+
+@app.cli.command('flush-writes')
+def flush_writes_command():
+    """Insert contact/feedback rows left in the spool by stopped workers."""
+    writes.start()
+    recovered = writes.stats()['recovered']
+    if not writes.flush(timeout=60):
+        raise click.ClickException(f"{writes.stats()['depth']} row(s) still unwritten; "
+                                   "is the database reachable?")
+    writes.stop()
+    print(f"Wrote {recovered} spooled row(s)")
+
+@app.cli.command('refresh-analytics')
+def refresh_analytics_command():
+    """Copy newly settled bookings and food orders into the analytics cube."""
+    appended = analytics_cube.refresh(get_db())
+    if appended is None:
+        raise click.ClickException("another process is refreshing the cube")
+    print(', '.join(f"{count} {fact} row(s)" for fact, count in appended.items())
+          + f" added to {analytics_cube.directory}")
+
+@app.cli.command('archive')
+@click.option('--days', type=int, help="Archive bookings dated more than this many days ago "
+                                       "(default ARCHIVE_AFTER_DAYS).")
+@click.option('--max-chunks', type=int, help="Stop after this many chunks; run again to go on.")
+def archive_command(days, max_chunks):
+    """Move past bookings and their food orders to the archive tables."""
+    bookings, food_orders = archive.run(get_db(), days=days, max_chunks=max_chunks, log=print)
+    print(f"Archived {bookings} booking(s) and {food_orders} food order(s) "
+          f"dated before {archive.cutoff(days)}")
+
+# --- WSGI factory ---
+def create_app():
+    """Entry point for multi-worker servers: gunicorn 'app:create_app()'.
+
+    FLASK_* environment variables (e.g. FLASK_SECRET_KEY) override app.config.
+    Each worker process gets its own connection pool; see gunicorn.conf.py
+    for how to size workers, threads and DB_POOL_SIZE.
+    """
+    app.config.from_prefixed_env()
+    if config.PROXY_HOPS and not isinstance(app.wsgi_app, ProxyFix):
+        # Client IPs (for the login limits) come from X-Forwarded-For
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.PROXY_HOPS,
+                                x_proto=config.PROXY_HOPS)
+    db.reset_pool()
+    # Also picks up rows a previous worker spooled but never wrote
+    writes.start()
+    return app
 
 # --- Run ---#
 if __name__ == '__main__':
@@ -0,0 +1,176 @@
+import heapq
+import time
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+
+import config
+
+# Hot/cold tiering of bookings. Bookings dated more than ARCHIVE_AFTER_DAYS
+# ago move, with their food orders and order header, to *_archive tables of
+# the same shape and ids, so availability, carts and the dashboard only ever
+# touch the live tables. Monthly totals of what was moved go to
+# archive_totals / archive_items for the dashboard rollups.
+#
+# The mover works in chunks of ARCHIVE_CHUNK bookings, each one short
+# transaction (copy, summarise, delete), so the live tables are never locked
+# for long and a run that stops part way simply continues where it left off
+# next time. The copy is the first statement of the transaction and reads
+# the live rows with locks held until commit, so two movers never move (or
+# count) the same booking twice.
+#
+# Readers (customer history, admin lists and exports, the analytics cube)
+# query both tiers with the same filters and keyset and merge the results.
+# Ids are never reused (AUTOINCREMENT on SQLite; on MySQL 8 the counter
+# survives restarts), so a row has the same id in either tier.
+
+Tier = namedtuple('Tier', 'bookings food_orders orders')
+
+LIVE = Tier('bookings', 'food_orders', 'orders')
+ARCHIVE = Tier('bookings_archive', 'food_orders_archive', 'orders_archive')
+TIERS = (LIVE, ARCHIVE)
+
+BOOKING_COLUMNS = ('id', 'name', 'email', 'phone', 'date', 'time', 'guests', 'table_no',
+                   'category', 'subcategory', 'status', 'total_amount', 'created_at',
+                   'hold_expires_at', 'user_id', 'party_id')
+FOOD_ORDER_COLUMNS = ('id', 'booking_id', 'item_name', 'item_price', 'quantity', 'food_paid',
+                      'created_at')
+ORDER_COLUMNS = ('booking_id', 'subtotal', 'paid_total', 'item_count')
+
+CANDIDATES = "SELECT id FROM bookings WHERE date < %s ORDER BY date, id LIMIT %s"
+
+TOTALS_UPSERT = {
+    'mysql': """
+        INSERT INTO archive_totals (month, bookings, booking_revenue, food_orders, food_revenue)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE bookings = bookings + VALUES(bookings),
+            booking_revenue = booking_revenue + VALUES(booking_revenue),
+            food_orders = food_orders + VALUES(food_orders),
+            food_revenue = food_revenue + VALUES(food_revenue)
+    """,
+    'sqlite': """
+        INSERT INTO archive_totals (month, bookings, booking_revenue, food_orders, food_revenue)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT(month) DO UPDATE SET bookings = bookings + excluded.bookings,
+            booking_revenue = booking_revenue + excluded.booking_revenue,
+            food_orders = food_orders + excluded.food_orders,
+            food_revenue = food_revenue + excluded.food_revenue
+    """,
+}
+
+ITEMS_UPSERT = {
+    'mysql': """
+        INSERT INTO archive_items (month, item_name, quantity) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity)
+    """,
+    'sqlite': """
+        INSERT INTO archive_items (month, item_name, quantity) VALUES (%s, %s, %s)
+        ON CONFLICT(month, item_name) DO UPDATE SET quantity = quantity + excluded.quantity
+    """,
+}
+
+
+def cutoff(days=None):
+    """First booking date that stays live."""
+    days = config.ARCHIVE_AFTER_DAYS if days is None else days
+    return (date.today() - timedelta(days=days)).isoformat()
+
+
+def merge_newest(pages, key, limit):
+    """Merge per-tier result lists, each sorted by ``key`` descending, and
+    keep the first ``limit`` rows (one more if there are, for the cursor).
+
+    Tiers are read live first: a row moved in between shows up in both
+    (never in neither) and is kept once.
+    """
+    rows, last = [], None
+    for row in heapq.merge(*pages, key=key, reverse=True):
+        if key(row) == last:
+            continue
+        last = key(row)
+        rows.append(row)
+        if len(rows) > limit:
+            break
+    return rows
+
+
+def _copy(table, columns, where):
+    cols = ', '.join(columns)
+    return f"INSERT INTO {table}_archive ({cols}) SELECT {cols} FROM {table} WHERE {where}"
+
+
+def _summarise(cursor, ids, marks):
+    """Per-month totals and item quantities of the live rows being moved."""
+    totals = defaultdict(lambda: [0, 0.0, 0, 0.0])
+    items = defaultdict(int)
+    cursor.execute(f"SELECT id, date, total_amount FROM bookings WHERE id IN ({marks})", ids)
+    month = {}
+    for booking_id, day, amount in cursor.fetchall():
+        month[booking_id] = str(day)[:7]
+        totals[month[booking_id]][0] += 1
+        totals[month[booking_id]][1] += float(amount or 0)
+    cursor.execute(f"SELECT booking_id, item_name, quantity FROM food_orders "
+                   f"WHERE booking_id IN ({marks})", ids)
+    for booking_id, item_name, quantity in cursor.fetchall():
+        totals[month[booking_id]][2] += 1
+        items[month[booking_id], item_name] += quantity
+    cursor.execute(f"SELECT booking_id, paid_total FROM orders WHERE booking_id IN ({marks})", ids)
+    for booking_id, paid_total in cursor.fetchall():
+        totals[month[booking_id]][3] += float(paid_total)
+    return totals, items
+
+
+def move_chunk(conn, before, chunk=None):
+    """Move up to ``chunk`` bookings dated before ``before`` (YYYY-MM-DD),
+    oldest first, to the archive tier. Returns (bookings, food orders) moved."""
+    chunk = chunk or config.ARCHIVE_CHUNK
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CANDIDATES, (before, chunk))
+        ids = tuple(row[0] for row in cursor.fetchall())
+        if not ids:
+            return 0, 0
+        marks = ', '.join(['%s'] * len(ids))
+        try:
+            cursor.execute(_copy('bookings', BOOKING_COLUMNS, f"id IN ({marks})"), ids)
+            cursor.execute(_copy('food_orders', FOOD_ORDER_COLUMNS, f"booking_id IN ({marks})"), ids)
+            cursor.execute(_copy('orders', ORDER_COLUMNS, f"booking_id IN ({marks})"), ids)
+            totals, items = _summarise(cursor, ids, marks)
+            cursor.executemany(TOTALS_UPSERT[config.DB_BACKEND],
+                               [(month, *values) for month, values in totals.items()])
+            if items:
+                cursor.executemany(ITEMS_UPSERT[config.DB_BACKEND],
+                                   [(month, name, qty) for (month, name), qty in items.items()])
+            cursor.execute(f"DELETE FROM food_orders WHERE booking_id IN ({marks})", ids)
+            food_orders = cursor.rowcount
+            cursor.execute(f"DELETE FROM orders WHERE booking_id IN ({marks})", ids)
+            cursor.execute(f"DELETE FROM bookings WHERE id IN ({marks})", ids)
+            bookings = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return bookings, food_orders
+    finally:
+        cursor.close()
+
+
+def run(conn, days=None, chunk=None, max_chunks=None, pause=None, log=None):
+    """Archive every booking older than ``days`` days, a chunk at a time,
+    sleeping ``pause`` seconds between chunks. Returns (bookings, food orders)
+    moved; stops early after ``max_chunks`` chunks."""
+    before = cutoff(days)
+    pause = config.ARCHIVE_PAUSE if pause is None else pause
+    moved = [0, 0]
+    chunks = 0
+    while max_chunks is None or chunks < max_chunks:
+        bookings, food_orders = move_chunk(conn, before, chunk)
+        if not bookings:
+            break
+        chunks += 1
+        moved[0] += bookings
+        moved[1] += food_orders
+        if log:
+            log(f"archived {moved[0]} booking(s), {moved[1]} food order(s) dated before {before}")
+        if pause:
+            time.sleep(pause)
+    return tuple(moved)
@@ -0,0 +1,245 @@
+import asyncio
+
+from a2wsgi import WSGIMiddleware
+from quart import Quart, jsonify, request, session
+from quart.sessions import SessionInterface
+
+import aio_db
+import app as swiftcafe
+import cart
+import coherence
+import config
+import reservations
+from rollups import ITEMS_SQL, TOTALS_SQL
+
+# ASGI entry point:  uvicorn asgi:app --workers 4
+#
+# The DB-heavy hot paths have async JSON variants under /async/, served by
+# Quart on an asyncio connection pool, so one process can keep hundreds of
+# requests in flight while they wait on the database. Every other path goes
+# to the regular Flask app, run on WEB_THREADS threads by a2wsgi. Both halves
+# live in the same process and share the availability index, rollups and
+# menu catalog from app.py.
+#
+# Optional dependencies: pip install -r requirements-async.txt
+
+flask_app = swiftcafe.create_app()
+
+
+
+class _SharedSessions(SessionInterface):
+    """Quart front for the Flask app's server-side sessions (sessions.py).
+
+    Same cookie and store, so the login/booking session carries over; a DB
+    store is called on a thread so it does not block the event loop.
+    """
+
+    def __init__(self, interface):
+        self._interface = interface
+
+    async def _call(self, fn, *args):
+        if self._interface.store.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def open_session(self, app, request):
+        return await self._call(self._interface.open_session, app, request)
+
+    async def save_session(self, app, session, response):
+        if response is not None:
+            await self._call(self._interface.save_session, app, session, response)
+
+
+async_app = Quart(__name__)
+async_app.secret_key = flask_app.secret_key
+async_app.session_interface = _SharedSessions(flask_app.session_interface)
+
+pool = None
+
+
+@async_app.before_serving
+async def _open_pool():
+    global pool
+    pool = aio_db.AsyncPool()
+
+
+@async_app.after_serving
+async def _close_pool():
+    await pool.close()
+
+
+# --- Cache coherence ---
+# Same bus as the Flask half (see coherence.py), read over the async pool
+@async_app.before_request
+async def _poll_cache_bus():
+    bus = swiftcafe.cache_bus
+    if not bus.due():
+        return
+    try:
+        async with pool.acquire() as conn:
+            bus.apply(await conn.fetchall(*bus.query()))
+            purge = bus.purge_query()
+            if purge:
+                await conn.execute(*purge)
+                await conn.commit()
+    except Exception:
+        swiftcafe.log.exception("Polling cache invalidations failed")
+
+
+async def _publish_invalidations(conn, *invalidations):
+    if not config.COHERENCE:
+        return
+    try:
+        await conn.executemany(coherence.PUBLISH, swiftcafe.cache_bus.rows(*invalidations))
+        await conn.commit()
+    except Exception:
+        swiftcafe.log.exception("Publishing cache invalidations failed")
+
+
+# --- Booking availability ---
+async def _load_booked_tables(date):
+    async with pool.acquire() as conn:
+        rows = await conn.fetchall(
+            "SELECT time, table_no FROM bookings WHERE date=%s AND " + reservations.OCCUPYING,
+            (date, reservations.now()))
+    return [(row['time'], row['table_no']) for row in rows]
+
+
+@async_app.route('/async/availability')
+async def availability():
+    date = request.args.get("date", "").strip()
+    time = request.args.get("time", "").strip()
+    if not date:
+        return jsonify({"success": False, "message": "date is required"}), 400
+
+    slots, tables = await swiftcafe.availability.lookup_async(date, time, _load_booked_tables)
+    result = {"success": True, "date": date, "slots": slots}
+    if time:
+        result["time"] = time
+        result["tables"] = tables
+    return jsonify(result)
+
+
+# --- Cart ---
+def _not_confirmed():
+    return jsonify({"success": False,
+                    "message": "Pay for the table booking before ordering food"}), 400
+
+
+@async_app.route('/async/cart', methods=['GET', 'POST'])
+async def cart_api():
+    booking_id = session.get('booking_id')
+    if not booking_id:
+        return jsonify({"success": False, "message": "Book a table first"}), 400
+
+    if request.method == 'GET':
+        async with pool.acquire() as conn:
+            rows = await conn.fetchall(cart.LOAD, (booking_id,))
+        return jsonify(swiftcafe._cart_json(rows))
+
+    data = await request.get_json(silent=True) or {}
+    changes = data.get('changes')
+    if not isinstance(changes, list) or not changes:
+        return jsonify({"success": False, "message": "changes must be a non-empty list"}), 400
+
+    async with pool.acquire() as conn:
+        # Same transaction as cart.apply_changes: header row locked first
+        if not await conn.fetchall(cart.CONFIRMED, (booking_id,)):
+            return _not_confirmed()
+        await conn.execute(cart.LOCK_HEADER[config.DB_BACKEND], (booking_id,))
+        before = await conn.fetchall(cart.LOAD, (booking_id,))
+        try:
+            upserts = cart.plan_upserts(booking_id, before, changes, swiftcafe.menu_catalog.current())
+        except cart.CartError as e:
+            await conn.rollback()
+            return jsonify({"success": False, "message": str(e)}), 400
+        if upserts:
+            await conn.executemany(cart.UPSERT[config.DB_BACKEND], upserts)
+            await conn.execute(cart.DELETE_EMPTY, (booking_id,))
+        after = await conn.fetchall(cart.LOAD, (booking_id,))
+        await conn.execute(cart.SAVE_HEADER, cart.header_params(booking_id, cart.summarize(after)))
+        await conn.commit()
+        if after != before:
+            await _publish_invalidations(conn, ('rollups', None),
+                                         *swiftcafe._orders_changed(session.get('user_id')))
+            await _publish_ticket(conn, booking_id, after, 'cart')
+
+    swiftcafe._record_cart_rollups(before, after)
+    swiftcafe.recent_orders.invalidate(session.get('user_id'))
+    return jsonify(swiftcafe._cart_json(after))
+
+
+async def _publish_ticket(conn, booking_id, rows, change):
+    # Same bus as the Flask half, so /kitchen/stream sees these too
+    try:
+        booking = await conn.fetchall(cart.TICKET_BOOKING, (booking_id,))
+        swiftcafe.kitchen_events.publish(
+            'ticket', cart.ticket(booking_id, booking[0] if booking else None, rows, change))
+    except Exception:
+        swiftcafe.log.exception("Publishing kitchen ticket failed")
+
+
+# --- Food payment ---
+@async_app.route('/async/food_payment', methods=['GET', 'POST'])
+async def food_payment():
+    booking_id = session.get('booking_id')
+    if not booking_id:
+        return jsonify({"success": False, "message": "Book a table first"}), 400
+
+    async with pool.acquire() as conn:
+        if request.method == 'POST':
+            # As cart.pay(): lock the header, then pay what the unpaid lines come to
+            if not await conn.fetchall(cart.CONFIRMED, (booking_id,)):
+                return _not_confirmed()
+            await conn.execute(cart.LOCK_HEADER[config.DB_BACKEND], (booking_id,))
+            due = float((await conn.fetchall(cart.DUE, (booking_id,)))[0]['due'])
+            if due <= 0:
+                await conn.rollback()
+                return jsonify({"success": False, "message": "Nothing to pay"}), 400
+            await conn.execute(cart.PAY_LINES, (booking_id,))
+            await conn.execute(cart.PAY_HEADER, (due, booking_id))
+            await conn.commit()
+            swiftcafe.rollups.add('food_revenue', due)
+            swiftcafe.recent_orders.invalidate(session.get('user_id'))
+            await _publish_invalidations(conn, ('rollups', None),
+                                         *swiftcafe._orders_changed(session.get('user_id')))
+            await _publish_ticket(conn, booking_id, await conn.fetchall(cart.LOAD, (booking_id,)), 'paid')
+            return jsonify({"success": True, "paid": due})
+        rows = await conn.fetchall(cart.LOAD, (booking_id,))
+
+    result = swiftcafe._cart_json(rows)
+    upi_uri = f"upi://pay?pa={swiftcafe.UPI_ID}&pn=Swift Cafe&am={result['due']}&cu=INR"
+    result.update({"upi_uri": upi_uri, "qr_link": swiftcafe.qr_link_for(upi_uri)})
+    return jsonify(result)
+
+
+# --- Admin dashboard totals ---
+@async_app.route('/async/admin/summary')
+async def admin_summary():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({"success": False, "message": "Admin login required"}), 403
+
+    rollups = swiftcafe.rollups
+    async with pool.acquire() as conn:
+        if rollups.is_stale():
+            totals = await conn.fetchall(TOTALS_SQL)
+            rollups.load(totals[0], await conn.fetchall(ITEMS_SQL))
+        feedbacks = await conn.fetchall("""
+            SELECT id, name, email, message, created_at
+            FROM feedbacks
+            ORDER BY created_at DESC
+            LIMIT 5
+        """)
+    return jsonify({"success": True, **rollups.snapshot(), "feedbacks": feedbacks})
+
+
+# --- Dispatcher ---
+_flask_asgi = WSGIMiddleware(flask_app, workers=config.WEB_THREADS)
+
+
+async def app(scope, receive, send):
+    # Lifespan events open and close the async pool
+    if scope['type'] == 'lifespan' or scope.get('path', '').startswith('/async/'):
+        await async_app(scope, receive, send)
+    else:
+        await _flask_asgi(scope, receive, send)
@@ -0,0 +1,280 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+from io import BytesIO
+
+from flask import request, send_from_directory, url_for
+from markupsafe import Markup, escape
+from PIL import Image, ImageOps, features
+
+try:
+    import brotli
+except ImportError:  # optional: without it only .gz copies are written
+    brotli = None
+
+import config
+
+# Static asset pipeline. `flask --app app build-assets` reads the static
+# folder and writes to ASSET_BUILD_DIR:
+#   * each image resized to ASSET_WIDTHS as AVIF (if Pillow has it), WebP and
+#     a JPEG/PNG fallback, for <picture>/srcset;
+#   * every other file copied as is;
+#   * all under content-hashed names, so they can be cached forever
+#     (served by /assets/<name> with an immutable Cache-Control);
+#   * text files also as .gz/.br, served to clients that accept them;
+#   * manifest.json mapping static paths to the built names.
+# Templates call asset_url() and picture(); before the first build they fall
+# back to the plain /static files. Rendered pages themselves are gzipped on
+# the fly by compress_response().
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+COMPRESSIBLE = ('text/html', 'text/css', 'text/plain', 'text/csv', 'application/javascript',
+                'text/javascript', 'application/json', 'image/svg+xml')
+# PIL format, MIME type and encoder options per file extension
+FORMATS = {
+    'avif': ('AVIF', 'image/avif', dict(quality=50)),
+    'webp': ('WEBP', 'image/webp', dict(quality=75, method=6)),
+    'jpg': ('JPEG', 'image/jpeg', dict(quality=80, optimize=True, progressive=True)),
+    'png': ('PNG', 'image/png', dict(optimize=True)),
+}
+MANIFEST = 'manifest.json'
+BUILD_VERSION = 1  # bump when variant encoding changes, to rebuild everything
+
+
+# --- Build ---
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _precompress(path, data):
+    candidates = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        candidates.append(('.br', brotli.compress(data, quality=11)))
+    for suffix, packed in candidates:
+        if len(packed) < len(data) * 0.9:
+            _atomic_write(path + suffix, packed)
+
+
+def _emit(out_dir, rel, data):
+    """Write ``data`` as rel's content-hashed name; return that name."""
+    stem, ext = os.path.splitext(rel)
+    name = f"{stem}.{_digest(data)[:12]}{ext}"
+    path = os.path.join(out_dir, name)
+    if not os.path.exists(path):
+        _atomic_write(path, data)
+        if mimetypes.guess_type(name)[0] in COMPRESSIBLE:
+            _precompress(path, data)
+    return name.replace(os.sep, '/')
+
+
+def image_formats(source_ext):
+    """Formats to build for an image, best first; the last is the <img> fallback."""
+    formats = ['avif'] if features.check('avif') else []
+    return formats + ['webp', 'png' if source_ext == '.png' else 'jpg']
+
+
+def _build_image(data, rel, out_dir, widths):
+    stem, ext = os.path.splitext(rel)
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if image.has_transparency_data else 'RGB')
+        width, height = image.size
+        entry = {'width': width, 'height': height, 'sources': {}}
+        for fmt in image_formats(ext.lower()):
+            pil_format, _, options = FORMATS[fmt]
+            variants = []
+            # Never upscale; the original width is always the largest variant
+            for w in sorted({w for w in widths if w < width} | {width}):
+                resized = image if w == width else image.resize(
+                    (w, max(1, round(height * w / width))), Image.LANCZOS)
+                if pil_format == 'JPEG':
+                    resized = resized.convert('RGB')
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, **options)
+                variants.append([_emit(out_dir, f"{stem}.w{w}.{fmt}", buffer.getvalue()), w])
+            entry['sources'][fmt] = variants
+    return entry
+
+
+def _built(entry, out_dir):
+    names = [name for variants in entry.get('sources', {}).values() for name, _ in variants]
+    if 'file' in entry:
+        names.append(entry['file'])
+    return all(os.path.exists(os.path.join(out_dir, name)) for name in names)
+
+
+def build(source_dir, out_dir=None, widths=None, log=lambda line: None):
+    """Build every file under ``source_dir``; return the new manifest.
+
+    Files whose content (and ASSET_WIDTHS) did not change since the last
+    build are reused. Names from older builds are left in place for pages
+    still cached with them.
+    """
+    out_dir = out_dir or config.ASSET_BUILD_DIR
+    widths = tuple(sorted(widths or config.ASSET_WIDTHS))
+    previous = _read_manifest(out_dir)
+    if previous.get('build') != [BUILD_VERSION, list(widths)]:
+        previous = {}
+    out_real = os.path.realpath(out_dir)
+    manifest = {'build': [BUILD_VERSION, list(widths)], 'images': {}, 'files': {}}
+
+    for root, dirs, files in os.walk(source_dir):
+        # The build dir may sit inside the static folder
+        dirs[:] = sorted(d for d in dirs if os.path.realpath(os.path.join(root, d)) != out_real)
+        for filename in sorted(files):
+            if filename.startswith('.'):
+                continue
+            path = os.path.join(root, filename)
+            rel = os.path.relpath(path, source_dir).replace(os.sep, '/')
+            with open(path, 'rb') as f:
+                data = f.read()
+            digest = _digest(data)
+            kind = 'images' if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS else 'files'
+            entry = previous.get(kind, {}).get(rel)
+            if entry and entry.get('digest') == digest and _built(entry, out_dir):
+                manifest[kind][rel] = entry
+                continue
+            if kind == 'images':
+                entry = _build_image(data, rel, out_dir, widths)
+            else:
+                entry = {'file': _emit(out_dir, rel, data)}
+            entry['digest'] = digest
+            manifest[kind][rel] = entry
+            log(f"  built  {rel}")
+
+    # Written last: until then the server keeps using the previous build
+    _atomic_write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1).encode())
+    return manifest
+
+
+# --- Serving ---
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), 'rb') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+class Manifest:
+    """The current build's manifest, re-read when a new build replaces it."""
+
+    def __init__(self, build_dir=None, check_interval=5):
+        self.build_dir = build_dir or config.ASSET_BUILD_DIR
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._manifest = {}
+        self._checked_at = None
+
+    def current(self):
+        now = time.monotonic()
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                    self._checked_at = now
+                    self._maybe_reload()
+        return self._manifest
+
+    @property
+    def version(self):
+        """Changes with every build; part of cache keys for pages linking assets."""
+        self.current()
+        return self._mtime
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(os.path.join(self.build_dir, MANIFEST)).st_mtime
+        except OSError:
+            return  # not built (yet): templates use /static
+        if mtime != self._mtime:
+            self._manifest = _read_manifest(self.build_dir)
+            self._mtime = mtime
+
+    def url(self, rel):
+        """URL of a static file, fingerprinted once built."""
+        current = self.current()
+        entry = current.get('files', {}).get(rel)
+        if entry:
+            return url_for('asset_file', filename=entry['file'])
+        image = current.get('images', {}).get(rel)
+        if image:
+            fallback = list(image['sources'].values())[-1]
+            return url_for('asset_file', filename=fallback[-1][0])
+        return url_for('static', filename=rel)
+
+    def picture(self, rel, alt, sizes='100vw', eager=False, **attrs):
+        """A <picture> offering AVIF/WebP variants of a static image, with srcset."""
+        attrs.update(alt=alt, loading='eager' if eager else 'lazy', decoding='async')
+        image = self.current().get('images', {}).get(rel)
+        if not image:
+            attrs['src'] = url_for('static', filename=rel)
+            return Markup(f"<img{_attributes(attrs)}>")
+
+        def srcset(variants):
+            return ', '.join(f"{url_for('asset_file', filename=name)} {w}w" for name, w in variants)
+
+        *modern, fallback = image['sources'].items()
+        tags = [f"<source{_attributes(dict(type=FORMATS[fmt][1], srcset=srcset(v), sizes=sizes))}>"
+                for fmt, v in modern]
+        attrs.update(src=url_for('asset_file', filename=fallback[1][-1][0]),
+                     srcset=srcset(fallback[1]), sizes=sizes,
+                     width=image['width'], height=image['height'])
+        tags.append(f"<img{_attributes(attrs)}>")
+        return Markup(f"<picture>{''.join(tags)}</picture>")
+
+
+def _attributes(attrs):
+    return ''.join(f' {name.rstrip("_").replace("_", "-")}="{escape(value)}"' for name, value in attrs.items())
+
+
+def send_asset(build_dir, filename):
+    """Serve a built file, precompressed if the client accepts it, cached for a year."""
+    accepted = request.accept_encodings
+    path = filename
+    encoding = None
+    for suffix, name in (('.br', 'br'), ('.gz', 'gzip')):
+        if accepted[name] and os.path.isfile(os.path.join(build_dir, filename + suffix)):
+            path, encoding = filename + suffix, name
+            break
+    response = send_from_directory(build_dir, path, mimetype=mimetypes.guess_type(filename)[0],
+                                   max_age=365 * 24 * 3600)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
+def compress_response(response):
+    """after_request hook: gzip text responses for clients that accept it."""
+    if (config.COMPRESS_LEVEL <= 0 or response.direct_passthrough or response.is_streamed
+            or response.status_code != 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    data = response.get_data()
+    if len(data) < config.COMPRESS_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=config.COMPRESS_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)  # no longer byte-for-byte the tagged body
+    return response
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+class _DateAvailability:
+    """Occupancy for one date: one table bitmask per slot.
+
+    Bit ``i`` of ``occupied[s]`` is set when ``tables[i]`` is taken in
+    ``slots[s]``; ``blocked[s]`` has every bit set when the slot is closed
+    that day. The free-slot / free-table answers are recomputed only when
+    the bitmasks change, so reads are plain lookups.
+    """
+
+    def __init__(self, n_slots, n_tables):
+        self.occupied = [0] * n_slots
+        self.blocked = [0] * n_slots
+        self.full_mask = (1 << n_tables) - 1
+        self.loaded_at = time.monotonic()
+        self.free_slots = ()
+        self.free_tables = ()
+
+
+class AvailabilityIndex:
+    def __init__(self, slots, tables, loader, ttl=None, max_dates=None, open_slots=None):
+        """``open_slots(date)``, if given, returns a bitmask of the slots
+        open that day (bit ``s`` for ``slots[s]``); the rest are never free."""
+        self.slots = tuple(slots)
+        self.tables = tuple(tables)
+        self._slot_pos = {s: i for i, s in enumerate(self.slots)}
+        self._table_pos = {t: i for i, t in enumerate(self.tables)}
+        self._loader = loader
+        self._open_slots = open_slots
+        self.ttl = config.AVAILABILITY_TTL if ttl is None else ttl
+        self.max_dates = config.AVAILABILITY_MAX_DATES if max_dates is None else max_dates
+        self._dates = OrderedDict()
+        # Bumped by every write; a lazy load that raced a write is discarded.
+        self._generation = {}
+        self._epoch = 0
+        self._lock = threading.Lock()
+
+    # --- building ---
+    def _refresh(self, entry):
+        tables = self.tables
+        taken = [occupied | blocked for occupied, blocked in zip(entry.occupied, entry.blocked)]
+        entry.free_slots = tuple(
+            slot for slot, mask in zip(self.slots, taken)
+            if mask != entry.full_mask)
+        entry.free_tables = tuple(
+            tuple(t for i, t in enumerate(tables) if not mask >> i & 1)
+            for mask in taken)
+
+    def _build(self, date, rows):
+        entry = _DateAvailability(len(self.slots), len(self.tables))
+        if self._open_slots is not None:
+            open_mask = self._open_slots(date)
+            entry.blocked = [0 if open_mask >> s & 1 else entry.full_mask
+                             for s in range(len(self.slots))]
+        for slot, table_no in rows:
+            s = self._slot_pos.get(slot)
+            t = self._table_pos.get(int(table_no))
+            if s is not None and t is not None:
+                entry.occupied[s] |= 1 << t
+        self._refresh(entry)
+        return entry
+
+    def _cached(self, date):
+        """Return (entry or None, generation token for a reload)."""
+        with self._lock:
+            entry = self._dates.get(date)
+            if entry is not None and time.monotonic() - entry.loaded_at < self.ttl:
+                self._dates.move_to_end(date)
+                return entry, None
+            return None, (self._epoch, self._generation.get(date, 0))
+
+    def _store(self, date, rows, generation):
+        entry = self._build(date, rows)
+        with self._lock:
+            if (self._epoch, self._generation.get(date, 0)) == generation:
+                self._dates[date] = entry
+                self._dates.move_to_end(date)
+                while len(self._dates) > self.max_dates:
+                    old, _ = self._dates.popitem(last=False)
+                    self._generation.pop(old, None)
+        return entry
+
+    def _get(self, date):
+        date = str(date)
+        entry, generation = self._cached(date)
+        if entry is None:
+            entry = self._store(date, self._loader(date), generation)
+        return entry
+
+    async def lookup_async(self, date, slot, loader):
+        """Async form of free_slots/free_tables for the ASGI routes.
+
+        ``loader`` is a coroutine function returning (slot, table_no) rows.
+        Returns (free slots, free tables for ``slot`` or None).
+        """
+        date = str(date)
+        entry, generation = self._cached(date)
+        if entry is None:
+            entry = self._store(date, await loader(date), generation)
+        tables = None
+        if slot:
+            s = self._slot_pos.get(slot)
+            tables = list(entry.free_tables[s]) if s is not None else []
+        return list(entry.free_slots), tables
+
+    # --- queries ---
+    def free_slots(self, date):
+        """Slots on ``date`` with at least one free table."""
+        return list(self._get(date).free_slots)
+
+    def free_tables(self, date, slot):
+        s = self._slot_pos.get(slot)
+        if s is None:
+            return []
+        return list(self._get(date).free_tables[s])
+
+    def taken(self, date, slots):
+        """Bitmask of the tables (bit ``i`` for ``tables[i]``) not free in
+        all of ``slots`` on ``date``; every table if a slot is unknown."""
+        positions = [self._slot_pos.get(slot) for slot in slots]
+        if not positions or None in positions:
+            return (1 << len(self.tables)) - 1
+        entry = self._get(date)
+        taken = 0
+        for s in positions:
+            taken |= entry.occupied[s] | entry.blocked[s]
+        return taken
+
+    def free_tables_across(self, date, slots):
+        """Tables free in every one of ``slots`` on ``date``."""
+        taken = self.taken(date, slots)
+        return [t for i, t in enumerate(self.tables) if not taken >> i & 1]
+
+    def is_free(self, date, slot, table_no):
+        t = self._table_pos.get(int(table_no))
+        if t is None:
+            return False
+        return not self.taken(date, [slot]) >> t & 1
+
+    # --- write hooks ---
+    def _update(self, date, slot, table_no, booked):
+        date = str(date)
+        s = self._slot_pos.get(slot)
+        t = self._table_pos.get(int(table_no))
+        with self._lock:
+            self._generation[date] = self._generation.get(date, 0) + 1
+            entry = self._dates.get(date)
+            if entry is None or s is None or t is None:
+                return
+            if booked:
+                entry.occupied[s] |= 1 << t
+            else:
+                entry.occupied[s] &= ~(1 << t)
+            self._refresh(entry)
+
+    def mark_booked(self, date, slot, table_no):
+        self._update(date, slot, table_no, True)
+
+    def mark_free(self, date, slot, table_no):
+        self._update(date, slot, table_no, False)
+
+    def invalidate(self, date=None):
+        """Drop cached occupancy for ``date`` (or every date)."""
+        with self._lock:
+            if date is None:
+                self._epoch += 1
+                self._generation.clear()
+                self._dates.clear()
+            else:
+                date = str(date)
+                self._generation[date] = self._generation.get(date, 0) + 1
+                self._dates.pop(date, None)
@@ -0,0 +1,146 @@
+"""Analytics benchmark: the NumPy cube vs the same reports in SQL.
+
+Seeds the customer_flow dataset (--scale), builds the analytics cube from
+scratch, then times each report both ways (--repeat runs each, best kept)
+and checks that the cube and SQL agree.
+
+    python bench/analytics.py --scale 0.1
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config  # noqa: E402
+import db  # noqa: E402
+import customer_flow  # noqa: E402
+
+# The SQL each report would need, per backend
+WEEKDAY = {'sqlite': "(CAST(strftime('%w', date) AS INTEGER) + 6) % 7", 'mysql': "WEEKDAY(date)"}
+MONTH = {'sqlite': "strftime('%Y-%m', b.date)", 'mysql': "DATE_FORMAT(b.date, '%Y-%m')"}
+
+SQL = {
+    'utilisation': """
+        SELECT {weekday} AS weekday, time, COUNT(*) AS n
+        FROM bookings WHERE status='paid' GROUP BY 1, 2
+    """,
+    'item_sales': """
+        SELECT {month} AS month, f.item_name, SUM(f.quantity) AS quantity,
+               SUM(f.quantity * f.item_price) AS revenue
+        FROM food_orders f JOIN bookings b ON b.id = f.booking_id
+        WHERE f.food_paid=1 AND b.date < %s GROUP BY 1, 2
+    """,
+    'table_revenue': """
+        SELECT t.table_no, t.n, t.revenue, IFNULL(s.revenue, 0) AS food_revenue
+        FROM (SELECT table_no, COUNT(*) AS n, SUM(total_amount) AS revenue
+              FROM bookings WHERE status='paid' GROUP BY table_no) t
+        LEFT JOIN (SELECT b.table_no, SUM(f.quantity * f.item_price) AS revenue
+                   FROM food_orders f JOIN bookings b ON b.id = f.booking_id
+                   WHERE f.food_paid=1 AND b.date < %s GROUP BY b.table_no) s
+          ON s.table_no = t.table_no
+    """,
+    'guests': "SELECT guests, COUNT(*) AS n FROM bookings WHERE status='paid' GROUP BY guests",
+}
+
+
+def _sql(conn, report):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        sql = SQL[report].format(weekday=WEEKDAY[config.DB_BACKEND], month=MONTH[config.DB_BACKEND])
+        cursor.execute(sql, (date.today().isoformat(),) if '%s' in sql else ())
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _agree(report, cube, rows):
+    """Spot-check one total per report."""
+    if report == 'utilisation':
+        return sum(map(sum, cube['bookings'])) == sum(r['n'] for r in rows)
+    if report == 'item_sales':
+        sold = defaultdict(int)
+        for r in rows:
+            sold[r['item_name']] += int(r['quantity'])
+        return sold == {name: sum(s['quantity']) for name, s in cube['items'].items()}
+    if report == 'table_revenue':
+        return {t['table_no']: (t['bookings'], round(t['food_revenue'])) for t in cube['tables']} == \
+            {r['table_no']: (r['n'], round(float(r['food_revenue']))) for r in rows}
+    return cube['distribution'] == {r['guests']: r['n'] for r in rows}
+
+
+def _best(fn, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="fraction of 50k users / 100k bookings / 1M food orders")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--configured-db", action="store_true",
+                        help="use DB_BACKEND/SQLITE_PATH/MySQL settings instead of a temp SQLite file")
+    parser.add_argument("--no-seed", action="store_true", help="skip seeding")
+    args = parser.parse_args()
+
+    config.ACCESS_LOG = False
+    workdir = tempfile.mkdtemp()
+    config.ANALYTICS_DIR = os.path.join(workdir, "analytics")
+    if not args.configured_db:
+        config.DB_BACKEND = "sqlite"
+        config.SQLITE_PATH = os.path.join(workdir, "analytics.db")
+        db.init_schema(log=lambda line: None)
+
+    import analytics
+    import app as swiftcafe
+
+    catalog = swiftcafe.menu_catalog.current()
+    items = [item for group in catalog.by_category.values() for item in group]
+    if not args.no_seed:
+        customer_flow.seed(max(1, int(50000 * args.scale)), max(1, int(100000 * args.scale)),
+                           int(1000000 * args.scale), swiftcafe.ALL_SLOTS, swiftcafe.ALL_TABLES,
+                           items, "x")
+
+    cube = analytics.Cube()
+    conn = db.get_pool().acquire()
+    try:
+        start = time.perf_counter()
+        appended = cube.refresh(conn)
+        print(f"cube built in {time.perf_counter() - start:.1f}s: "
+              f"{appended['bookings']:,} bookings, {appended['sales']:,} food lines")
+        start = time.perf_counter()
+        cube.refresh(conn)
+        print(f"incremental refresh with nothing new: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+        reports = {
+            'utilisation': lambda: cube.utilisation(len(swiftcafe.ALL_TABLES)),
+            'item_sales': lambda: cube.item_sales('month'),
+            'table_revenue': cube.table_revenue,
+            'guests': cube.guest_counts,
+        }
+        print(f"{'report (best ms)':<16} {'sql':>10} {'cube':>10} {'speedup':>9}  agree")
+        for report, run in reports.items():
+            sql_ms, rows = _best(lambda: _sql(conn, report), args.repeat)
+            cube_ms, result = _best(run, args.repeat)
+            print(f"{report:<16} {sql_ms:10.2f} {cube_ms:10.2f} {sql_ms / cube_ms:8.1f}x  "
+                  f"{'yes' if _agree(report, result, rows) else 'NO'}")
+    finally:
+        conn.close()
+        shutil.rmtree(config.ANALYTICS_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""End-to-end customer flow benchmark.
+
+Seeds the database with realistic volumes (50k users, 100k bookings, 1M
+food orders by default; scale with --scale), then drives the real routes
+through the Flask test client, one virtual customer per flow:
+
+    register -> login -> /booking -> /booking_payment -> /menu add x N
+             -> /food_payment -> /my_orders -> /my_bookings
+
+and reports p50/p95/p99 latency and throughput per route. --json writes the
+same numbers to a file so runs can be compared.
+
+By default it runs against a throwaway SQLite database; pass --configured-db
+to use the backend from config.py / the environment instead (add --no-seed
+to skip seeding; the bookings it creates are left in place).
+
+    python bench/customer_flow.py --scale 0.1 --flows 200 --concurrency 4
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+import db  # noqa: E402
+
+CHUNK = 10000
+CATEGORIES = [("family", "lunch"), ("friends", "catchup"), ("business", "meeting"),
+              ("family", "birthday"), ("friends", "board_game")]
+
+
+def _insert_chunks(conn, sql, rows):
+    cursor = conn.cursor()
+    try:
+        for i in range(0, len(rows), CHUNK):
+            cursor.executemany(sql, rows[i:i + CHUNK])
+        conn.commit()
+    finally:
+        cursor.close()
+
+
+def seed(n_users, n_bookings, n_food_orders, slots, tables, items, password_hash):
+    """Fill past dates with paid bookings and their food orders."""
+    conn = db.get_pool().acquire()
+    try:
+        start = time.perf_counter()
+        cursor = conn.cursor()
+        cursor.execute("SELECT IFNULL(MAX(id), 0) FROM users")
+        last_user = cursor.fetchone()[0]
+        _insert_chunks(conn, """
+            INSERT INTO users (username, name, email, role, password, phone)
+            VALUES (%s, %s, %s, 'customer', %s, '9999999999')
+        """, [(f"seed{u}", f"Seed User {u}", f"seed{u}@example.com", password_hash)
+              for u in range(n_users)])
+        cursor.execute("SELECT id FROM users WHERE id > %s ORDER BY id", (last_user,))
+        user_ids = [row[0] for row in cursor.fetchall()]
+
+        # One booking per (date, slot, table), walking back from yesterday
+        per_day = len(slots) * len(tables)
+        yesterday = date.today() - timedelta(days=1)
+        bookings = []
+        for b in range(n_bookings):
+            day = yesterday - timedelta(days=b // per_day)
+            slot = slots[b % per_day // len(tables)]
+            u = b % n_users
+            category, subcategory = CATEGORIES[b % len(CATEGORIES)]
+            bookings.append((user_ids[u], f"Seed User {u}", f"seed{u}@example.com",
+                             "9999999999", day.isoformat(), slot, 2, tables[b % len(tables)],
+                             category, subcategory, "paid", 500))
+        cursor.execute("SELECT IFNULL(MAX(id), 0) FROM bookings")
+        last_id = cursor.fetchone()[0]
+        _insert_chunks(conn, """
+            INSERT INTO bookings (user_id, name, email, phone, date, time, guests,
+                                  table_no, category, subcategory, status, total_amount)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """, bookings)
+
+        cursor.execute("SELECT id FROM bookings WHERE id > %s ORDER BY id", (last_id,))
+        booking_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+
+        # Spread the food orders evenly, distinct items within a booking
+        per_booking, extra = divmod(n_food_orders, n_bookings)
+        orders = []
+        for b in range(n_bookings):
+            for j in range(min(per_booking + (b < extra), len(items))):
+                item = items[(b + j) % len(items)]
+                orders.append((booking_ids[b], item.name, item.price, 1 + (b + j) % 3,
+                               bookings[b][4]))
+        _insert_chunks(conn, """
+            INSERT INTO food_orders (booking_id, item_name, item_price, quantity,
+                                     food_paid, created_at)
+            VALUES (%s, %s, %s, %s, 1, %s)
+        """, orders)
+        # Order headers, as cart.py would have kept them (all lines paid)
+        headers = {}
+        for booking_id, _, price, quantity, _ in orders:
+            amount, count = headers.get(booking_id, (0, 0))
+            headers[booking_id] = (amount + price * quantity, count + quantity)
+        _insert_chunks(conn, """
+            INSERT INTO orders (booking_id, subtotal, paid_total, item_count)
+            VALUES (%s, %s, %s, %s)
+        """, [(booking_id, amount, amount, count) for booking_id, (amount, count) in headers.items()])
+        print(f"seeded {n_users:,} users, {n_bookings:,} bookings, "
+              f"{len(orders):,} food orders in {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+
+
+def _first_free_day():
+    conn = db.get_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT MAX(date) FROM bookings")
+        latest = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        conn.close()
+    tomorrow = date.today() + timedelta(days=1)
+    if latest is None:
+        return tomorrow
+    latest = date.fromisoformat(str(latest))
+    return max(tomorrow, latest + timedelta(days=1))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, label, expected, fn, *args, **kwargs):
+        start = time.perf_counter()
+        response = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[label].append(elapsed)
+            if response.status_code != expected:
+                self.errors[label] += 1
+        return response
+
+
+def run_flow(flask_app, rec, n, day, slot, table_no, item_ids, adds, password):
+    client = flask_app.test_client()
+    email = f"bench{n}.{int(time.time())}@example.com"
+    user = {"username": f"bench{n}_{int(time.time())}", "full_name": "Bench User",
+            "email": email, "phone": "9999999999", "password": password}
+    rec.call("POST /api/register", 200, client.post, "/api/register", json=user)
+    rec.call("POST /api/login", 200, client.post, "/api/login",
+             json={"email": email, "password": password})
+    rec.call("GET /booking", 200, client.get, "/booking",
+             query_string={"date": day, "time": slot})
+    rec.call("POST /booking", 302, client.post, "/booking", data={
+        "name": "Bench User", "email": email, "phone": "9999999999", "date": day,
+        "time": slot, "guests": "2", "category": "family", "subcategory": "lunch",
+        "table_no": str(table_no)})
+    rec.call("GET /booking_payment", 200, client.get, "/booking_payment")
+    rec.call("POST /booking_payment", 302, client.post, "/booking_payment")
+    rec.call("GET /menu", 200, client.get, "/menu")
+    for _ in range(adds):
+        rec.call("POST /menu add", 302, client.post, "/menu",
+                 data={"action": "add", "item_id": random.choice(item_ids)})
+    rec.call("GET /food_payment", 200, client.get, "/food_payment")
+    rec.call("POST /food_payment", 302, client.post, "/food_payment")
+    rec.call("GET /my_orders", 200, client.get, "/my_orders")
+    rec.call("GET /my_bookings", 200, client.get, "/my_bookings")
+
+
+def _percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def report(rec, wall):
+    results = {}
+    print(f"\n{'route':22} {'count':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    for label, values in rec.latencies.items():
+        values.sort()
+        row = {
+            "count": len(values),
+            "req_per_s": round(len(values) / wall, 1),
+            "p50_ms": round(_percentile(values, 50) * 1000, 2),
+            "p95_ms": round(_percentile(values, 95) * 1000, 2),
+            "p99_ms": round(_percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+            "errors": rec.errors[label],
+        }
+        results[label] = row
+        print(f"{label:22} {row['count']:7} {row['req_per_s']:8,.1f} {row['p50_ms']:8.2f} "
+              f"{row['p95_ms']:8.2f} {row['p99_ms']:8.2f} {row['max_ms']:8.2f} "
+              f"{row['errors']:6}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--food-orders", type=int, default=1000000)
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="multiply the seed volumes, e.g. 0.1 for a quick run")
+    parser.add_argument("--flows", type=int, default=200, help="virtual customers")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--adds", type=int, default=5, help="menu adds per flow")
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--configured-db", action="store_true",
+                        help="use DB_BACKEND/SQLITE_PATH/MySQL settings instead of a temp SQLite file")
+    parser.add_argument("--no-seed", action="store_true", help="skip seeding")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    config.DB_POOL_SIZE = max(config.DB_POOL_SIZE, args.concurrency + 1)
+    config.DB_POOL_TIMEOUT = 30
+    config.ACCESS_LOG = False  # per-request log lines would swamp the report
+    config.LOGIN_IP_LIMIT = 0  # every virtual customer comes from 127.0.0.1
+    if not args.configured_db:
+        config.DB_BACKEND = "sqlite"
+        config.SQLITE_PATH = os.path.join(tempfile.mkdtemp(), "customer_flow.db")
+        db.init_schema(log=lambda line: None)
+
+    from werkzeug.security import generate_password_hash
+    import app as swiftcafe
+
+    flask_app = swiftcafe.app
+    if not os.path.isdir(os.path.join(ROOT, "templates")):
+        # Templates sit next to app.py in this checkout
+        flask_app.jinja_loader.searchpath = [ROOT]
+    slots, tables = swiftcafe.ALL_SLOTS, swiftcafe.ALL_TABLES
+    catalog = swiftcafe.menu_catalog.current()
+    items = [item for group in catalog.by_category.values() for item in group]
+
+    password = "bench-password"
+    if not args.no_seed:
+        seed(max(1, int(args.users * args.scale)), max(1, int(args.bookings * args.scale)),
+             int(args.food_orders * args.scale), slots, tables, items,
+             generate_password_hash(password, config.PASSWORD_HASH_METHOD))
+
+    # Each flow books its own (date, slot, table) after every existing booking
+    first_day = _first_free_day()
+    per_day = len(slots) * len(tables)
+    seats = [((first_day + timedelta(days=n // per_day)).isoformat(),
+              slots[n % per_day // len(tables)], tables[n % len(tables)])
+             for n in range(args.flows)]
+    item_ids = [item.id for item in items]
+
+    rec = Recorder()
+    queue = list(range(args.flows))
+    queue_lock = threading.Lock()
+    failures = []
+
+    def worker():
+        while True:
+            with queue_lock:
+                if not queue:
+                    return
+                n = queue.pop()
+            try:
+                run_flow(flask_app, rec, n, *seats[n], item_ids, args.adds, password)
+            except Exception as e:
+                failures.append(e)
+
+    print(f"backend: {config.DB_BACKEND}, {args.flows} flows, concurrency {args.concurrency}")
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+
+    results = report(rec, wall)
+    total = sum(r["count"] for r in results.values())
+    print(f"\n{args.flows / wall:,.1f} flows/s, {total / wall:,.1f} requests/s "
+          f"over {wall:.1f}s; {len(failures)} flows raised")
+    if failures:
+        print("first failure:", repr(failures[0]))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"backend": config.DB_BACKEND, "flows": args.flows,
+                       "concurrency": args.concurrency, "wall_s": round(wall, 2),
+                       "routes": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Fail if any query the app runs does a full table scan.
+
+Seeds the benchmark dataset (see customer_flow.py), records every statement
+the app sends while a customer and an admin walk through the site, then
+runs EXPLAIN (SQLite: EXPLAIN QUERY PLAN) on each distinct one.
+
+A full scan is SQLite "SCAN <table>" / MySQL type=ALL, unless the query has
+a LIMIT and reads rows already in order (no temp B-tree / filesort), in
+which case it stops after LIMIT rows. The dashboard rollup aggregates are
+allowed: they read whole tables by design, at most once per ROLLUP_TTL.
+
+Exits 1 on any full scan, so it can gate CI.
+
+    python bench/explain_check.py --scale 0.1
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+import db  # noqa: E402
+import customer_flow  # noqa: E402
+
+_SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?(?: \(.*\))?$')
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+
+
+def _normalize(sql):
+    return ' '.join(sql.split())
+
+
+class _RecordingCursor:
+    def __init__(self, cursor, seen):
+        self._cursor = cursor
+        self._seen = seen
+
+    def execute(self, sql, params=()):
+        self._seen.setdefault(_normalize(sql), tuple(params or ()))
+        return self._cursor.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        seq_of_params = list(seq_of_params)
+        if seq_of_params:
+            self._seen.setdefault(_normalize(sql), tuple(seq_of_params[0]))
+        return self._cursor.executemany(sql, seq_of_params)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+@contextmanager
+def recording():
+    """Route every pooled cursor through a recorder; yields {sql: params}."""
+    seen = {}
+    plain_cursor = db.PooledConnection.cursor
+
+    def cursor(self, dictionary=False):
+        return _RecordingCursor(plain_cursor(self, dictionary), seen)
+
+    db.PooledConnection.cursor = cursor
+    try:
+        yield seen
+    finally:
+        db.PooledConnection.cursor = plain_cursor
+
+
+def walk_site(swiftcafe, flask_app, items, password, first_day):
+    """Exercise the customer, admin and maintenance code paths."""
+    slots, tables = swiftcafe.ALL_SLOTS, swiftcafe.ALL_TABLES
+    rec = customer_flow.Recorder()
+    day = first_day.isoformat()
+    customer_flow.run_flow(flask_app, rec, 0, day, slots[0], tables[0],
+                           [item.id for item in items], 3, password)
+
+    # Bookings older than ARCHIVE_AFTER_DAYS go to the archive tier, so the
+    # history and admin pages below read both
+    with flask_app.app_context():
+        import archive
+        archive.run(db.get_db(), pause=0)
+
+    # A seeded customer with a long history, paged
+    client = flask_app.test_client()
+    client.post("/api/login", json={"email": "seed0@example.com", "password": password})
+    for path in ("/my_orders", "/my_bookings"):
+        html = client.get(path).data.decode()
+        cursor = re.search(r'cursor=([\w-]+)', html)
+        if cursor:
+            client.get(f"{path}?cursor={cursor.group(1)}")
+    client.get("/api/availability", query_string={"date": day, "time": slots[0]})
+    client.post("/booking", data={
+        "name": "Seed", "email": "seed0@example.com", "phone": "9999999999", "date": day,
+        "time": slots[0], "guests": "2", "category": "family", "subcategory": "lunch",
+        "table_no": str(tables[0])})  # already taken
+    party = client.post("/api/party_bookings", json={
+        "name": "Seed", "email": "seed0@example.com", "phone": "9999999999", "date": day,
+        "start_slot": slots[1], "end_slot": slots[2], "guests": 6, "subcategory": "birthday"})
+    client.post("/contact", data={"name": "A", "email": "a@example.com",
+                                  "subject": "Hi", "message": "Hello"})
+    client.post("/feedback", data={"name": "A", "email": "a@example.com", "message": "Nice"})
+    swiftcafe.writes.flush(timeout=10)  # written by the background writer
+
+    admin = flask_app.test_client()
+    admin.post("/api/register", json={
+        "username": "explain_admin", "full_name": "Explain Admin",
+        "email": "explain.admin@example.com", "phone": "9999999999",
+        "password": password, "role": "admin"})
+    admin.post("/api/login", json={"email": "explain.admin@example.com", "password": password})
+    admin.get("/admin")
+    admin.post(f"/api/party_bookings/{party.get_json().get('party_id')}/confirm")
+    past = (date.today() - timedelta(days=30)).isoformat()
+    for kind in ("bookings", "food_orders"):
+        for args in ({}, {"date_from": past}, {"date_from": past, "date_to": day},
+                     {"status": "paid"}, {"category": "family"}, {"table": "3"},
+                     {"paid": "1"}):
+            page = admin.get(f"/api/admin/{kind}", query_string=dict(args, limit=20)).get_json()
+            if page.get("next_cursor"):
+                admin.get(f"/api/admin/{kind}",
+                          query_string=dict(args, limit=20, cursor=page["next_cursor"]))
+        admin.get(f"/admin/export/{kind}.csv", query_string={"date_from": past}).get_data()
+    # First call builds the cube; the refresh re-reads the deferred rows by id
+    for report in ("utilisation", "item_sales", "table_revenue", "guests"):
+        admin.get(f"/api/admin/analytics/{report}")
+    with flask_app.app_context():
+        swiftcafe.analytics_cube.refresh(db.get_db())
+
+    with flask_app.app_context():
+        import reservations
+        reservations.purge_expired_holds(db.get_db())
+
+
+def explain(conn, sql, params):
+    """Return (plan lines, full scan tables)."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        if config.DB_BACKEND == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            plan = [row['detail'] for row in cursor.fetchall()]
+            sorted_ = any('TEMP B-TREE FOR ORDER BY' in line for line in plan)
+            scans = [m.group(1) for m in map(_SQLITE_SCAN.match, plan) if m]
+        else:
+            cursor.execute("EXPLAIN " + sql, params)
+            rows = cursor.fetchall()
+            plan = [f"{r['table']}: type={r['type']} key={r['key']} rows={r['rows']} "
+                    f"{r['Extra'] or ''}".strip() for r in rows]
+            sorted_ = any('filesort' in (r['Extra'] or '') for r in rows)
+            scans = [r['table'] for r in rows if r['type'] == 'ALL']
+    finally:
+        cursor.close()
+    if scans and _LIMIT.search(sql) and not sorted_:
+        scans = []  # ordered read that stops at LIMIT
+    return plan, scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.1,
+                        help="fraction of the customer_flow.py seed volumes")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    parser.add_argument("--configured-db", action="store_true",
+                        help="use DB_BACKEND/SQLITE_PATH/MySQL settings instead of a temp SQLite file")
+    parser.add_argument("--no-seed", action="store_true", help="skip seeding")
+    args = parser.parse_args()
+
+    config.ACCESS_LOG = False
+    if not args.configured_db:
+        config.DB_BACKEND = "sqlite"
+        config.SQLITE_PATH = os.path.join(tempfile.mkdtemp(), "explain_check.db")
+        config.WRITE_SPOOL_DIR = os.path.join(os.path.dirname(config.SQLITE_PATH), "spool")
+        config.ANALYTICS_DIR = os.path.join(os.path.dirname(config.SQLITE_PATH), "analytics")
+        db.init_schema(log=lambda line: None)
+
+    from werkzeug.security import generate_password_hash
+    import app as swiftcafe
+    from rollups import ITEMS_SQL, TOTALS_SQL
+
+    flask_app = swiftcafe.app
+    if not os.path.isdir(os.path.join(ROOT, "templates")):
+        # Templates sit next to app.py in this checkout
+        flask_app.jinja_loader.searchpath = [ROOT]
+    catalog = swiftcafe.menu_catalog.current()
+    items = [item for group in catalog.by_category.values() for item in group]
+    password = "bench-password"
+    if not args.no_seed:
+        customer_flow.seed(int(50000 * args.scale) or 1, int(100000 * args.scale) or 1,
+                           int(1000000 * args.scale), swiftcafe.ALL_SLOTS,
+                           swiftcafe.ALL_TABLES, items, generate_password_hash(password, config.PASSWORD_HASH_METHOD))
+    conn = db.get_pool().acquire()
+    try:
+        if config.DB_BACKEND == 'sqlite':
+            cursor = conn.cursor()
+            cursor.execute("ANALYZE")
+            cursor.close()
+            conn.commit()
+    finally:
+        conn.close()
+
+    with recording() as seen:
+        walk_site(swiftcafe, flask_app, items, password, customer_flow._first_free_day())
+
+    allowed = {_normalize(TOTALS_SQL), _normalize(ITEMS_SQL)}
+    failures = 0
+    conn = db.get_pool().acquire()
+    try:
+        for sql, params in seen.items():
+            plan, scans = explain(conn, sql, params)
+            if scans and sql in allowed:
+                status = "allowed"
+            elif scans:
+                status = "FULL SCAN"
+                failures += 1
+            else:
+                status = "ok"
+            if args.verbose or status != "ok":
+                print(f"[{status}] {sql[:160]}")
+                for line in plan:
+                    print(f"      {line}")
+    finally:
+        conn.close()
+
+    print(f"{len(seen)} distinct statements checked on {config.DB_BACKEND}, "
+          f"{failures} full scan(s)")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
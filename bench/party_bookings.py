@@ -0,0 +1,99 @@
+"""Party booking benchmark: one /api/party_bookings call vs the booking form.
+
+For each party (--guests over --slots consecutive slots) it books the same
+tables twice, on different dates: once by POSTing /booking per table and
+slot, as staff do by hand, and once through /api/party_bookings. Reports the
+time per party for both.
+
+    python bench/party_bookings.py --parties 50 --guests 14 --slots 3
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+import db  # noqa: E402
+
+
+def _summary(label, seconds):
+    ms = sorted(s * 1000 for s in seconds)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{label:<24} {statistics.mean(ms):9.2f} {statistics.median(ms):9.2f} {p95:9.2f}")
+    return statistics.mean(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--parties", type=int, default=50)
+    parser.add_argument("--guests", type=int, default=14)
+    parser.add_argument("--slots", type=int, default=3, help="consecutive slots per party")
+    parser.add_argument("--configured-db", action="store_true",
+                        help="use DB_BACKEND/SQLITE_PATH/MySQL settings instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    config.ACCESS_LOG = False
+    config.LOGIN_IP_LIMIT = 0
+    if not args.configured_db:
+        config.DB_BACKEND = "sqlite"
+        config.SQLITE_PATH = os.path.join(tempfile.mkdtemp(), "party_bookings.db")
+        db.init_schema(log=lambda line: None)
+
+    import app as swiftcafe
+
+    flask_app = swiftcafe.app
+    if not os.path.isdir(os.path.join(ROOT, "templates")):
+        # Templates sit next to app.py in this checkout
+        flask_app.jinja_loader.searchpath = [ROOT]
+    slots = swiftcafe.ALL_SLOTS[:args.slots]
+    client = flask_app.test_client()
+    email = f"party.bench.{int(time.time())}@example.com"
+    client.post("/api/register", json={
+        "username": f"partybench{int(time.time())}", "full_name": "Party Bench",
+        "email": email, "phone": "9999999999", "password": "bench-password"})
+    client.post("/api/login", json={"email": email, "password": "bench-password"})
+
+    # Far enough ahead to be free in a configured database
+    first_day = date.today() + timedelta(days=3650)
+    form, bulk = [], []
+    for n in range(args.parties):
+        day_form = (first_day + timedelta(days=2 * n)).isoformat()
+        day_bulk = (first_day + timedelta(days=2 * n + 1)).isoformat()
+        party = {"name": "Party Bench", "email": email, "phone": "9999999999",
+                 "guests": args.guests, "category": "party", "subcategory": "birthday"}
+
+        start = time.perf_counter()
+        response = client.post("/api/party_bookings", json=dict(
+            party, date=day_bulk, start_slot=slots[0], end_slot=slots[-1]))
+        bulk.append(time.perf_counter() - start)
+        if response.status_code != 201:
+            sys.exit(f"party booking failed: {response.get_json()}")
+        tables = response.get_json()["tables"]
+
+        start = time.perf_counter()
+        for slot in slots:
+            for table in tables:
+                response = client.post("/booking", data=dict(
+                    party, date=day_form, time=slot, guests=table["guests"],
+                    table_no=table["table_no"]))
+                if response.status_code != 302:
+                    sys.exit(f"form booking failed: {response.status_code}")
+        form.append(time.perf_counter() - start)
+
+    bookings = len(tables) * len(slots)
+    print(f"{args.parties} parties of {args.guests} guests, {bookings} bookings each "
+          f"({len(tables)} tables x {len(slots)} slots), on {config.DB_BACKEND}\n")
+    print(f"{'ms per party':<24} {'mean':>9} {'p50':>9} {'p95':>9}")
+    sequential = _summary("POST /booking each", form)
+    together = _summary("/api/party_bookings", bulk)
+    print(f"\n{sequential / together:.1f}x faster as one party booking")
+
+
+if __name__ == "__main__":
+    main()
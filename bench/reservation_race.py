@@ -0,0 +1,133 @@
+"""Concurrent table reservation load test.
+
+Fires ``--workers`` simultaneous reservations at the same (date, slot, table)
+for ``--rounds`` rounds and asserts that exactly one wins each time, then
+measures reservations/sec with every worker booking distinct tables.
+
+By default it runs against a throwaway SQLite database; pass --configured-db
+to use the backend from config.py / the environment instead (the bookings
+it creates are left in place).
+
+    python bench/reservation_race.py --workers 50 --rounds 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+import db  # noqa: E402
+import reservations  # noqa: E402
+
+SLOTS = [
+    "10:00 AM - 12:00 PM",
+    "12:00 PM - 2:00 PM",
+    "2:00 PM - 4:00 PM",
+    "4:00 PM - 6:00 PM",
+    "6:00 PM - 8:00 PM",
+    "8:00 PM - 10:00 PM",
+]
+
+
+def _reserve(day, slot, table_no, n):
+    conn = db.get_pool().acquire()
+    try:
+        reservations.reserve_table(
+            conn, f"Load Test {n}", f"load{n}@example.com", "9999999999",
+            day, slot, 2, table_no, "friends", "other")
+        return True
+    except reservations.SlotTaken:
+        return False
+    finally:
+        conn.close()
+
+
+def _run_parallel(jobs):
+    """Start every job at once; return (results, elapsed seconds)."""
+    barrier = threading.Barrier(len(jobs))
+    results = [None] * len(jobs)
+    errors = []
+
+    def worker(i, job):
+        barrier.wait()
+        try:
+            results[i] = job()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i, job)) for i, job in enumerate(jobs)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    return results, elapsed
+
+
+def race(workers, rounds, base_day):
+    attempts = 0
+    total = 0.0
+    for r in range(rounds):
+        day = (base_day + timedelta(days=r)).isoformat()
+        jobs = [lambda n=n: _reserve(day, SLOTS[0], 1, n) for n in range(workers)]
+        results, elapsed = _run_parallel(jobs)
+        winners = sum(results)
+        assert winners == 1, f"round {r}: {winners} winners for one table"
+        attempts += workers
+        total += elapsed
+    print(f"race:       {rounds} rounds x {workers} workers, exactly one winner each round")
+    print(f"            {attempts / total:,.0f} attempts/sec")
+
+
+def throughput(workers, rounds, base_day):
+    # Distinct (date, slot, table) per job so every reservation succeeds.
+    seats = [(d, s, t) for d in range(rounds) for s in SLOTS for t in range(1, 6)]
+    seats = seats[:workers * rounds]
+    day0 = base_day + timedelta(days=rounds + 1)
+    jobs = [lambda n=n, seat=seat: _reserve((day0 + timedelta(days=seat[0])).isoformat(),
+                                            seat[1], seat[2], n)
+            for n, seat in enumerate(seats)]
+    reserved = 0
+    total = 0.0
+    for i in range(0, len(jobs), workers):
+        results, elapsed = _run_parallel(jobs[i:i + workers])
+        assert all(results), "a reservation on a free table failed"
+        reserved += len(results)
+        total += elapsed
+    print(f"throughput: {reserved} reservations on free tables")
+    print(f"            {reserved / total:,.0f} reservations/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--configured-db", action="store_true",
+                        help="use DB_BACKEND/SQLITE_PATH/MySQL settings instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    config.DB_POOL_SIZE = args.workers
+    config.DB_POOL_TIMEOUT = 30
+    config.ACCESS_LOG = False  # per-request log lines would swamp the report
+    if not args.configured_db:
+        config.DB_BACKEND = "sqlite"
+        config.SQLITE_PATH = os.path.join(tempfile.mkdtemp(), "reservation_race.db")
+        db.init_schema(log=lambda line: None)
+
+    # Far-future dates keep the run away from real bookings.
+    base_day = date.today() + timedelta(days=3650)
+    print(f"backend: {config.DB_BACKEND}")
+    race(args.workers, args.rounds, base_day)
+    throughput(args.workers, args.rounds, base_day)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Compare serving modes under concurrent availability lookups.
+
+Starts the app under each mode in turn, drives it with ``--concurrency``
+keep-alive clients for ``--duration`` seconds and prints requests/sec and
+p50/p95/p99 latency:
+
+    werkzeug  flask dev server, threaded      GET /api/availability
+    gunicorn  gthread workers (gunicorn.conf)  GET /api/availability
+    uvicorn   asgi.py async route              GET /async/availability
+
+AVAILABILITY_TTL=0 makes every request hit the database. By default the
+servers share a seeded throwaway SQLite file; pass --configured-db to use
+the backend from the environment (e.g. MySQL, where the async mode's
+advantage shows up as DB round trips get slower).
+
+    python bench/serving_modes.py --concurrency 64 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config  # noqa: E402
+import db  # noqa: E402
+
+SLOTS = [
+    "10:00 AM - 12:00 PM",
+    "12:00 PM - 2:00 PM",
+    "2:00 PM - 4:00 PM",
+    "4:00 PM - 6:00 PM",
+    "6:00 PM - 8:00 PM",
+    "8:00 PM - 10:00 PM",
+]
+
+DAYS = 60
+
+
+def _commands(port, workers):
+    return {
+        "werkzeug": ([sys.executable, "-c",
+                      f"import app; app.create_app().run(port={port}, threaded=True)"],
+                     "/api/availability"),
+        "gunicorn": (["gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}",
+                      "-w", str(workers), "app:create_app()"],
+                     "/api/availability"),
+        "uvicorn": (["uvicorn", "asgi:app", "--port", str(port), "--workers", str(workers),
+                     "--no-access-log", "--log-level", "warning"],
+                    "/async/availability"),
+    }
+
+
+def seed(base_day):
+    """Book roughly half the tables over DAYS days."""
+    conn = db.get_pool().acquire()
+    cursor = conn.cursor()
+    rows = [(f"Bench {d}", "bench@example.com", "9999999999",
+             (base_day + timedelta(days=d)).isoformat(), slot, 2, table_no,
+             "friends", "other", "confirmed", 500)
+            for d in range(DAYS) for s, slot in enumerate(SLOTS)
+            for table_no in range(1, 6) if (d + s + table_no) % 2]
+    cursor.executemany("""
+        INSERT INTO bookings (name, email, phone, date, time, guests, table_no,
+                              category, subcategory, status, total_amount)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+    """, rows)
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def _wait_ready(port, proc, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def _client(port, paths, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    i = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode())
+            head = (await reader.readuntil(b"\r\n\r\n")).lower()
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not head.startswith((b"http/1.1 200", b"http/1.0 200")):
+                errors.append(head.split(b"\r\n", 1)[0].decode())
+            if b"connection: close" in head:
+                # The werkzeug dev server does not keep connections alive
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    finally:
+        writer.close()
+
+
+async def _drive(port, paths, concurrency, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    # Stagger the clients so they do not all request the same date at once
+    clients = [_client(port, paths[n:] + paths[:n], deadline, latencies, errors)
+               for n in range(concurrency)]
+    await asyncio.gather(*clients)
+    return latencies, errors
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def run_mode(name, command, path, port, env, base_day, args):
+    paths = [f"{path}?date={(base_day + timedelta(days=d)).isoformat()}"
+             f"&time={SLOTS[d % len(SLOTS)].replace(' ', '%20')}"
+             for d in range(DAYS)]
+    # Server logs go to a file: a full pipe would stall the server
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen(command, cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=log)
+    try:
+        _wait_ready(port, proc)
+        asyncio.run(_drive(port, paths, args.concurrency, 1))  # warm up
+        latencies, errors = asyncio.run(
+            _drive(port, paths, args.concurrency, args.duration))
+    except Exception as e:
+        proc.kill()
+        proc.wait()
+        log.seek(0)
+        err = log.read().decode(errors="replace").strip().splitlines()[-3:]
+        print(f"{name:9} failed: {e} {' / '.join(err)}")
+        return
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+    latencies.sort()
+    ms = [_percentile(latencies, p) * 1000 for p in (50, 95, 99)]
+    print(f"{name:9} {len(latencies) / args.duration:9,.0f} req/s   "
+          f"p50 {ms[0]:7.2f} ms   p95 {ms[1]:7.2f} ms   p99 {ms[2]:7.2f} ms   "
+          f"errors {len(errors)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, default=2,
+                        help="worker processes for gunicorn and uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", default="werkzeug,gunicorn,uvicorn")
+    parser.add_argument("--configured-db", action="store_true",
+                        help="use DB_BACKEND/SQLITE_PATH/MySQL settings instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    env = dict(os.environ, AVAILABILITY_TTL="0", ACCESS_LOG="0")
+    tmpdir = None
+    # Far-future dates keep the run away from real bookings.
+    base_day = date.today() + timedelta(days=3650)
+    if not args.configured_db:
+        tmpdir = tempfile.mkdtemp()
+        config.DB_BACKEND = env["DB_BACKEND"] = "sqlite"
+        config.SQLITE_PATH = env["SQLITE_PATH"] = os.path.join(tmpdir, "serving_modes.db")
+        db.init_schema(log=lambda line: None)
+        seed(base_day)
+
+    print(f"backend: {config.DB_BACKEND}, concurrency {args.concurrency}, "
+          f"{args.workers} workers, {config.WEB_THREADS} threads/worker, {args.duration:g}s")
+    commands = _commands(args.port, args.workers)
+    try:
+        for name in args.modes.split(","):
+            command, path = commands[name]
+            run_mode(name, command, path, args.port, env, base_day, args)
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class UserCache:
+    """LRU + TTL cache of one value per user, filled by a loader on a miss.
+
+    Write paths call invalidate(user_id) when that user's data changes; the
+    TTL bounds staleness from writes made by other worker processes. A TTL
+    of 0 turns the cache off.
+    """
+
+    def __init__(self, ttl, max_users):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        # Bumped by invalidate(); a load that raced an invalidation is not stored
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, load):
+        """Return the cached value for ``user_id``, calling ``load()`` on a miss."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            epoch = self._epoch
+
+        page = load()
+
+        with self._lock:
+            if self.ttl > 0 and self._epoch == epoch:
+                self._entries[user_id] = (now, page)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return page
+
+    def invalidate(self, user_id):
+        if user_id is None:
+            return
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._epoch += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch += 1
+
+    def stats(self):
+        with self._lock:
+            return {'users': len(self._entries), 'hits': self.hits, 'misses': self.misses}
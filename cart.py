@@ -0,0 +1,267 @@
+import config
+
+# Cart = the food_orders rows of one booking. A batch of line-item changes is
+# applied in a single transaction: one read, one multi-row upsert, one
+# cleanup delete and one re-read, however many items the batch touches.
+#
+# Prices always come from the menu catalog, never from the client; unpaid
+# lines are re-priced whenever they change.
+#
+# Paid lines are never changed. A cart has at most one unpaid line per item
+# (the unique key covers unpaid lines only); ordering more of an item that
+# was already paid for opens a new unpaid line, and paying turns the unpaid
+# lines into paid ones.
+#
+# Food can only be ordered and paid for on a confirmed booking: an unpaid
+# table hold may expire and be deleted (see reservations.py), cart and all.
+#
+# Each cart also has an order header (the orders table) holding its subtotal,
+# paid total and item count, so pages read totals with one primary-key
+# lookup. Every change and payment rewrites the header in the same
+# transaction as the lines. The first statement of that transaction locks
+# (or creates) the header row, so concurrent changes to one cart take turns
+# and the header always matches the lines.
+
+UPSERT = {
+    'mysql': """
+        INSERT INTO food_orders (booking_id, item_name, item_price, food_paid, quantity)
+        VALUES (%s, %s, %s, 0, %s)
+        ON DUPLICATE KEY UPDATE quantity = quantity + VALUES(quantity),
+            item_price = VALUES(item_price)
+    """,
+    'sqlite': """
+        INSERT INTO food_orders (booking_id, item_name, item_price, food_paid, quantity)
+        VALUES (%s, %s, %s, 0, %s)
+        ON CONFLICT(booking_id, item_name) WHERE food_paid = 0
+        DO UPDATE SET quantity = quantity + excluded.quantity, item_price = excluded.item_price
+    """,
+}
+
+
+LOCK_HEADER = {
+    'mysql': "INSERT INTO orders (booking_id) VALUES (%s) ON DUPLICATE KEY UPDATE booking_id = booking_id",
+    'sqlite': "INSERT INTO orders (booking_id) VALUES (%s) ON CONFLICT(booking_id) DO UPDATE SET booking_id = booking_id",
+}
+
+SAVE_HEADER = "UPDATE orders SET subtotal=%s, paid_total=%s, item_count=%s WHERE booking_id=%s"
+
+HEADER = "SELECT subtotal, paid_total, item_count FROM orders WHERE booking_id=%s"
+
+PAY_LINES = "UPDATE food_orders SET food_paid=1 WHERE booking_id=%s AND food_paid=0"
+
+PAY_HEADER = "UPDATE orders SET paid_total = paid_total + %s WHERE booking_id=%s"
+
+# The charge at payment: the unpaid lines, priced, read under the header lock
+DUE = """
+    SELECT COALESCE(SUM(item_price * quantity), 0) AS due FROM food_orders
+    WHERE booking_id=%s AND food_paid=0
+"""
+
+
+TICKET_BOOKING = "SELECT table_no, date, time FROM bookings WHERE id=%s"
+
+CONFIRMED = "SELECT id FROM bookings WHERE id=%s AND status <> 'pending'"
+
+
+LOAD = """
+    SELECT id, item_name, item_price, quantity, food_paid FROM food_orders
+    WHERE booking_id=%s ORDER BY id
+"""
+
+DELETE_EMPTY = "DELETE FROM food_orders WHERE booking_id=%s AND food_paid=0 AND quantity <= 0"
+
+
+class CartError(ValueError):
+    pass
+
+
+class BookingNotConfirmed(CartError):
+    pass
+
+
+def load(conn, booking_id):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(LOAD, (booking_id,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def require_confirmed(conn, booking_id):
+    """Raise BookingNotConfirmed unless the table booking has been paid."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CONFIRMED, (booking_id,))
+        if cursor.fetchone() is None:
+            raise BookingNotConfirmed("Pay for the table booking before ordering food")
+    finally:
+        cursor.close()
+
+
+def total(rows):
+    return sum(row['quantity'] * float(row['item_price']) for row in rows)
+
+
+def summarize(rows):
+    """Header totals for a cart's lines."""
+    return {'subtotal': total(rows),
+            'paid_total': total(row for row in rows if row['food_paid']),
+            'due': total(row for row in rows if not row['food_paid']),
+            'item_count': sum(row['quantity'] for row in rows)}
+
+
+def header_params(booking_id, summary):
+    return (summary['subtotal'], summary['paid_total'], summary['item_count'], booking_id)
+
+
+def header(row):
+    """Totals from a HEADER row (None: the booking has no cart yet)."""
+    if row is None:
+        return {'subtotal': 0.0, 'paid_total': 0.0, 'due': 0.0, 'item_count': 0}
+    subtotal, paid_total = float(row['subtotal']), float(row['paid_total'])
+    return {'subtotal': subtotal, 'paid_total': paid_total, 'due': subtotal - paid_total,
+            'item_count': int(row['item_count'])}
+
+
+def totals(conn, booking_id):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(HEADER, (booking_id,))
+        return header(cursor.fetchone())
+    finally:
+        cursor.close()
+
+
+def _net_deltas(rows, changes, catalog):
+    """Collapse a batch of changes into {item_name: (price, delta)}; the
+    deltas apply to the unpaid line of each item."""
+    by_id = {str(row['id']): row for row in rows}
+    by_name = {row['item_name']: row for row in rows}
+    unpaid = {row['item_name']: row['quantity'] for row in rows if not row['food_paid']}
+    paid = {row['item_name'] for row in rows if row['food_paid']}
+    net = {}
+    for change in changes:
+        if not isinstance(change, dict):
+            raise CartError("each change must be an object")
+        if change.get('order_id') is not None:
+            row = by_id.get(str(change['order_id']))
+            if row is None:
+                raise CartError(f"order {change['order_id']} is not in this cart")
+            name = row['item_name']
+            if row['food_paid'] and (change.get('remove') or _delta(change) < 0):
+                raise CartError(f"{name} is already paid for")
+        elif change.get('item_id') or change.get('item_name'):
+            item = catalog.lookup(change.get('item_id'), change.get('item_name'))
+            if item is not None:
+                name = item.name
+            elif change.get('item_name') in by_name:
+                # Item since removed from the menu; it can still be edited
+                name = change['item_name']
+            else:
+                raise CartError("unknown menu item")
+        else:
+            raise CartError("each change needs an item_id, item_name or order_id")
+
+        item = catalog.by_name.get(name)
+        price = item.price if item is not None else by_name[name]['item_price']
+        current = unpaid.get(name, 0)
+        _, pending = net.get(name, (price, 0))
+        if change.get('remove'):
+            if current + pending <= 0 and name in paid:
+                raise CartError(f"{name} is already paid for")
+            delta = -(current + pending)
+        else:
+            delta = _delta(change)
+        if current + pending + delta < 0 and name in paid:
+            raise CartError(f"{name} is already paid for")
+        net[name] = (price, pending + delta)
+    return net
+
+
+def _delta(change):
+    try:
+        return int(change.get('delta', 1))
+    except (TypeError, ValueError):
+        raise CartError("delta must be a whole number")
+
+
+def plan_upserts(booking_id, before, changes, catalog):
+    """Turn a batch of changes into UPSERT parameter rows.
+
+    Each change is ``{"item_id": ..., "delta": n}``, ``{"order_id": ...,
+    "delta": n}`` or either form with ``"remove": true``; ``item_name`` is
+    accepted in place of ``item_id``. Raises CartError on invalid input,
+    and for any change that would take away paid quantity.
+    """
+    net = _net_deltas(before, changes, catalog)
+    existing = {row['item_name'] for row in before if not row['food_paid']}
+    upserts = []
+    for name, (price, delta) in net.items():
+        if delta == 0 or (delta < 0 and name not in existing):
+            continue
+        upserts.append((booking_id, name, price, delta))
+    return upserts
+
+
+def apply_changes(conn, booking_id, changes, catalog):
+    """Apply a batch of cart changes (see plan_upserts) atomically.
+
+    Returns ``(before, after)`` cart rows; rolls back on any error.
+    """
+    cursor = conn.cursor()
+    try:
+        require_confirmed(conn, booking_id)
+        cursor.execute(LOCK_HEADER[config.DB_BACKEND], (booking_id,))
+        before = load(conn, booking_id)
+        upserts = plan_upserts(booking_id, before, changes, catalog)
+        if upserts:
+            cursor.executemany(UPSERT[config.DB_BACKEND], upserts)
+            cursor.execute(DELETE_EMPTY, (booking_id,))
+        after = load(conn, booking_id)
+        cursor.execute(SAVE_HEADER, header_params(booking_id, summarize(after)))
+        conn.commit()
+        return before, after
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def pay(conn, booking_id):
+    """Mark the cart's unpaid lines paid; return the amount that was due."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        require_confirmed(conn, booking_id)
+        cursor.execute(LOCK_HEADER[config.DB_BACKEND], (booking_id,))
+        cursor.execute(DUE, (booking_id,))
+        due = float(cursor.fetchone()['due'])
+        if due > 0:
+            cursor.execute(PAY_LINES, (booking_id,))
+            cursor.execute(PAY_HEADER, (due, booking_id))
+        conn.commit()
+        return due
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def ticket(booking_id, booking, rows, change):
+    """Kitchen ticket for a cart; ``booking`` is a TICKET_BOOKING row."""
+    summary = summarize(rows)
+    if not rows:
+        status = 'empty'
+    elif summary['paid_total'] >= summary['subtotal']:
+        status = 'paid'
+    else:
+        status = 'open'
+    return {'booking_id': booking_id, 'change': change, 'status': status,
+            'table_no': booking['table_no'] if booking else None,
+            'date': str(booking['date']) if booking else None,
+            'time': booking['time'] if booking else None,
+            'items': [{'item_name': row['item_name'], 'quantity': row['quantity'],
+                       'food_paid': bool(row['food_paid'])} for row in rows],
+            'subtotal': summary['subtotal'], 'paid_total': summary['paid_total']}
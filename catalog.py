@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+import config
+
+# The menu lives in menu_catalog.json and is loaded into an immutable
+# Catalog. CatalogStore re-checks the file's mtime at most every
+# CATALOG_RELOAD_INTERVAL seconds and swaps in a new Catalog when it changes,
+# so price edits go live without a restart.
+
+log = logging.getLogger('swiftcafe.catalog')
+
+MenuItem = namedtuple('MenuItem', 'id name price image category')
+
+
+class CatalogError(ValueError):
+    pass
+
+
+class Catalog:
+    def __init__(self, doc, digest):
+        categories = {}
+        by_id = {}
+        by_name = {}
+        for category in doc.get('categories', []):
+            items = []
+            for raw in category['items']:
+                item = MenuItem(raw['id'], raw['name'], raw['price'], raw['image'],
+                                category['name'])
+                if item.id in by_id:
+                    raise CatalogError(f"duplicate menu item id {item.id!r}")
+                if not isinstance(item.price, (int, float)) or item.price < 0:
+                    raise CatalogError(f"invalid price for {item.id!r}")
+                by_id[item.id] = item
+                by_name[item.name] = item
+                items.append(item)
+            categories[category['name']] = tuple(items)
+
+        self.by_category = MappingProxyType(categories)
+        self.by_id = MappingProxyType(by_id)
+        self.by_name = MappingProxyType(by_name)
+        # Changes whenever the file content does; used as a cache key.
+        self.version = f"{doc.get('version', 0)}-{digest[:12]}"
+
+    def get(self, item_id):
+        return self.by_id.get(item_id)
+
+    def lookup(self, item_id=None, item_name=None):
+        """Find an item by id, falling back to its display name."""
+        if item_id:
+            return self.by_id.get(item_id)
+        if item_name:
+            return self.by_name.get(item_name)
+        return None
+
+
+def load(path):
+    with open(path, 'rb') as f:
+        raw = f.read()
+    try:
+        doc = json.loads(raw)
+        return Catalog(doc, hashlib.sha256(raw).hexdigest())
+    except (ValueError, KeyError, TypeError) as e:
+        raise CatalogError(f"{path}: {e}")
+
+
+class CatalogStore:
+    def __init__(self, path=None, check_interval=None):
+        self.path = path or config.CATALOG_PATH
+        self.check_interval = (config.CATALOG_RELOAD_INTERVAL
+                               if check_interval is None else check_interval)
+        self._lock = threading.Lock()
+        self._mtime = os.stat(self.path).st_mtime
+        self._catalog = load(self.path)
+        self._checked_at = time.monotonic()
+        self._listeners = []
+
+    def on_change(self, listener):
+        """Call ``listener(catalog)`` whenever a new catalog is swapped in."""
+        self._listeners.append(listener)
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            with self._lock:
+                if now - self._checked_at >= self.check_interval:
+                    self._checked_at = now
+                    self._maybe_reload()
+        return self._catalog
+
+    def _maybe_reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError as e:
+            log.warning("Menu catalog unavailable, keeping last version: %s", e)
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self._catalog = load(self.path)
+            self._mtime = mtime
+        except (OSError, CatalogError) as e:
+            # A half-saved or broken file must not take the menu down
+            log.error("Menu catalog reload failed, keeping last version: %s", e)
+            return
+        for listener in self._listeners:
+            try:
+                listener(self._catalog)
+            except Exception:
+                log.exception("Menu catalog change listener failed")
@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+import time
+import uuid
+
+import config
+
+# Cross-worker cache invalidation. Every worker process keeps its own caches
+# (availability, dashboard rollups, recent orders, profiles, rendered
+# pages). A write path updates its own worker's caches directly and
+# publishes which entries went stale, as (namespace, key) rows appended to
+# the cache_invalidations table; key None means the whole namespace.
+#
+# At the start of a request, at most every COHERENCE_INTERVAL seconds, each
+# worker reads the rows past the last id it has seen (a primary-key range
+# read) and hands the ones other processes wrote to the callbacks subscribed
+# for their namespace. The TTLs of the caches stay as a backstop.
+#
+# A row can commit after one with a higher id, so each poll re-reads the
+# last few ids it has passed and skips those already applied. Rows are kept
+# COHERENCE_RETAIN seconds; a worker that has not polled for half that long
+# (or has just started) cannot know what it missed and clears every
+# namespace instead.
+
+PUBLISH = """
+    INSERT INTO cache_invalidations (namespace, cache_key, origin, created_at)
+    VALUES (%s, %s, %s, %s)
+"""
+POLL = """
+    SELECT id, namespace, cache_key, origin FROM cache_invalidations
+    WHERE id > %s ORDER BY id LIMIT %s
+"""
+LATEST = "SELECT MAX(id) AS id FROM cache_invalidations"
+PURGE = "DELETE FROM cache_invalidations WHERE created_at < %s"
+
+# Ids below the last one seen that are read again (see above)
+OVERLAP = 32
+# More new rows than this in one poll: clear everything and skip ahead
+POLL_LIMIT = 1000
+
+log = logging.getLogger('swiftcafe.coherence')
+
+
+class CacheBus:
+    def __init__(self, interval=None, retain=None):
+        self.interval = config.COHERENCE_INTERVAL if interval is None else interval
+        self.retain = config.COHERENCE_RETAIN if retain is None else retain
+        self._subscribers = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self.origin = uuid.uuid4().hex[:16]
+        self._last_id = None
+        self._seen = set()
+        self._polled_at = self._purged_at = time.monotonic()
+        self._stats = {'published': 0, 'applied': 0, 'resyncs': 0}
+
+    def _check_pid(self):
+        # A forked worker starts over with an identity of its own
+        if self._pid != os.getpid():
+            self._reset()
+
+    # --- namespaces ---
+    def subscribe(self, namespace, callback):
+        """Call ``callback(key)`` when another process invalidates ``key``
+        (None: everything) in ``namespace``."""
+        self._subscribers.setdefault(namespace, []).append(callback)
+
+    def version(self, namespace):
+        """Bumped whenever ``namespace`` is invalidated; for cache keys."""
+        return self._versions.setdefault(namespace, 0)
+
+    def _invalidate(self, namespace, key):
+        self._versions[namespace] = self._versions.get(namespace, 0) + 1
+        for callback in self._subscribers.get(namespace, ()):
+            try:
+                callback(key)
+            except Exception:
+                log.exception("Cache invalidation for %s failed", namespace)
+
+    def _invalidate_all(self):
+        for namespace in set(self._subscribers) | set(self._versions):
+            self._invalidate(namespace, None)
+
+    # --- publishing ---
+    def rows(self, *invalidations):
+        """PUBLISH parameters for (namespace, key) pairs."""
+        self._check_pid()
+        self._stats['published'] += len(invalidations)
+        created = int(time.time())
+        return [(namespace, None if key is None else str(key), self.origin, created)
+                for namespace, key in invalidations]
+
+    def publish(self, conn, *invalidations):
+        """Tell the other workers about (namespace, key) pairs. Commits; call
+        after the write itself has committed. Failures are only logged."""
+        if not config.COHERENCE:
+            return
+        cursor = conn.cursor()
+        try:
+            cursor.executemany(PUBLISH, self.rows(*invalidations))
+            conn.commit()
+        except Exception:
+            log.exception("Publishing cache invalidations failed")
+            conn.rollback()
+        finally:
+            cursor.close()
+
+    # --- polling ---
+    def due(self):
+        return config.COHERENCE and (self._pid != os.getpid() or self._last_id is None
+                                     or time.monotonic() - self._polled_at >= self.interval)
+
+    def query(self):
+        """(sql, params) of the next poll; its rows go to apply()."""
+        self._check_pid()
+        if self._last_id is None or time.monotonic() - self._polled_at > self.retain / 2:
+            self._last_id = None
+            return LATEST, ()
+        return POLL, (max(0, self._last_id - OVERLAP), POLL_LIMIT)
+
+    def apply(self, rows):
+        with self._lock:
+            self._polled_at = time.monotonic()
+            if self._last_id is None or len(rows) >= POLL_LIMIT:
+                # Starting out, or too far behind: drop everything
+                self._last_id = (rows[-1]['id'] if rows else None) or 0
+                self._seen = set()
+                self._stats['resyncs'] += 1
+                self._invalidate_all()
+                return
+            for row in rows:
+                if row['id'] in self._seen:
+                    continue
+                self._seen.add(row['id'])
+                self._last_id = max(self._last_id, row['id'])
+                if row['origin'] != self.origin:
+                    self._stats['applied'] += 1
+                    self._invalidate(row['namespace'], row['cache_key'])
+            self._seen = {i for i in self._seen if i > self._last_id - OVERLAP}
+
+    def purge_query(self):
+        """(sql, params) deleting expired rows, when due (else None)."""
+        now = time.monotonic()
+        if now - self._purged_at < self.retain / 4:
+            return None
+        self._purged_at = now
+        return PURGE, (int(time.time() - self.retain),)
+
+    def poll(self, conn):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(*self.query())
+            self.apply(cursor.fetchall())
+            purge = self.purge_query()
+            if purge:
+                cursor.execute(*purge)
+                conn.commit()
+        finally:
+            cursor.close()
+
+    def poll_if_due(self, get_conn):
+        if self.due():
+            try:
+                self.poll(get_conn())
+            except Exception:
+                log.exception("Polling cache invalidations failed")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, last_id=self._last_id or 0)
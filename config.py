@@ -0,0 +1,178 @@
+import os
+
+# --- Database ---
+# DB_BACKEND is "mysql" (production) or "sqlite" (local runs / load tests).
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql")
+DB_HOST = os.environ.get("DB_HOST", "localhost")
+DB_USER = os.environ.get("DB_USER", "root")
+DB_PASSWORD = os.environ.get("DB_PASSWORD", "Blackjk")
+DB_NAME = os.environ.get("DB_NAME", "swiftcafe")
+# Separate from the legacy swiftcafe.db/users.db files, whose users table
+# predates the current schema.
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "swiftcafe_local.db")
+
+# --- Connection pool ---
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "5"))
+# Idle connections older than this are pinged before being handed out.
+DB_POOL_PING_AFTER = float(os.environ.get("DB_POOL_PING_AFTER", "30"))
+
+# --- Booking availability index ---
+# Cached per-date occupancy is reloaded after this many seconds so writes
+# made by other worker processes show up.
+AVAILABILITY_TTL = float(os.environ.get("AVAILABILITY_TTL", "60"))
+AVAILABILITY_MAX_DATES = int(os.environ.get("AVAILABILITY_MAX_DATES", "400"))
+
+# --- Reservations ---
+# Unpaid bookings hold their table for this long before it is released.
+HOLD_MINUTES = int(os.environ.get("HOLD_MINUTES", "15"))
+
+# --- Admin dashboard ---
+# Rollups are recomputed from the database at most this often (seconds).
+ROLLUP_TTL = float(os.environ.get("ROLLUP_TTL", "300"))
+
+# --- Payment QR codes ---
+QR_CACHE_SIZE = int(os.environ.get("QR_CACHE_SIZE", "256"))
+QR_CACHE_TTL = float(os.environ.get("QR_CACHE_TTL", "3600"))
+# 1 embeds QR codes as base64 data URIs instead of linking /qr/<token>.png.
+QR_INLINE = os.environ.get("QR_INLINE", "0") == "1"
+
+# --- Menu catalog ---
+CATALOG_PATH = os.environ.get(
+    "CATALOG_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "menu_catalog.json"))
+# How often (seconds) to check the catalog file for edits.
+CATALOG_RELOAD_INTERVAL = float(os.environ.get("CATALOG_RELOAD_INTERVAL", "5"))
+
+# --- Customer history ---
+# First /my_orders page per user, cached this long (seconds); 0 disables.
+RECENT_ORDERS_TTL = float(os.environ.get("RECENT_ORDERS_TTL", "300"))
+RECENT_ORDERS_MAX_USERS = int(os.environ.get("RECENT_ORDERS_MAX_USERS", "10000"))
+
+# --- Serving (gunicorn.conf.py, asgi.py) ---
+# Worker processes; 0 = 2 x CPU cores + 1.
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", "0"))
+# Request threads per worker for the Flask (WSGI) routes. Keep DB_POOL_SIZE
+# at least this large so a request never waits on the pool.
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "8"))
+# Connections per worker process for the async routes.
+AIO_POOL_SIZE = int(os.environ.get("AIO_POOL_SIZE", "20"))
+
+# --- Instrumentation ---
+# "json" (one object per line) or "text".
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# One log line per request with its timing and query count.
+ACCESS_LOG = os.environ.get("ACCESS_LOG", "1") == "1"
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "100"))
+# A request running the same statement this many times is logged as a likely N+1.
+NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", "10"))
+# When set, /metrics requires "Authorization: Bearer <token>".
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Admins can add ?__profile=1 (cProfile) or ?__profile=sample to a request.
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "1") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.005"))
+
+# --- Passwords and login limits ---
+# werkzeug hash method with its cost, e.g. "scrypt:32768:8:1" or
+# "pbkdf2:sha256:600000". Changing it rehashes each password at its next login.
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+# Hashing processes per worker; 0 hashes on the request thread.
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", "2"))
+# Hash jobs allowed to queue per worker, and how long (seconds) a request
+# waits for a place before getting a 503.
+HASH_MAX_PENDING = int(os.environ.get("HASH_MAX_PENDING", "16"))
+HASH_QUEUE_TIMEOUT = float(os.environ.get("HASH_QUEUE_TIMEOUT", "2"))
+# Login/register attempts per client IP, and failed logins per account, per
+# window (seconds). A limit of 0 turns that check off.
+LOGIN_IP_LIMIT = int(os.environ.get("LOGIN_IP_LIMIT", "30"))
+LOGIN_IP_WINDOW = float(os.environ.get("LOGIN_IP_WINDOW", "60"))
+LOGIN_ACCOUNT_LIMIT = int(os.environ.get("LOGIN_ACCOUNT_LIMIT", "5"))
+LOGIN_ACCOUNT_WINDOW = float(os.environ.get("LOGIN_ACCOUNT_WINDOW", "300"))
+# Reverse proxies in front of the app; their X-Forwarded-For gives the client IP.
+PROXY_HOPS = int(os.environ.get("PROXY_HOPS", "0"))
+
+# --- Sessions ---
+# "db" (sessions table, shared by every worker) or "memory" (one process only).
+SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "db")
+# Sessions not used for this long (seconds) expire.
+SESSION_TTL = int(os.environ.get("SESSION_TTL", str(7 * 24 * 3600)))
+SESSION_MAX_ENTRIES = int(os.environ.get("SESSION_MAX_ENTRIES", "100000"))
+
+# --- User profiles ---
+# Logged-in users' name/email/phone, cached per user this long (seconds).
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", "60"))
+PROFILE_CACHE_MAX_USERS = int(os.environ.get("PROFILE_CACHE_MAX_USERS", "10000"))
+
+# --- Contact/feedback writes ---
+# Contact messages and feedback are queued and inserted in batches by a
+# background thread. Past WRITE_QUEUE_SIZE waiting rows, submissions are refused.
+WRITE_QUEUE_SIZE = int(os.environ.get("WRITE_QUEUE_SIZE", "1000"))
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", "200"))
+# Seconds the writer waits for more rows before inserting a batch.
+WRITE_FLUSH_INTERVAL = float(os.environ.get("WRITE_FLUSH_INTERVAL", "0.1"))
+# Queued rows are also appended here, so a restart or DB outage loses none.
+WRITE_SPOOL_DIR = os.environ.get("WRITE_SPOOL_DIR", "spool")
+# fsync each row to disk (survives a machine crash, not just a process one).
+WRITE_SPOOL_FSYNC = os.environ.get("WRITE_SPOOL_FSYNC", "0") == "1"
+
+# --- Static assets ---
+# `flask --app app build-assets` writes resized, fingerprinted and
+# precompressed copies of the static folder here; see assets.py.
+ASSET_BUILD_DIR = os.environ.get(
+    "ASSET_BUILD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "dist"))
+# Image widths (px) to build; an image is never made wider than it is.
+ASSET_WIDTHS = tuple(int(w) for w in os.environ.get("ASSET_WIDTHS", "120,240,480").split(","))
+# gzip level for rendered pages and other text responses; 0 leaves
+# compression to the proxy. Smaller bodies (bytes) are sent as they are.
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", "6"))
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+
+# --- Page cache ---
+# Public pages (/, /about) and the menu grid are rendered once per worker and
+# version; 0 renders every request. Off in debug mode.
+PAGE_CACHE = os.environ.get("PAGE_CACHE", "1") == "1"
+# Browser cache lifetime (seconds) of cached pages; 0 = revalidate with the ETag.
+PAGE_MAX_AGE = int(os.environ.get("PAGE_MAX_AGE", "0"))
+
+# --- Floor model ---
+# Tables, seats, combinable tables and opening hours per branch (see
+# floor.py); read at startup. This server takes bookings for FLOOR_BRANCH.
+FLOOR_PATH = os.environ.get(
+    "FLOOR_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "floor.json"))
+FLOOR_BRANCH = os.environ.get("FLOOR_BRANCH", "main")
+
+# --- Kitchen tickets ---
+# Cart changes and payments are pushed to kitchen displays (/kitchen) as they
+# happen. Each worker keeps the newest EVENT_REPLAY for displays reconnecting.
+EVENT_REPLAY = int(os.environ.get("EVENT_REPLAY", "500"))
+# Open streams per worker; each one holds a server thread.
+EVENT_MAX_LISTENERS = int(os.environ.get("EVENT_MAX_LISTENERS", "4"))
+# Seconds between keep-alive comments on an idle stream.
+EVENT_HEARTBEAT = float(os.environ.get("EVENT_HEARTBEAT", "15"))
+
+# --- Analytics ---
+# Columnar copy of settled bookings and food orders behind the admin
+# analytics reports (see analytics.py), refreshed at most this often (seconds).
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", "analytics")
+ANALYTICS_REFRESH = float(os.environ.get("ANALYTICS_REFRESH", "60"))
+# Rows read per extraction query.
+ANALYTICS_CHUNK = int(os.environ.get("ANALYTICS_CHUNK", "50000"))
+
+# --- Archive ---
+# `flask --app app archive` moves bookings dated more than ARCHIVE_AFTER_DAYS
+# ago, with their food orders, to the archive tables (see archive.py);
+# ARCHIVE_CHUNK bookings per transaction, ARCHIVE_PAUSE seconds apart.
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_CHUNK = int(os.environ.get("ARCHIVE_CHUNK", "500"))
+ARCHIVE_PAUSE = float(os.environ.get("ARCHIVE_PAUSE", "0.05"))
+
+# --- Cache coherence ---
+# Workers tell each other which cached entries a write made stale through
+# the cache_invalidations table (see coherence.py), read at most every
+# COHERENCE_INTERVAL seconds. 0 leaves each worker to its cache TTLs.
+COHERENCE = os.environ.get("COHERENCE", "1") == "1"
+COHERENCE_INTERVAL = float(os.environ.get("COHERENCE_INTERVAL", "1"))
+# Seconds invalidations are kept; a worker idle for half as long clears all.
+COHERENCE_RETAIN = float(os.environ.get("COHERENCE_RETAIN", "600"))
@@ -0,0 +1,391 @@
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask import g
+
+import config
+
+try:
+    import mysql.connector
+    _MYSQL_INTEGRITY = (mysql.connector.IntegrityError,)
+except ImportError:  # SQLite-only installs
+    mysql = None
+    _MYSQL_INTEGRITY = ()
+
+# Catch this instead of a driver-specific class so routes work on both backends.
+IntegrityError = (sqlite3.IntegrityError,) + _MYSQL_INTEGRITY
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+# --- SQLite backend ---
+# Thin adapter so app.py can keep MySQL-style SQL (%s placeholders, NOW())
+# and mysql.connector's cursor(dictionary=True) calls.
+class _SQLiteCursor:
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip([c[0] for c in self._cursor.description], row))
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace('%s', '?'), params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._cursor.executemany(sql.replace('%s', '?'), seq_of_params)
+        return self
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size or self._cursor.arraysize)
+        return [self._row(r) for r in rows]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def __iter__(self):
+        for row in self._cursor:
+            yield self._row(row)
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, timeout=config.DB_POOL_TIMEOUT,
+                                     check_same_thread=False)
+        self._conn.create_function(
+            "NOW", 0, lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        # WAL lets readers run alongside a writer; NORMAL sync is durable
+        # across app crashes in WAL mode and avoids an fsync per commit.
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def cursor(self, dictionary=False):
+        return _SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def _connect():
+    if config.DB_BACKEND == 'sqlite':
+        return _SQLiteConnection(config.SQLITE_PATH)
+    if mysql is None:
+        raise RuntimeError("mysql-connector-python is required for DB_BACKEND=mysql")
+    return mysql.connector.connect(
+        host=config.DB_HOST,
+        user=config.DB_USER,
+        password=config.DB_PASSWORD,
+        database=config.DB_NAME,
+        # Buffer results so a fetchone() never leaves rows unread on a
+        # connection that goes back to the pool.
+        buffered=True,
+    )
+
+
+def _ping(raw):
+    cursor = raw.cursor()
+    try:
+        cursor.execute("SELECT 1")
+        cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+# --- Connection pool ---
+class ConnectionPool:
+    def __init__(self, connect, size, timeout, ping_after):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._in_use = 0
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'discarded': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+        }
+
+    def _new_slot(self):
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return True
+        return False
+
+    def _drop_slot(self):
+        with self._lock:
+            self._created -= 1
+            self._stats['discarded'] += 1
+
+    def acquire(self):
+        start = time.perf_counter()
+        waited = False
+        while True:
+            try:
+                raw, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                if self._new_slot():
+                    try:
+                        raw, last_used = self._connect(), time.monotonic()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                else:
+                    waited = True
+                    remaining = self.timeout - (time.perf_counter() - start)
+                    if remaining <= 0:
+                        with self._lock:
+                            self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            f"no DB connection available after {self.timeout}s "
+                            f"(pool size {self.size})")
+                    # Wake up periodically in case a discarded connection
+                    # freed a slot rather than returning to the idle queue.
+                    try:
+                        raw, last_used = self._idle.get(timeout=min(remaining, 0.1))
+                    except queue.Empty:
+                        continue
+
+            # Health check: connections that sat idle may have been dropped
+            # by the server (wait_timeout), so verify before handing out.
+            if time.monotonic() - last_used > self.ping_after:
+                try:
+                    _ping(raw)
+                except Exception:
+                    self._discard(raw)
+                    continue
+            break
+
+        wait_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._in_use += 1
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            if waited:
+                self._stats['waits'] += 1
+        return PooledConnection(self, raw)
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+        self._drop_slot()
+
+    def release(self, raw):
+        with self._lock:
+            self._in_use -= 1
+        try:
+            # Never hand a half-finished transaction to the next request.
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+        self._idle.put((raw, time.monotonic()))
+
+    def health_check(self):
+        conn = self.acquire()
+        try:
+            _ping(conn.raw)
+            return True
+        finally:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data.update({
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+            })
+        checkouts = data['checkouts'] or 1
+        data['avg_wait_ms'] = round(data['total_wait_ms'] / checkouts, 3)
+        data['total_wait_ms'] = round(data['total_wait_ms'], 3)
+        data['max_wait_ms'] = round(data['max_wait_ms'], 3)
+        return data
+
+
+# --- Query timing ---
+# Set to a callable(sql, seconds) to time every statement run through a
+# pooled connection; instrumentation.py installs one.
+query_listener = None
+
+
+class _TimedCursor:
+    def __init__(self, cursor, listener):
+        self._cursor = cursor
+        self._listener = listener
+
+    def execute(self, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.execute(sql, *args, **kwargs)
+        finally:
+            self._listener(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return self._cursor.executemany(sql, *args, **kwargs)
+        finally:
+            self._listener(sql, time.perf_counter() - start)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class PooledConnection:
+    """Connection checked out of a ConnectionPool.
+
+    close() returns the underlying connection to the pool instead of
+    tearing down the socket, so existing ``conn.close()`` calls stay valid.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self.raw = raw
+        self.closed = False
+
+    def cursor(self, dictionary=False):
+        cursor = self.raw.cursor(dictionary=True) if dictionary else self.raw.cursor()
+        if query_listener is not None:
+            return _TimedCursor(cursor, query_listener)
+        return cursor
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._pool.release(self.raw)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_connect,
+                                       size=config.DB_POOL_SIZE,
+                                       timeout=config.DB_POOL_TIMEOUT,
+                                       ping_after=config.DB_POOL_PING_AFTER)
+    return _pool
+
+
+def reset_pool():
+    """Forget the current pool, e.g. in a freshly forked worker process.
+
+    Inherited connections are dropped rather than closed: closing them would
+    also tear down the parent's sockets.
+    """
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+# --- Flask integration ---
+def get_db():
+    """Return this request's connection, checking one out on first use."""
+    conn = g.get('db')
+    if conn is None or conn.closed:
+        conn = g.db = get_pool().acquire()
+    return conn
+
+
+def close_db(exc=None):
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.close()
+
+
+def init_schema(baseline=None, log=print):
+    """Create the schema or bring it up to date (see schema.py)."""
+    import schema
+    conn = get_pool().acquire()
+    try:
+        return schema.migrate(conn, baseline=baseline, log=log)
+    finally:
+        conn.close()
+
+
+def init_app(app):
+    app.teardown_appcontext(close_db)
+
+    @app.cli.command('init-db')
+    @click.option('--baseline', type=int,
+                  help="Mark migrations up to this version as applied without running them "
+                       "(for databases created by hand).")
+    @click.option('--status', is_flag=True, help="List pending migrations and exit.")
+    def init_db_command(baseline, status):
+        """Create the database schema or apply pending migrations."""
+        import schema
+        if status:
+            conn = get_pool().acquire()
+            try:
+                todo = schema.pending(conn)
+            finally:
+                conn.close()
+            for version, name, _ in todo:
+                print(f"  pending  {version:04d}_{name}")
+            print(f"{len(todo)} pending migration(s) for {config.DB_BACKEND}")
+            return
+        try:
+            applied = init_schema(baseline=baseline)
+        except schema.MigrationError as e:
+            raise click.ClickException(str(e))
+        print(f"{config.DB_BACKEND} schema up to date ({len(applied)} migration(s) applied)")
@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import uuid
+import weakref
+from collections import deque
+
+import config
+
+# In-process publish/subscribe for live displays (the kitchen ticket stream).
+# Write paths publish small JSON events; readers block on the bus until an
+# event newer than the last one they saw arrives. The newest EVENT_REPLAY
+# events are kept so a display that reconnects gets what it missed.
+#
+# Event ids are "<epoch>-<seq>". The epoch is new in every process, so a
+# client coming back with an id from a restarted worker (or from another
+# worker) is told to start over rather than silently missing events.
+
+
+class Event:
+    __slots__ = ('seq', 'id', 'kind', 'data')
+
+    def __init__(self, seq, id, kind, data):
+        self.seq = seq
+        self.id = id
+        self.kind = kind
+        self.data = data
+
+    def sse(self):
+        """The event in text/event-stream format."""
+        return f"id: {self.id}\nevent: {self.kind}\ndata: {json.dumps(self.data, default=str)}\n\n"
+
+
+class TooManyListeners(Exception):
+    pass
+
+
+class EventBus:
+    def __init__(self, replay=None, max_listeners=None):
+        self.replay = config.EVENT_REPLAY if replay is None else replay
+        self.max_listeners = config.EVENT_MAX_LISTENERS if max_listeners is None else max_listeners
+        self._cond = threading.Condition()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=self.replay)
+        self._seq = 0
+        self.published = 0
+        self.listeners = 0
+
+    def _check_pid(self):
+        # A forked worker starts with an empty bus of its own
+        if self._pid != os.getpid():
+            self._reset()
+
+    def publish(self, kind, data):
+        with self._cond:
+            self._check_pid()
+            self._seq += 1
+            event = Event(self._seq, f"{self.epoch}-{self._seq}", kind, data)
+            self._events.append(event)
+            self.published += 1
+            self._cond.notify_all()
+            return event
+
+    def _after(self, last_id):
+        """(events after ``last_id``, False if some were missed). Lock held."""
+        if last_id is None:
+            return list(self._events), True
+        epoch, _, seq = str(last_id).partition('-')
+        if epoch != self.epoch or not seq.isdigit() or int(seq) > self._seq:
+            return list(self._events), False
+        seq = int(seq)
+        missed = bool(self._events) and self._events[0].seq > seq + 1
+        return [e for e in self._events if e.seq > seq], not missed
+
+    def listen(self, last_id=None, heartbeat=15.0):
+        """Yield replayed then live events, and None every ``heartbeat``
+        seconds without one. The first item is False if events after
+        ``last_id`` were dropped from the replay buffer (or it came from
+        another process); the caller should reload its state.
+        """
+        with self._cond:
+            self._check_pid()
+            if self.max_listeners and self.listeners >= self.max_listeners:
+                raise TooManyListeners()
+            # The slot is taken here, under the same lock as the check
+            self.listeners += 1
+            release = self._releaser(self.epoch)
+            pending, complete = self._after(last_id)
+            stream = self._stream(pending, complete, self._seq, heartbeat, release)
+        # A stream dropped before it ever ran never reaches its finally block
+        weakref.finalize(stream, release)
+        return stream
+
+    def _releaser(self, epoch):
+        """Frees one listener slot, once (and not in a reset bus)."""
+        released = []
+
+        def release():
+            with self._cond:
+                if not released and self.epoch == epoch:
+                    released.append(True)
+                    self.listeners -= 1
+        return release
+
+    def _stream(self, pending, complete, seen, heartbeat, release):
+        try:
+            yield complete
+            while True:
+                yield from pending
+                with self._cond:
+                    self._cond.wait_for(lambda: self._seq > seen, timeout=heartbeat)
+                    pending = [e for e in self._events if e.seq > seen]
+                    seen = self._seq
+                if not pending:
+                    yield None
+        finally:
+            release()
+
+    def stats(self):
+        with self._cond:
+            return {'published': self.published, 'buffered': len(self._events),
+                    'listeners': self.listeners}
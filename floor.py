@@ -0,0 +1,138 @@
+import json
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import date as _date
+
+import config
+
+# The floor model: for each branch, its tables and their seats, the tables
+# that can be pushed together, and the opening hours per weekday. It lives
+# in floor.json and is read at startup.
+#
+# Slots are cut from the opening hours (slot_minutes each) and numbered in
+# order of start time; a slot's number is its bit in the availability
+# bitmasks, and a table's position in `tables` is its bit in a slot's mask.
+# Bookings still store the slot label ("10:00 AM - 12:00 PM").
+
+WEEKDAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+Table = namedtuple('Table', 'no seats')
+# A single table or a combination, as the allocator sees it
+Seating = namedtuple('Seating', 'seats tables mask')
+
+
+class FloorError(ValueError):
+    pass
+
+
+def _minutes(value):
+    hours, _, minutes = str(value).partition(':')
+    try:
+        total = int(hours) * 60 + int(minutes or 0)
+    except ValueError:
+        raise FloorError(f"invalid time {value!r}; use HH:MM")
+    if not 0 <= total <= 24 * 60:
+        raise FloorError(f"invalid time {value!r}; use HH:MM")
+    return total
+
+
+def _clock(minutes):
+    hours, minutes = divmod(minutes % (24 * 60), 60)
+    return f"{hours % 12 or 12}:{minutes:02d} {'AM' if hours < 12 else 'PM'}"
+
+
+def slot_label(start, end):
+    """Label of the slot from ``start`` to ``end`` (minutes after midnight)."""
+    return f"{_clock(start)} - {_clock(end)}"
+
+
+class Branch:
+    def __init__(self, doc):
+        self.id = doc['id']
+        self.name = doc.get('name', self.id)
+        tables = sorted(Table(int(t['no']), int(t['seats'])) for t in doc['tables'])
+        if not tables or len({t.no for t in tables}) != len(tables):
+            raise FloorError(f"branch {self.id!r}: table numbers must be unique")
+        if any(t.seats < 1 for t in tables):
+            raise FloorError(f"branch {self.id!r}: every table needs seats")
+        self.tables = tuple(tables)
+        self.seats = {t.no: t.seats for t in tables}
+        self._bit = {t.no: 1 << i for i, t in enumerate(tables)}
+
+        # Slots of every weekday, numbered by start time across the week
+        length = int(doc.get('slot_minutes', 120))
+        hours = doc.get('hours', {})
+        day_slots = {}
+        for day in WEEKDAYS:
+            span = hours.get(day, hours.get('default'))
+            if span is None:
+                day_slots[day] = []  # closed
+                continue
+            opens, closes = _minutes(span[0]), _minutes(span[1])
+            day_slots[day] = [(start, start + length)
+                              for start in range(opens, closes - length + 1, length)]
+        spans = sorted({span for slots in day_slots.values() for span in slots})
+        self.slots = tuple(slot_label(*span) for span in spans)
+        self._code = {label: i for i, label in enumerate(self.slots)}
+        self._open = {day: sum(1 << spans.index(span) for span in slots)
+                      for day, slots in day_slots.items()}
+
+        seatings = [Seating(t.seats, (t.no,), self._bit[t.no]) for t in tables]
+        for combination in doc.get('combinations', []):
+            nos = tuple(sorted(int(no) for no in combination))
+            if len(nos) < 2 or any(no not in self.seats for no in nos):
+                raise FloorError(f"branch {self.id!r}: bad combination {combination!r}")
+            seatings.append(Seating(sum(self.seats[no] for no in nos), nos,
+                                    sum(self._bit[no] for no in nos)))
+        # Best fit first: fewest seats, then fewest tables, then lowest numbers
+        seatings.sort(key=lambda s: (s.seats, len(s.tables), s.tables))
+        self._seatings = tuple(seatings)
+        self._seat_counts = [s.seats for s in seatings]
+
+    def slot_code(self, label):
+        return self._code.get(label)
+
+    def open_mask(self, date):
+        """Bitmask of the slots open on ``date`` (YYYY-MM-DD); 0 if invalid."""
+        try:
+            weekday = _date.fromisoformat(str(date)).weekday()
+        except ValueError:
+            return 0
+        return self._open[WEEKDAYS[weekday]]
+
+    def is_open(self, date, label):
+        code = self._code.get(label)
+        return code is not None and bool(self.open_mask(date) >> code & 1)
+
+    def table_mask(self, tables):
+        return sum(self._bit[no] for no in tables)
+
+    def allocate(self, guests, taken=0, combine=True):
+        """Best-fitting free seating for ``guests``: a tuple of table numbers,
+        or None. ``taken`` is a bitmask of tables already in use (see
+        AvailabilityIndex.taken); combinations are only tried if ``combine``.
+        """
+        for seating in self._seatings[bisect_left(self._seat_counts, guests):]:
+            if not seating.mask & taken and (combine or len(seating.tables) == 1):
+                return seating.tables
+        return None
+
+
+class FloorPlan:
+    def __init__(self, doc):
+        self.branches = {}
+        for raw in doc.get('branches', []):
+            branch = Branch(raw)
+            self.branches[branch.id] = branch
+
+    @classmethod
+    def load(cls, path=None):
+        path = path or config.FLOOR_PATH
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def branch(self, branch_id=None):
+        branch_id = branch_id or config.FLOOR_BRANCH
+        if branch_id not in self.branches:
+            raise FloorError(f"no branch {branch_id!r} in the floor model")
+        return self.branches[branch_id]
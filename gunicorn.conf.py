@@ -0,0 +1,41 @@
+import multiprocessing
+
+# Plain names only: gunicorn treats module globals here as settings
+from config import WEB_THREADS, WEB_WORKERS
+
+# Production WSGI serving:  gunicorn -c gunicorn.conf.py 'app:create_app()'
+#
+# Sizing model
+# ------------
+# Requests here spend most of their time waiting on MySQL, not on the CPU,
+# so each worker process runs several threads (gthread):
+#
+#   workers      = WEB_WORKERS, default 2 x cores + 1
+#   threads      = WEB_THREADS per worker (default 8)
+#   concurrency  = workers x threads requests in flight
+#   DB_POOL_SIZE >= threads, so a request never waits for a connection
+#   MySQL        max_connections > workers x DB_POOL_SIZE (+ admin headroom)
+#
+# e.g. 4 cores -> 9 workers x 8 threads = 72 concurrent requests and at
+# most 72 MySQL connections, well under the default max_connections of 151.
+# If /health shows pool waits climbing, raise threads and DB_POOL_SIZE
+# together; if CPU is saturated, threads will not help.
+#
+# For many slow clients or long DB waits, uvicorn with asgi.py serves the
+# hot paths asynchronously instead (see README, "Production serving").
+
+bind = "0.0.0.0:8000"
+workers = WEB_WORKERS or multiprocessing.cpu_count() * 2 + 1
+worker_class = "gthread"
+threads = WEB_THREADS
+timeout = 30
+keepalive = 5
+# Recycle workers now and then so slow leaks cannot build up
+max_requests = 5000
+max_requests_jitter = 500
+
+
+def post_fork(server, worker):
+    # Connections opened before the fork belong to the master process
+    import db
+    db.reset_pool()
@@ -0,0 +1,130 @@
+import archive
+import config
+from admin_lists import BadFilter, decode_cursor, encode_cursor, plain_row
+from cache import UserCache
+
+# Customer history for /my_bookings and /my_orders, keyed on bookings.user_id.
+# Both walk the customer's bookings newest first, one keyset page at a time,
+# on the (user_id, status, date) and (user_id, date) indexes, so a page costs
+# the same however long the history grows. Each page reads the live and the
+# archive tables the same way and merges the two.
+
+DEFAULT_PAGE_SIZE = 10
+
+
+def _keyset(cursor_token, clauses, params):
+    if cursor_token:
+        last_date, last_id = decode_cursor(cursor_token, 2)
+        clauses.append("(b.date < %s OR (b.date = %s AND b.id < %s))")
+        params += [last_date, last_date, last_id]
+
+
+def _newest(row):
+    return row['date'], row['id']
+
+
+def _page(rows, limit):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor([rows[-1]['date'], rows[-1]['id']])
+    return rows, None
+
+
+def fetch_bookings(conn, user_id, limit, cursor_token=None):
+    """Return (paid bookings, next_cursor) for one customer."""
+    clauses, params = ["b.user_id = %s", "b.status = 'paid'"], [user_id]
+    _keyset(cursor_token, clauses, params)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        pages = []
+        for tier in archive.TIERS:
+            cursor.execute(f"""
+                SELECT b.id, b.date, b.time, b.table_no, b.guests, b.category, b.subcategory,
+                       b.status, b.total_amount
+                FROM {tier.bookings} b
+                WHERE {' AND '.join(clauses)}
+                ORDER BY b.date DESC, b.id DESC
+                LIMIT %s
+            """, tuple(params) + (limit + 1,))
+            pages.append([plain_row(r) for r in cursor.fetchall()])
+    finally:
+        cursor.close()
+    return _page(archive.merge_newest(pages, _newest, limit), limit)
+
+
+def fetch_orders(conn, user_id, limit, cursor_token=None):
+    """Return (order lines, next_cursor) for one customer.
+
+    A page covers ``limit`` bookings that have food orders, newest first,
+    with their order header totals; the lines of each booking come from
+    the food_orders(booking_id) index.
+    """
+    clauses, params = ["b.user_id = %s"], [user_id]
+    _keyset(cursor_token, clauses, params)
+    cursor = conn.cursor(dictionary=True)
+    try:
+        pages, tier_of = [], {}
+        for tier in archive.TIERS:
+            cursor.execute(f"""
+                SELECT b.id, b.date, b.time, b.table_no, b.status, b.total_amount,
+                       o.subtotal, o.paid_total
+                FROM {tier.bookings} b
+                JOIN {tier.orders} o ON o.booking_id = b.id AND o.item_count > 0
+                WHERE {' AND '.join(clauses)}
+                ORDER BY b.date DESC, b.id DESC
+                LIMIT %s
+            """, tuple(params) + (limit + 1,))
+            pages.append([plain_row(r) for r in cursor.fetchall()])
+            tier_of.update((row['id'], tier) for row in pages[-1])
+        bookings, next_cursor = _page(archive.merge_newest(pages, _newest, limit), limit)
+
+        lines = {}
+        for tier in archive.TIERS:
+            ids = [b['id'] for b in bookings if tier_of[b['id']] is tier]
+            if not ids:
+                continue
+            cursor.execute(f"""
+                SELECT id, booking_id, item_name, item_price, quantity, food_paid, created_at
+                FROM {tier.food_orders}
+                WHERE booking_id IN ({', '.join(['%s'] * len(ids))})
+                ORDER BY id DESC
+            """, tuple(ids))
+            for row in cursor.fetchall():
+                lines.setdefault(row['booking_id'], []).append(plain_row(row))
+    finally:
+        cursor.close()
+
+    orders = []
+    for b in bookings:
+        for f in lines.get(b['id'], []):
+            orders.append({
+                'order_id': f['id'],
+                'item_name': f['item_name'],
+                'item_price': f['item_price'],
+                'quantity': f['quantity'],
+                'total_amount': f['item_price'] * f['quantity'],
+                'food_paid': f['food_paid'],
+                'created_at': f['created_at'],
+                'booking_id': b['id'],
+                'date': b['date'],
+                'time': b['time'],
+                'table_no': b['table_no'],
+                'status': b['status'],
+                'booking_total': b['total_amount'],
+                'order_subtotal': b['subtotal'],
+                'order_paid_total': b['paid_total'],
+            })
+    return orders, next_cursor
+
+
+class RecentOrders(UserCache):
+    """Per-user cache of the first /my_orders page.
+
+    Write paths call invalidate(user_id) when that user's orders change; the
+    TTL bounds staleness from writes made by other worker processes.
+    RECENT_ORDERS_TTL=0 turns the cache off.
+    """
+
+    def __init__(self, ttl=None, max_users=None):
+        super().__init__(config.RECENT_ORDERS_TTL if ttl is None else ttl,
+                         config.RECENT_ORDERS_MAX_USERS if max_users is None else max_users)
@@ -0,0 +1,386 @@
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import before_render_template, g, has_request_context, request, session, template_rendered
+
+import config
+import db
+import sessions
+
+# Where request time goes, per worker process: request, SQL, template and QR
+# timings as Prometheus metrics (rendered by /metrics in app.py), one JSON
+# log line per request, slow-query and repeated-query (N+1) warnings, and an
+# opt-in per-request profiler for admins. Under gunicorn/uvicorn every worker
+# keeps its own numbers, so scrape each worker rather than the load balancer.
+
+log = logging.getLogger('swiftcafe')
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+# --- Metrics registry ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, labels, values, value):
+    if labels:
+        pairs = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(labels, values))
+        name = f"{name}{{{pairs}}}"
+    return f"{name} {value}"
+
+
+class _Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def lines(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [_sample(self.name, self.labels, values, v) for values, v in items]
+
+
+class _Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket..., count above the last bucket, sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *values):
+        with self._lock:
+            state = self._values.get(values)
+            if state is None:
+                state = self._values[values] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def lines(self):
+        with self._lock:
+            items = [(values, list(state)) for values, state in self._values.items()]
+        out = []
+        labels = self.labels + ('le',)
+        for values, state in items:
+            total = 0
+            for bound, count in zip(self.buckets, state):
+                total += count
+                out.append(_sample(self.name + '_bucket', labels, values + (bound,), total))
+            total += state[-2]
+            out.append(_sample(self.name + '_bucket', labels, values + ('+Inf',), total))
+            out.append(_sample(self.name + '_sum', self.labels, values, round(state[-1], 6)))
+            out.append(_sample(self.name + '_count', self.labels, values, total))
+        return out
+
+
+class _Derived:
+    """Values read from elsewhere (pool, caches) when /metrics is scraped."""
+
+    def __init__(self, name, kind, help_text, labels, collect):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labels = labels
+        self._collect = collect
+
+    def lines(self):
+        return [_sample(self.name, self.labels, values, v) for values, v in self._collect()]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(_Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(_Histogram(name, help_text, labels, buckets))
+
+    def derived(self, name, kind, help_text, labels, collect):
+        """Register ``collect()`` -> [(label values, value)], called on each scrape."""
+        return self._add(_Derived(name, kind, help_text, labels, collect))
+
+    def render(self):
+        out = []
+        for metric in self._metrics:
+            try:
+                lines = metric.lines()
+            except Exception as e:
+                log.warning("metric collection failed", extra={'metric': metric.name, 'error': str(e)})
+                continue
+            out.append(f"# HELP {metric.name} {metric.help}")
+            out.append(f"# TYPE {metric.name} {metric.kind}")
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    'swiftcafe_http_requests_total', 'HTTP requests.', ('method', 'route', 'status'))
+REQUEST_SECONDS = registry.histogram(
+    'swiftcafe_http_request_duration_seconds',
+    'Time to build the response (streamed bodies excluded).', ('method', 'route'))
+QUERY_SECONDS = registry.histogram(
+    'swiftcafe_db_query_duration_seconds', 'SQL statement execution time.', ('route', 'op'))
+QUERIES_PER_REQUEST = registry.histogram(
+    'swiftcafe_db_queries_per_request', 'SQL statements run by one request.', ('route',),
+    buckets=COUNT_BUCKETS)
+SLOW_QUERIES = registry.counter(
+    'swiftcafe_db_slow_queries_total', 'Statements slower than SLOW_QUERY_MS.', ('route', 'op'))
+REPEATED_QUERIES = registry.counter(
+    'swiftcafe_db_repeated_queries_total',
+    'Requests that ran one statement NPLUSONE_THRESHOLD or more times (likely N+1).', ('route',))
+TEMPLATE_SECONDS = registry.histogram(
+    'swiftcafe_template_render_seconds', 'Jinja template render time.', ('template',))
+QR_RENDER_SECONDS = registry.histogram(
+    'swiftcafe_qr_render_seconds', 'Payment QR PNG render time (cache misses).')
+WRITE_FLUSH_SECONDS = registry.histogram(
+    'swiftcafe_write_flush_seconds', 'Time to insert one batch of queued contact/feedback rows.')
+WRITE_LATENCY_SECONDS = registry.histogram(
+    'swiftcafe_write_latency_seconds', 'Time from a contact/feedback submission to its commit.')
+ERRORS = registry.counter(
+    'swiftcafe_logged_errors_total', 'Errors logged by the app.', ('route',))
+
+
+def _route():
+    if not has_request_context():
+        return '-'
+    rule = request.url_rule
+    # The rule, not the path, so /qr/<token>.png stays one series
+    return rule.rule if rule is not None else 'unmatched'
+
+
+# --- Query timing ---
+_OPS = {'SELECT', 'INSERT', 'UPDATE', 'DELETE'}
+_WORD = re.compile(r'\s*\(?\s*(\w+)')
+
+
+def _normalize(sql):
+    return ' '.join(sql.split())
+
+
+class _QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+
+def _on_query(sql, seconds):
+    route = _route()
+    match = _WORD.match(sql)
+    op = match.group(1).upper() if match else ''
+    op = op if op in _OPS else 'OTHER'
+    QUERY_SECONDS.observe(seconds, route, op)
+    if seconds * 1000 >= config.SLOW_QUERY_MS:
+        SLOW_QUERIES.inc(route, op)
+        log.warning("slow query", extra={'route': route, 'sql': _normalize(sql)[:500],
+                                         'duration_ms': round(seconds * 1000, 2)})
+    if has_request_context():
+        stats = g.get('_query_stats')
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += seconds
+            stats.statements[sql] += 1
+
+
+# --- Template timing ---
+def _template_started(sender, template, context, **extra):
+    g.setdefault('_template_starts', []).append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    starts = g.get('_template_starts')
+    if starts:
+        TEMPLATE_SECONDS.observe(time.perf_counter() - starts.pop(), template.name or '-')
+
+
+# --- Profiler ---
+class SamplingProfiler:
+    """Samples one thread's Python stack every ``interval`` seconds.
+
+    dump() writes folded stacks ("outer;inner count" lines), the input format
+    of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=None, thread_id=None):
+        self.interval = config.PROFILE_INTERVAL if interval is None else interval
+        self.thread_id = threading.get_ident() if thread_id is None else thread_id
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def enable(self):
+        self._thread.start()
+
+    def disable(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _start_profile():
+    mode = request.args.get('__profile')
+    if not mode or not config.PROFILE_ENABLED or session.get('role') != 'admin':
+        return
+    g._profiler = SamplingProfiler() if mode == 'sample' else cProfile.Profile()
+    g._profiler.enable()
+
+
+def _finish_profile(response):
+    profiler = g.pop('_profiler', None)
+    if profiler is None:
+        return
+    profiler.disable()
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.endpoint or 'unmatched'}-{g.request_id[:8]}"
+    if isinstance(profiler, SamplingProfiler):
+        path = os.path.join(config.PROFILE_DIR, name + '.folded')
+        profiler.dump(path)
+    else:
+        path = os.path.join(config.PROFILE_DIR, name + '.prof')
+        profiler.dump_stats(path)
+    response.headers['X-Profile'] = path
+    log.info("profile written", extra={'path': path})
+
+
+# --- Request hooks ---
+def _start_request():
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g._query_stats = _QueryStats()
+    _start_profile()
+
+
+def _finish_request(response):
+    started = g.get('request_started')
+    if started is None:
+        return response
+    _finish_profile(response)
+    elapsed = time.perf_counter() - started
+    route = _route()
+    REQUESTS.inc(request.method, route, str(response.status_code))
+    REQUEST_SECONDS.observe(elapsed, request.method, route)
+    response.headers['X-Request-ID'] = g.request_id
+
+    stats = g.pop('_query_stats', None) or _QueryStats()
+    QUERIES_PER_REQUEST.observe(stats.count, route)
+    if stats.statements:
+        sql, times = stats.statements.most_common(1)[0]
+        if times >= config.NPLUSONE_THRESHOLD:
+            REPEATED_QUERIES.inc(route)
+            log.warning("repeated query", extra={'route': route, 'times': times,
+                                                 'sql': _normalize(sql)[:500]})
+    if config.ACCESS_LOG:
+        log.info("request", extra={
+            'method': request.method,
+            'path': request.path,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 2),
+            'db_queries': stats.count,
+            'db_ms': round(stats.seconds * 1000, 2),
+            'user_id': sessions.peek('user_id'),
+        })
+    return response
+
+
+# --- Logging ---
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; ``extra={...}`` fields become keys."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if has_request_context() and 'request_id' in g:
+            entry['request_id'] = g.request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _CountErrors(logging.Filter):
+    def filter(self, record):
+        if record.levelno >= logging.ERROR:
+            ERRORS.inc(_route())
+        return True
+
+
+def configure_logging():
+    """Send the swiftcafe.* loggers to stderr, unless already configured."""
+    if log.handlers:
+        return
+    handler = logging.StreamHandler()
+    if config.LOG_FORMAT == 'json':
+        handler.setFormatter(JSONFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    handler.addFilter(_CountErrors())
+    log.addHandler(handler)
+    log.setLevel(config.LOG_LEVEL)
+    log.propagate = False
+
+
+def init_app(app):
+    configure_logging()
+    db.query_listener = _on_query
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_finished, app)
@@ -0,0 +1,5 @@
+-- Unpaid bookings hold their table until hold_expires_at.
+ALTER TABLE bookings ADD COLUMN hold_expires_at DATETIME NULL;
+
+-- One booking (or live hold) per table per slot.
+ALTER TABLE bookings ADD UNIQUE KEY uq_bookings_slot (date, time, table_no);
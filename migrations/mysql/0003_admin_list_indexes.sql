@@ -0,0 +1,9 @@
+-- Admin list filters; each index ends in date (and implicitly id) so
+-- keyset pages are read in order without a sort.
+CREATE INDEX idx_bookings_date ON bookings(date);
+CREATE INDEX idx_bookings_status_date ON bookings(status, date);
+CREATE INDEX idx_bookings_category_date ON bookings(category, date);
+CREATE INDEX idx_bookings_table_date ON bookings(table_no, date);
+
+CREATE INDEX idx_food_orders_created ON food_orders(created_at);
+CREATE INDEX idx_food_orders_paid ON food_orders(food_paid);
@@ -0,0 +1,16 @@
+-- One cart line per item, paid or unpaid, per booking; cart upserts rely on it
+-- (0013 narrows it to unpaid lines).
+-- Merge duplicate lines left by the old read-then-insert cart first; paid
+-- and unpaid lines of an item are never merged into each other.
+UPDATE food_orders f
+JOIN (SELECT MIN(id) AS keep_id, SUM(quantity) AS quantity
+      FROM food_orders
+      GROUP BY booking_id, item_name, food_paid
+      HAVING COUNT(*) > 1) d ON f.id = d.keep_id
+SET f.quantity = d.quantity;
+
+DELETE f FROM food_orders f
+JOIN food_orders k ON k.booking_id = f.booking_id AND k.item_name = f.item_name
+                  AND k.food_paid = f.food_paid AND k.id < f.id;
+
+CREATE UNIQUE INDEX uq_food_orders_booking_item ON food_orders(booking_id, item_name, food_paid);
@@ -0,0 +1,15 @@
+-- Customer history (/my_bookings, /my_orders) is keyed on user_id.
+ALTER TABLE bookings
+    ADD COLUMN user_id INT NULL,
+    ADD CONSTRAINT fk_bookings_user FOREIGN KEY (user_id) REFERENCES users(id);
+
+CREATE INDEX idx_bookings_email ON bookings(email);
+
+-- Link past bookings to the account with the same email.
+UPDATE bookings b JOIN users u ON u.email = b.email
+SET b.user_id = u.id
+WHERE b.user_id IS NULL;
+
+-- Newest first per user, without a sort.
+CREATE INDEX idx_bookings_user_status_date ON bookings(user_id, status, date);
+CREATE INDEX idx_bookings_user_date ON bookings(user_id, date);
@@ -0,0 +1,6 @@
+-- Found by bench/explain_check.py.
+-- Admin dashboard: latest feedbacks.
+CREATE INDEX idx_feedbacks_created ON feedbacks(created_at);
+
+-- purge-holds: only pending holds have an expiry, so this stays small.
+CREATE INDEX idx_bookings_hold_expires ON bookings(hold_expires_at);
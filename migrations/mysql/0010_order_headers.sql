@@ -0,0 +1,17 @@
+-- One header per booking with food: its cart totals, kept in step with
+-- food_orders by cart.py so pages don't re-add the lines.
+CREATE TABLE IF NOT EXISTS orders (
+    booking_id INT PRIMARY KEY,
+    subtotal DECIMAL(10,2) NOT NULL DEFAULT 0,
+    paid_total DECIMAL(10,2) NOT NULL DEFAULT 0,
+    item_count INT NOT NULL DEFAULT 0,
+    CONSTRAINT fk_orders_booking FOREIGN KEY (booking_id) REFERENCES bookings(id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO orders (booking_id, subtotal, paid_total, item_count)
+SELECT booking_id,
+       SUM(item_price * quantity),
+       SUM(CASE WHEN food_paid = 1 THEN item_price * quantity ELSE 0 END),
+       SUM(quantity)
+FROM food_orders
+GROUP BY booking_id;
@@ -0,0 +1,64 @@
+-- Cold tier: past bookings with their food orders and order headers, moved
+-- out of the live tables by archive.py. Same columns and ids as the live
+-- tables, and the indexes the history pages and admin lists read them by.
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    id INT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(150) NOT NULL,
+    phone VARCHAR(20),
+    date DATE NOT NULL,
+    time VARCHAR(30) NOT NULL,
+    guests INT,
+    table_no INT NOT NULL,
+    category VARCHAR(50),
+    subcategory VARCHAR(50),
+    status VARCHAR(20) NOT NULL,
+    total_amount DECIMAL(10,2) DEFAULT 0,
+    created_at DATETIME,
+    hold_expires_at DATETIME NULL,
+    user_id INT NULL,
+    party_id VARCHAR(32),
+    INDEX idx_bookings_archive_date (date),
+    INDEX idx_bookings_archive_status_date (status, date),
+    INDEX idx_bookings_archive_category_date (category, date),
+    INDEX idx_bookings_archive_table_date (table_no, date),
+    INDEX idx_bookings_archive_user_status_date (user_id, status, date),
+    INDEX idx_bookings_archive_user_date (user_id, date)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS food_orders_archive (
+    id INT PRIMARY KEY,
+    booking_id INT NOT NULL,
+    item_name VARCHAR(100) NOT NULL,
+    item_price DECIMAL(10,2) NOT NULL,
+    quantity INT NOT NULL,
+    food_paid TINYINT(1) NOT NULL,
+    created_at DATETIME,
+    INDEX idx_food_orders_archive_booking (booking_id),
+    INDEX idx_food_orders_archive_created (created_at),
+    INDEX idx_food_orders_archive_paid (food_paid)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS orders_archive (
+    booking_id INT PRIMARY KEY,
+    subtotal DECIMAL(10,2) NOT NULL,
+    paid_total DECIMAL(10,2) NOT NULL,
+    item_count INT NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- What the dashboard totals need from the archived rows, per month of
+-- booking date, so they never read the cold tier.
+CREATE TABLE IF NOT EXISTS archive_totals (
+    month CHAR(7) PRIMARY KEY,
+    bookings INT NOT NULL DEFAULT 0,
+    booking_revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    food_orders INT NOT NULL DEFAULT 0,
+    food_revenue DECIMAL(14,2) NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS archive_items (
+    month CHAR(7) NOT NULL,
+    item_name VARCHAR(100) NOT NULL,
+    quantity INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, item_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
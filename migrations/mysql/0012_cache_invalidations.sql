@@ -0,0 +1,10 @@
+-- Cache entries a worker made stale, for the other workers to drop (see
+-- coherence.py). Append-only; rows older than COHERENCE_RETAIN are deleted.
+CREATE TABLE IF NOT EXISTS cache_invalidations (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    namespace VARCHAR(32) NOT NULL,
+    cache_key VARCHAR(64),
+    origin VARCHAR(16) NOT NULL,
+    created_at INT NOT NULL,
+    INDEX idx_cache_invalidations_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,10 @@
+-- One unpaid cart line per item per booking; paid lines are left alone, so
+-- ordering more of a paid item opens a new line (see cart.py). unpaid_line
+-- is 1 for unpaid lines and NULL (never a duplicate) for paid ones.
+ALTER TABLE food_orders
+    ADD COLUMN unpaid_line TINYINT AS (IF(food_paid = 0, 1, NULL)) VIRTUAL;
+
+CREATE UNIQUE INDEX uq_food_orders_unpaid_item ON food_orders(booking_id, item_name, unpaid_line);
+
+-- The new index now backs the booking foreign key
+DROP INDEX uq_food_orders_booking_item ON food_orders;
@@ -0,0 +1,3 @@
+-- The SQLite schema makes idx_bookings_party a partial index here. MySQL has
+-- no partial indexes, and InnoDB keeps using the plain index from 0009 for
+-- party lookups, so nothing changes; the version is kept in step.
@@ -0,0 +1,5 @@
+-- Unpaid bookings hold their table until hold_expires_at.
+ALTER TABLE bookings ADD COLUMN hold_expires_at TIMESTAMP;
+
+-- One booking (or live hold) per table per slot.
+CREATE UNIQUE INDEX uq_bookings_slot ON bookings(date, time, table_no);
@@ -0,0 +1,16 @@
+-- One cart line per item, paid or unpaid, per booking; cart upserts rely on it
+-- (0013 narrows it to unpaid lines).
+-- Merge duplicate lines left by the old read-then-insert cart first; paid
+-- and unpaid lines of an item are never merged into each other.
+UPDATE food_orders
+SET quantity = (SELECT SUM(d.quantity) FROM food_orders d
+                WHERE d.booking_id = food_orders.booking_id
+                  AND d.item_name = food_orders.item_name
+                  AND d.food_paid = food_orders.food_paid)
+WHERE id IN (SELECT MIN(id) FROM food_orders
+             GROUP BY booking_id, item_name, food_paid HAVING COUNT(*) > 1);
+
+DELETE FROM food_orders
+WHERE id NOT IN (SELECT MIN(id) FROM food_orders GROUP BY booking_id, item_name, food_paid);
+
+CREATE UNIQUE INDEX uq_food_orders_booking_item ON food_orders(booking_id, item_name, food_paid);
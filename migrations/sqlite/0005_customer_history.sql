@@ -0,0 +1,13 @@
+-- Customer history (/my_bookings, /my_orders) is keyed on user_id.
+ALTER TABLE bookings ADD COLUMN user_id INTEGER REFERENCES users(id);
+
+CREATE INDEX idx_bookings_email ON bookings(email);
+
+-- Link past bookings to the account with the same email.
+UPDATE bookings
+SET user_id = (SELECT u.id FROM users u WHERE u.email = bookings.email)
+WHERE user_id IS NULL;
+
+-- Newest first per user, without a sort.
+CREATE INDEX idx_bookings_user_status_date ON bookings(user_id, status, date);
+CREATE INDEX idx_bookings_user_date ON bookings(user_id, date);
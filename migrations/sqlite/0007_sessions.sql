@@ -0,0 +1,8 @@
+-- Server-side sessions (SESSION_BACKEND=db); the cookie holds only the id.
+CREATE TABLE sessions (
+    id VARCHAR(64) PRIMARY KEY,
+    data TEXT NOT NULL,
+    expires_at INTEGER NOT NULL
+);
+
+CREATE INDEX idx_sessions_expires ON sessions(expires_at);
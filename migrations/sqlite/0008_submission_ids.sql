@@ -0,0 +1,7 @@
+-- Contact messages and feedback go through write_queue.py. Each row carries
+-- its submission id so a row replayed from the spool is not inserted twice.
+ALTER TABLE contact_messages ADD COLUMN submission_id VARCHAR(32);
+CREATE UNIQUE INDEX uq_contact_messages_submission ON contact_messages(submission_id);
+
+ALTER TABLE feedbacks ADD COLUMN submission_id VARCHAR(32);
+CREATE UNIQUE INDEX uq_feedbacks_submission ON feedbacks(submission_id);
@@ -0,0 +1,3 @@
+-- Bookings made together by /api/party_bookings share a party id.
+ALTER TABLE bookings ADD COLUMN party_id VARCHAR(32);
+CREATE INDEX idx_bookings_party ON bookings(party_id);
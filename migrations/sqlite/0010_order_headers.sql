@@ -0,0 +1,16 @@
+-- One header per booking with food: its cart totals, kept in step with
+-- food_orders by cart.py so pages don't re-add the lines.
+CREATE TABLE IF NOT EXISTS orders (
+    booking_id INTEGER PRIMARY KEY REFERENCES bookings(id),
+    subtotal REAL NOT NULL DEFAULT 0,
+    paid_total REAL NOT NULL DEFAULT 0,
+    item_count INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT INTO orders (booking_id, subtotal, paid_total, item_count)
+SELECT booking_id,
+       SUM(item_price * quantity),
+       SUM(CASE WHEN food_paid = 1 THEN item_price * quantity ELSE 0 END),
+       SUM(quantity)
+FROM food_orders
+GROUP BY booking_id;
@@ -0,0 +1,64 @@
+-- Cold tier: past bookings with their food orders and order headers, moved
+-- out of the live tables by archive.py. Same columns and ids as the live
+-- tables, and the indexes the history pages and admin lists read them by.
+CREATE TABLE IF NOT EXISTS bookings_archive (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    phone TEXT,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    guests INTEGER,
+    table_no INTEGER NOT NULL,
+    category TEXT,
+    subcategory TEXT,
+    status TEXT NOT NULL,
+    total_amount REAL DEFAULT 0,
+    created_at TIMESTAMP,
+    hold_expires_at TIMESTAMP,
+    user_id INTEGER,
+    party_id VARCHAR(32)
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_date ON bookings_archive(date);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_status_date ON bookings_archive(status, date);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_category_date ON bookings_archive(category, date);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_table_date ON bookings_archive(table_no, date);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_user_status_date ON bookings_archive(user_id, status, date);
+CREATE INDEX IF NOT EXISTS idx_bookings_archive_user_date ON bookings_archive(user_id, date);
+
+CREATE TABLE IF NOT EXISTS food_orders_archive (
+    id INTEGER PRIMARY KEY,
+    booking_id INTEGER NOT NULL,
+    item_name TEXT NOT NULL,
+    item_price REAL NOT NULL,
+    quantity INTEGER NOT NULL,
+    food_paid INTEGER NOT NULL,
+    created_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_food_orders_archive_booking ON food_orders_archive(booking_id);
+CREATE INDEX IF NOT EXISTS idx_food_orders_archive_created ON food_orders_archive(created_at);
+CREATE INDEX IF NOT EXISTS idx_food_orders_archive_paid ON food_orders_archive(food_paid);
+
+CREATE TABLE IF NOT EXISTS orders_archive (
+    booking_id INTEGER PRIMARY KEY,
+    subtotal REAL NOT NULL,
+    paid_total REAL NOT NULL,
+    item_count INTEGER NOT NULL
+);
+
+-- What the dashboard totals need from the archived rows, per month of
+-- booking date, so they never read the cold tier.
+CREATE TABLE IF NOT EXISTS archive_totals (
+    month CHAR(7) PRIMARY KEY,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    booking_revenue REAL NOT NULL DEFAULT 0,
+    food_orders INTEGER NOT NULL DEFAULT 0,
+    food_revenue REAL NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS archive_items (
+    month CHAR(7) NOT NULL,
+    item_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, item_name)
+);
@@ -0,0 +1,7 @@
+-- One unpaid cart line per item per booking; paid lines are left alone, so
+-- ordering more of a paid item opens a new line (see cart.py). Cart upserts
+-- name this index in their conflict target.
+CREATE INDEX IF NOT EXISTS idx_food_orders_booking_item ON food_orders(booking_id, item_name);
+DROP INDEX IF EXISTS uq_food_orders_booking_item;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_food_orders_unpaid_item
+    ON food_orders(booking_id, item_name) WHERE food_paid = 0;
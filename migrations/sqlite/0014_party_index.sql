@@ -0,0 +1,5 @@
+-- Nearly every booking has a NULL party_id, so ANALYZE rated the plain
+-- index as useless and party confirms scanned bookings. Index parties only.
+-- (Databases migrated before this file existed got the same index in 0010.)
+DROP INDEX IF EXISTS idx_bookings_party;
+CREATE INDEX idx_bookings_party ON bookings(party_id) WHERE party_id IS NOT NULL;
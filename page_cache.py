@@ -0,0 +1,88 @@
+import hashlib
+import threading
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+import config
+
+# Rendered HTML that is the same for every visitor, kept per worker process.
+# Each entry is stored under a name with a version key (catalog version,
+# asset build, ...): a lookup with another key renders afresh and replaces
+# it, so at most one version per name is kept. cached_page() serves whole
+# public pages this way, with an ETag and 304 replies to If-None-Match.
+
+
+class RenderCache:
+    def __init__(self):
+        self._entries = {}  # name -> (key, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        # In debug mode templates reload on edit; don't hide the edits
+        return config.PAGE_CACHE and not current_app.debug
+
+    def lookup(self, name, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def store(self, name, key, value):
+        if self.enabled:
+            with self._lock:
+                self._entries[name] = (key, value)
+
+    def get(self, name, key, render):
+        """Cached value of ``render()`` for ``name`` at version ``key``."""
+        value = self.lookup(name, key)
+        if value is None:
+            value = render()
+            self.store(name, key, value)
+        return value
+
+    def invalidate(self, name=None):
+        with self._lock:
+            if name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(name, None)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+def cached_page(cache, version=lambda: None):
+    """Cache a GET view's 200 responses whole. Only for pages that do not
+    depend on the visitor (no session, no query string)."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            name = request.endpoint
+            key = (version(), tuple(sorted(kwargs.items())))
+            entry = cache.lookup(name, key)
+            if entry is None:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                body = response.get_data()
+                entry = (body, response.mimetype, hashlib.sha256(body).hexdigest()[:32])
+                cache.store(name, key, entry)
+            body, mimetype, etag = entry
+            response = current_app.response_class(body, mimetype=mimetype)
+            # Weak: the same page gzipped or not
+            response.set_etag(etag, weak=True)
+            response.cache_control.public = True
+            response.cache_control.max_age = config.PAGE_MAX_AGE
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+import config
+
+# Password hashing (scrypt/PBKDF2) is deliberately slow and holds the GIL, so
+# a burst of logins on the request threads stalls every other route in the
+# worker. PasswordHasher runs it in a small process pool instead; at most
+# HASH_MAX_PENDING jobs may queue, and callers past that get HasherBusy
+# rather than piling up. Keep this module free of app imports: the pool's
+# worker processes import it.
+
+
+class HasherBusy(Exception):
+    pass
+
+
+@lru_cache(maxsize=None)
+def _params(method):
+    """The "method:params" prefix a hash made with ``method`` starts with."""
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(stored, password, method):
+    """Return (matches, new hash if ``stored`` used other parameters)."""
+    if not check_password_hash(stored, password):
+        return False, None
+    if stored.split('$', 1)[0] != _params(method):
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+class PasswordHasher:
+    def __init__(self, method=None, workers=None, max_pending=None, timeout=None):
+        self.method = method or config.PASSWORD_HASH_METHOD
+        self.workers = config.HASH_WORKERS if workers is None else workers
+        self.timeout = config.HASH_QUEUE_TIMEOUT if timeout is None else timeout
+        self._slots = threading.BoundedSemaphore(
+            config.HASH_MAX_PENDING if max_pending is None else max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _pool(self):
+        # Created on first use so each forked server worker gets its own
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HasherBusy(f"{fn.__name__}: no hashing slot free after {self.timeout}s")
+        try:
+            if self.workers <= 0:
+                return fn(*args)
+            try:
+                return self._pool().submit(fn, *args).result()
+            except BrokenProcessPool as e:
+                # A hashing process died (e.g. OOM-killed); start a fresh pool next time
+                with self._lock:
+                    self._executor = None
+                raise HasherBusy(str(e)) from e
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, stored, password):
+        """Return (matches, new_hash); new_hash is set when ``stored`` should be replaced."""
+        return self._run(_verify, stored, password, self.method)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
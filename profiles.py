@@ -0,0 +1,23 @@
+import config
+from cache import UserCache
+
+# Name, email, phone and username of a logged-in user. Sessions keep only
+# user_id and role; pages read the rest by id through UserProfiles, so a
+# changed profile shows up on every worker within PROFILE_CACHE_TTL.
+
+COLUMNS = ('id', 'username', 'name', 'email', 'phone', 'role')
+
+
+def load(conn, user_id):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"SELECT {', '.join(COLUMNS)} FROM users WHERE id=%s", (user_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+class UserProfiles(UserCache):
+    def __init__(self, ttl=None, max_users=None):
+        super().__init__(config.PROFILE_CACHE_TTL if ttl is None else ttl,
+                         config.PROFILE_CACHE_MAX_USERS if max_users is None else max_users)
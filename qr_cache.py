@@ -0,0 +1,65 @@
+import base64
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+
+import qrcode
+
+import config
+from instrumentation import QR_RENDER_SECONDS
+
+
+def render_png(data):
+    qr = qrcode.QRCode(box_size=8, border=2)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def etag_for(data):
+    return hashlib.sha256(data.encode()).hexdigest()[:32]
+
+
+class QRCache:
+    """LRU + TTL cache of rendered QR PNGs keyed by the encoded text."""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = config.QR_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = config.QR_CACHE_TTL if ttl is None else ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def png(self, data):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(data)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._entries.move_to_end(data)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        start = time.perf_counter()
+        png = render_png(data)
+        QR_RENDER_SECONDS.observe(time.perf_counter() - start)
+
+        with self._lock:
+            self._entries[data] = (now, png)
+            self._entries.move_to_end(data)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return png
+
+    def data_uri(self, data):
+        return "data:image/png;base64," + base64.b64encode(self.png(data)).decode()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
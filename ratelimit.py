@@ -0,0 +1,54 @@
+import threading
+import time
+from collections import OrderedDict
+
+# In-process token buckets: each key gets ``limit`` attempts, refilled evenly
+# over ``window`` seconds. Buckets live in one worker process, so with N
+# workers a client can get up to N x limit attempts through.
+
+
+class RateLimiter:
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.limit > 0 and self.window > 0
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.limit, now))
+        return min(self.limit, tokens + (now - updated) * self.limit / self.window)
+
+    def _retry_after(self, tokens):
+        return (1 - tokens) * self.window / self.limit
+
+    def check(self, key):
+        """Seconds until ``key`` may try again without using an attempt; 0 = now."""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            tokens = self._tokens(key, time.monotonic())
+        return 0 if tokens >= 1 else self._retry_after(tokens)
+
+    def hit(self, key):
+        """Use one attempt; return 0, or the seconds to wait if none are left."""
+        if not self.enabled:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                return self._retry_after(tokens)
+            self._buckets[key] = (tokens - 1, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
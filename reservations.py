@@ -0,0 +1,233 @@
+import uuid
+from datetime import datetime, timedelta
+from itertools import combinations
+
+import config
+from db import IntegrityError
+
+# Table reservations are made atomic by the UNIQUE (date, time, table_no)
+# key on bookings: the INSERT itself is the availability check, so two
+# concurrent requests can never both win the same table.
+#
+# A new booking starts as a 'pending' hold that expires after HOLD_MINUTES
+# unless booking_payment confirms it. Expired holds no longer count as
+# occupied and are deleted the next time someone reserves that table.
+
+
+class SlotTaken(Exception):
+    pass
+
+
+def _timestamp(dt):
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def now():
+    return _timestamp(datetime.now())
+
+
+def hold_expiry():
+    return _timestamp(datetime.now() + timedelta(minutes=config.HOLD_MINUTES))
+
+
+# SQL fragment matching bookings that still occupy their table. A hold with
+# food already paid for is never released (carts now require a confirmed
+# booking, but older holds may have one).
+PAID_FOOD = "EXISTS (SELECT 1 FROM orders WHERE orders.booking_id = bookings.id AND orders.paid_total > 0)"
+OCCUPYING = f"(status <> 'pending' OR hold_expires_at IS NULL OR hold_expires_at >= %s OR {PAID_FOOD})"
+
+
+def _purge_expired(cursor, where, params, current):
+    """Delete expired holds (and their unpaid carts) matching ``where``."""
+    params = tuple(params) + (current,)
+    lapsed = f"{where} AND status='pending' AND hold_expires_at < %s"
+    # Holds with paid food stay. Each statement tests that on a table it is
+    # not deleting from, which MySQL requires.
+    expired = f"{lapsed} AND NOT {PAID_FOOD}"
+    cursor.execute(f"""
+        DELETE FROM food_orders
+        WHERE food_paid=0 AND booking_id IN (SELECT id FROM bookings WHERE {expired})
+    """, params)
+    cursor.execute(f"""
+        DELETE FROM orders
+        WHERE paid_total = 0 AND booking_id IN (SELECT id FROM bookings WHERE {lapsed})
+    """, params)
+    cursor.execute(f"DELETE FROM bookings WHERE {expired}", params)
+    return cursor.rowcount
+
+
+def reserve_table(conn, name, email, phone, date, time, guests, table_no,
+                  category, subcategory, user_id=None):
+    """Place a hold on one table and return the new booking id.
+
+    ``user_id`` links the booking to a logged-in customer (None for guests).
+
+    Raises SlotTaken if the table is already booked or held for that slot.
+    Commits on success and rolls back on conflict.
+    """
+    cursor = conn.cursor()
+    try:
+        _purge_expired(cursor, "date=%s AND time=%s AND table_no=%s",
+                       (date, time, table_no), now())
+        cursor.execute("""
+            INSERT INTO bookings
+            (user_id, name, email, phone, date, time, guests, table_no, category,
+             subcategory, status, hold_expires_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, (user_id, name, email, phone, date, time, guests, table_no, category,
+              subcategory, 'pending', hold_expiry()))
+        booking_id = cursor.lastrowid
+        conn.commit()
+        return booking_id
+    except IntegrityError:
+        conn.rollback()
+        raise SlotTaken(f"table {table_no} is already booked for {date} {time}")
+    finally:
+        cursor.close()
+
+
+def confirm_booking(conn, booking_id, total_amount):
+    """Turn a hold into a booking paid ``total_amount``.
+
+    Returns (date, True if it was unpaid until now), or None if the hold
+    expired and the table was released in the meantime.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT date FROM bookings WHERE id=%s", (booking_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute(
+            "UPDATE bookings SET status='paid', hold_expires_at=NULL, total_amount=%s "
+            "WHERE id=%s AND status='pending'",
+            (total_amount, booking_id))
+        newly_paid = cursor.rowcount > 0
+        conn.commit()
+        return row[0], newly_paid
+    finally:
+        cursor.close()
+
+
+def purge_expired_holds(conn):
+    """Release every expired hold. Returns the number of bookings removed."""
+    cursor = conn.cursor()
+    try:
+        removed = _purge_expired(cursor, "1=1", (), now())
+        conn.commit()
+        return removed
+    finally:
+        cursor.close()
+
+
+# --- Parties ---
+# A party holds several tables over consecutive slots. All its bookings share
+# a party_id and are inserted in one transaction: the unique slot key makes
+# the whole party fail if any one table is taken.
+
+def choose_tables(free_tables, seats, guests, max_combinations=20000):
+    """Pick tables from ``free_tables`` to seat ``guests``.
+
+    ``seats`` maps table number to seats. Prefers the fewest tables, then
+    the fewest empty seats, then tables numbered closest together. Returns
+    None when the free tables cannot seat everyone.
+    """
+    free = sorted(free_tables)
+    if sum(seats[t] for t in free) < guests:
+        return None
+    tried = 0
+    for count in range(1, len(free) + 1):
+        best = None
+        for combo in combinations(free, count):
+            capacity = sum(seats[t] for t in combo)
+            if capacity >= guests:
+                score = (capacity - guests, combo[-1] - combo[0])
+                if best is None or score < best[0]:
+                    best = (score, combo)
+            tried += 1
+            if tried >= max_combinations:
+                break
+        if best is not None:
+            return list(best[1])
+        if tried >= max_combinations:
+            # Too many tables to search them all: largest first
+            return _largest_first(free, seats, guests)
+    return None
+
+
+def _largest_first(free, seats, guests):
+    chosen = []
+    for table in sorted(free, key=lambda t: (-seats[t], t)):
+        if sum(seats[t] for t in chosen) >= guests:
+            break
+        chosen.append(table)
+    return sorted(chosen)
+
+
+def seat_guests(tables, seats, guests):
+    """Split ``guests`` over ``tables`` in order; returns {table: guests}."""
+    seated = {}
+    for table in tables:
+        seated[table] = min(seats[table], guests)
+        guests -= seated[table]
+    return seated
+
+
+def reserve_party(conn, name, email, phone, date, slots, seated, category, subcategory,
+                  user_id=None):
+    """Hold every table in ``seated`` ({table: guests}) for each of ``slots``.
+
+    Returns (party_id, booking ids). All or nothing: raises SlotTaken, with
+    nothing reserved, if any table is booked or held in any of the slots.
+    """
+    party_id = uuid.uuid4().hex
+    tables = list(seated)
+    current = now()
+    expires = hold_expiry()
+    cursor = conn.cursor()
+    try:
+        _purge_expired(
+            cursor,
+            f"date=%s AND time IN ({', '.join(['%s'] * len(slots))}) "
+            f"AND table_no IN ({', '.join(['%s'] * len(tables))})",
+            (date, *slots, *tables), current)
+        cursor.executemany("""
+            INSERT INTO bookings
+            (user_id, name, email, phone, date, time, guests, table_no, category,
+             subcategory, status, hold_expires_at, party_id)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [(user_id, name, email, phone, date, slot, seated[table], table, category,
+               subcategory, 'pending', expires, party_id)
+              for slot in slots for table in tables])
+        cursor.execute("SELECT id FROM bookings WHERE party_id=%s ORDER BY id", (party_id,))
+        booking_ids = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+        return party_id, booking_ids
+    except IntegrityError:
+        conn.rollback()
+        raise SlotTaken(f"tables {tables} are not all free for {date} {', '.join(slots)}")
+    finally:
+        cursor.close()
+
+
+def confirm_party(conn, party_id, total_amount):
+    """Turn a party's holds into bookings paid ``total_amount`` each.
+
+    Returns (date, user_id, bookings newly paid), or None if the holds
+    expired and were released.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT date, user_id FROM bookings WHERE party_id=%s LIMIT 1", (party_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        cursor.execute(
+            "UPDATE bookings SET status='paid', hold_expires_at=NULL, total_amount=%s "
+            "WHERE party_id=%s AND status='pending'",
+            (total_amount, party_id))
+        newly_paid = cursor.rowcount
+        conn.commit()
+        return row[0], row[1], newly_paid
+    finally:
+        cursor.close()
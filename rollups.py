@@ -0,0 +1,100 @@
+import threading
+import time
+
+import config
+
+# Admin dashboard totals, kept in memory and nudged by the write paths in
+# app.py. A TTL refresh recomputes everything from the database, which also
+# picks up writes made by other worker processes and corrects any drift.
+# Archived bookings count through the monthly totals kept by archive.py.
+
+TOTALS_SQL = """
+    SELECT
+        (SELECT COUNT(*) FROM users WHERE role='customer') AS total_users,
+        (SELECT COUNT(*) FROM bookings)
+            + (SELECT IFNULL(SUM(bookings),0) FROM archive_totals) AS total_bookings,
+        (SELECT IFNULL(SUM(total_amount),0) FROM bookings)
+            + (SELECT IFNULL(SUM(booking_revenue),0) FROM archive_totals) AS booking_revenue,
+        (SELECT COUNT(*) FROM food_orders)
+            + (SELECT IFNULL(SUM(food_orders),0) FROM archive_totals) AS total_food_orders,
+        (SELECT IFNULL(SUM(paid_total),0) FROM orders)
+            + (SELECT IFNULL(SUM(food_revenue),0) FROM archive_totals) AS food_revenue
+"""
+
+ITEMS_SQL = """
+    SELECT item_name, SUM(quantity) AS total_quantity
+    FROM (SELECT item_name, quantity FROM food_orders
+          UNION ALL
+          SELECT item_name, quantity FROM archive_items) t
+    GROUP BY item_name
+"""
+
+TOTALS = ('total_users', 'total_bookings', 'booking_revenue',
+          'total_food_orders', 'food_revenue')
+
+
+class DashboardRollups:
+    def __init__(self, ttl=None, top_n=3):
+        self.ttl = config.ROLLUP_TTL if ttl is None else ttl
+        self.top_n = top_n
+        self._totals = None
+        self._items = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, conn):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute(TOTALS_SQL)
+            row = cursor.fetchone()
+            cursor.execute(ITEMS_SQL)
+            item_rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        self.load(row, item_rows)
+
+    def load(self, totals_row, item_rows):
+        """Replace the cached totals with freshly queried rows."""
+        totals = {key: float(totals_row[key]) if 'revenue' in key else int(totals_row[key])
+                  for key in TOTALS}
+        items = {r['item_name']: int(r['total_quantity']) for r in item_rows}
+        with self._lock:
+            self._totals = totals
+            self._items = items
+            self._loaded_at = time.monotonic()
+
+    def is_stale(self):
+        with self._lock:
+            return (self._totals is None
+                    or time.monotonic() - self._loaded_at >= self.ttl)
+
+    def snapshot(self, get_conn=None):
+        """Return the current totals, refreshing via ``get_conn()`` if stale.
+
+        Without ``get_conn`` the caller must have refreshed already.
+        """
+        if get_conn is not None and self.is_stale():
+            self.refresh(get_conn())
+        with self._lock:
+            # _totals is only None here if invalidate() raced the refresh
+            data = dict(self._totals or dict.fromkeys(TOTALS, 0))
+            top = sorted(self._items.items(), key=lambda kv: kv[1], reverse=True)
+        data['total_revenue'] = data['booking_revenue'] + data['food_revenue']
+        data['top_foods'] = [{'item_name': name, 'total_quantity': qty}
+                             for name, qty in top[:self.top_n] if qty > 0]
+        return data
+
+    # --- incremental updates from write paths ---
+    def add(self, key, delta=1):
+        with self._lock:
+            if self._totals is not None:
+                self._totals[key] += delta
+
+    def add_item(self, item_name, delta):
+        with self._lock:
+            if self._totals is not None:
+                self._items[item_name] = self._items.get(item_name, 0) + delta
+
+    def invalidate(self):
+        with self._lock:
+            self._totals = None
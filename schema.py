@@ -0,0 +1,103 @@
+import os
+import re
+from datetime import datetime
+
+import config
+
+# Versioned schema migrations. Each backend has its own numbered SQL files in
+# migrations/<backend>/ (0001_base_schema.sql, 0002_...); the schema_migrations
+# table records which versions a database has applied, and migrate() runs the
+# rest in order. Never edit a released migration: add a new one.
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+_FILENAME = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+_CREATE_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(100) NOT NULL,
+        applied_at VARCHAR(19) NOT NULL
+    )
+"""
+
+
+class MigrationError(Exception):
+    pass
+
+
+def available(backend=None):
+    """Return [(version, name, path)] for ``backend``, oldest first."""
+    directory = os.path.join(MIGRATIONS_DIR, backend or config.DB_BACKEND)
+    found = []
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2),
+                          os.path.join(directory, filename)))
+    versions = [v for v, _, _ in found]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f"duplicate migration version in {directory}")
+    return found
+
+
+def statements(sql):
+    """Split a migration file into statements (no ';' inside literals)."""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [s.strip() for s in '\n'.join(lines).split(';') if s.strip()]
+
+
+def applied(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(_CREATE_TABLE)
+        conn.commit()
+        cursor.execute("SELECT version FROM schema_migrations")
+        return {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def pending(conn):
+    done = applied(conn)
+    return [m for m in available() if m[0] not in done]
+
+
+def _record(cursor, version, name):
+    cursor.execute("INSERT INTO schema_migrations (version, name, applied_at) VALUES (%s, %s, %s)",
+                   (version, name, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def migrate(conn, baseline=None, log=print):
+    """Apply pending migrations in order; return the names applied.
+
+    ``baseline`` marks versions up to and including it as applied without
+    running them, for databases whose schema was created by hand.
+    """
+    todo = pending(conn)
+    cursor = conn.cursor()
+    names = []
+    try:
+        for version, name, path in todo:
+            if baseline is not None and version <= baseline:
+                _record(cursor, version, name)
+                conn.commit()
+                log(f"  baseline {version:04d}_{name}")
+                continue
+            with open(path) as f:
+                sql = f.read()
+            try:
+                for statement in statements(sql):
+                    cursor.execute(statement)
+                _record(cursor, version, name)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                # MySQL commits each DDL statement, so a failed migration may
+                # be half applied; fix it by hand, then re-run or --baseline.
+                raise MigrationError(f"{version:04d}_{name} failed: {e}") from e
+            log(f"  applied  {version:04d}_{name}")
+            names.append(name)
+    finally:
+        cursor.close()
+    return names
@@ -0,0 +1,222 @@
+import json
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, Signer
+
+import config
+import db
+
+# Server-side sessions. The cookie carries only a signed random session id;
+# the data (user_id, role and the current booking) lives in a store:
+# MemoryStore for a single process, DBStore (the sessions table) when several
+# workers must see the same sessions. Profile details are not kept in the
+# session at all; see profiles.py.
+
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, new=False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        self.rotate = False
+        # Close enough to expiry that it is re-saved even if unchanged
+        self.stale = False
+
+    def regenerate(self):
+        """Move the data to a fresh id; call on login against session fixation."""
+        self.rotate = True
+        self.modified = True
+
+
+# --- Stores ---
+class MemoryStore:
+    """LRU of session data in this process; for single-process deployments."""
+
+    blocking = False
+
+    def __init__(self, max_entries=None):
+        self.max_entries = config.SESSION_MAX_ENTRIES if max_entries is None else max_entries
+        self._entries = OrderedDict()  # sid -> (data, expires_at)
+        self._lock = threading.Lock()
+
+    def load(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return dict(entry[0]), entry[1]
+
+    def save(self, sid, data, expires_at):
+        with self._lock:
+            self._entries[sid] = (dict(data), expires_at)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._entries.items() if expires_at <= now]
+            for sid in expired:
+                del self._entries[sid]
+        return len(expired)
+
+
+SAVE = {
+    'mysql': """
+        INSERT INTO sessions (id, data, expires_at) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE data = VALUES(data), expires_at = VALUES(expires_at)
+    """,
+    'sqlite': """
+        INSERT INTO sessions (id, data, expires_at) VALUES (%s, %s, %s)
+        ON CONFLICT(id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+    """,
+}
+
+
+@contextmanager
+def _connection():
+    """The request's pooled connection inside Flask, else one from the pool."""
+    if has_app_context():
+        yield db.get_db()
+        return
+    conn = db.get_pool().acquire()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+class DBStore:
+    """Sessions in the sessions table, shared by every worker process."""
+
+    blocking = True
+
+    def _write(self, sql, params):
+        with _connection() as conn:
+            # Anything a view left uncommitted is rolled back when the
+            # connection returns to the pool; don't commit it with the session.
+            conn.rollback()
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                conn.commit()
+                return cursor.rowcount
+            finally:
+                cursor.close()
+
+    def load(self, sid):
+        with _connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT data, expires_at FROM sessions WHERE id=%s AND expires_at > %s",
+                               (sid, int(time.time())))
+                row = cursor.fetchone()
+            finally:
+                cursor.close()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def save(self, sid, data, expires_at):
+        self._write(SAVE[config.DB_BACKEND], (sid, json.dumps(data), expires_at))
+
+    def delete(self, sid):
+        self._write("DELETE FROM sessions WHERE id=%s", (sid,))
+
+    def purge(self):
+        return self._write("DELETE FROM sessions WHERE expires_at <= %s", (int(time.time()),))
+
+
+def make_store(backend=None):
+    backend = backend or config.SESSION_BACKEND
+    if backend == 'memory':
+        return MemoryStore()
+    if backend == 'db':
+        return DBStore()
+    raise ValueError(f"unknown SESSION_BACKEND {backend!r} (expected 'db' or 'memory')")
+
+
+# --- Flask integration ---
+def peek(key, default=None):
+    """Read the request's session without marking it accessed, which would
+    add Vary: Cookie to the response; for logging."""
+    session = g.get('_server_session') if has_app_context() else None
+    return default if session is None else dict.get(session, key, default)
+
+
+class ServerSessionInterface(SessionInterface):
+    """Flask session interface over a store; asgi.py wraps it for Quart."""
+
+    def __init__(self, store, ttl=None):
+        self.store = store
+        self.ttl = config.SESSION_TTL if ttl is None else ttl
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='session-id')
+
+    def open_session(self, app, request):
+        session = self._open(app, request)
+        if session is not None and has_app_context():
+            g._server_session = session
+        return session
+
+    def _open(self, app, request):
+        if not app.secret_key:
+            return None
+        token = request.cookies.get(self.get_cookie_name(app))
+        sid = None
+        if token:
+            try:
+                sid = self._signer(app).unsign(token).decode()
+            except BadSignature:
+                pass  # e.g. an old cookie-format session: start over
+        if sid:
+            found = self.store.load(sid)
+            if found is not None:
+                data, expires_at = found
+                session = ServerSession(data, sid)
+                session.stale = expires_at - time.time() < self.ttl / 2
+                return session
+        return ServerSession(sid=new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        cookie = dict(domain=self.get_cookie_domain(app), path=self.get_cookie_path(app),
+                      secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app),
+                      httponly=self.get_cookie_httponly(app))
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            # Anonymous visitors never get a stored session; logout drops it
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, **cookie)
+            return
+
+        if session.rotate and not session.new:
+            self.store.delete(session.sid)
+            session.sid, session.new = new_sid(), True
+        if session.modified or session.new or session.stale:
+            self.store.save(session.sid, dict(session), int(time.time() + self.ttl))
+        if session.new:
+            response.set_cookie(name, self._signer(app).sign(session.sid).decode(),
+                                expires=self.get_expiration_time(app, session), **cookie)
+            response.vary.add('Cookie')
@@ -0,0 +1,296 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process per spool directory
+    fcntl = None
+
+import config
+import db
+from instrumentation import WRITE_FLUSH_SECONDS, WRITE_LATENCY_SECONDS
+
+# Contact messages and feedback are written behind the request. submit()
+# appends the row to this process's spool (an append-only JSON-lines file)
+# and queues it; a background thread batch-inserts queued rows with
+# executemany and then appends an acknowledgement to the spool. Rows a
+# process never acknowledged (crash, restart, DB outage) are picked up from
+# its spool by the next process to start. Every row carries a submission_id
+# under a unique index, so a replayed row is never inserted twice.
+
+log = logging.getLogger('swiftcafe.writes')
+
+TABLES = {
+    'contact': ('contact_messages', ('name', 'email', 'subject', 'message')),
+    'feedback': ('feedbacks', ('name', 'email', 'message')),
+}
+
+_ON_DUPLICATE = {
+    'mysql': "ON DUPLICATE KEY UPDATE submission_id = submission_id",
+    'sqlite': "ON CONFLICT(submission_id) DO NOTHING",
+}
+
+
+def insert_sql(kind):
+    table, fields = TABLES[kind]
+    columns = ('submission_id',) + fields + ('created_at',)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))}) {_ON_DUPLICATE[config.DB_BACKEND]}")
+
+
+class QueueFull(Exception):
+    pass
+
+
+# --- Spool files ---
+def _unacknowledged(data):
+    """Entries in a spool's contents after its last acknowledgement."""
+    entries, acked = [], 0
+    for line in data.splitlines():
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue  # a line cut short by a crash; it was never queued
+        if 'ack' in record:
+            acked = max(acked, record['ack'])
+        else:
+            entries.append(record)
+    return [e for e in entries if e['seq'] > acked]
+
+
+class _Spool:
+    def __init__(self, directory, fsync):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.fsync = fsync
+        self.path = os.path.join(directory, f"writes-{os.getpid()}-{uuid.uuid4().hex[:8]}.log")
+        self._file = open(self.path, 'ab')
+        if fcntl is not None:
+            # Held until this process exits; marks the spool as in use
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def append(self, record):
+        self._file.write(json.dumps(record).encode() + b'\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def size(self):
+        return self._file.tell()
+
+    def truncate(self):
+        self._file.seek(0)
+        self._file.truncate()
+
+    def orphans(self):
+        """Yield (path, unacknowledged entries) of spools left by dead processes.
+
+        The caller must take over the entries before the next iteration;
+        the file is deleted then.
+        """
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if path == self.path or not (name.startswith('writes-') and name.endswith('.log')):
+                continue
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue  # claimed and removed since the listing
+            with f:
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # its process is still running
+                if not os.path.exists(path):
+                    continue  # another process claimed it first
+                yield path, _unacknowledged(f.read())
+                os.remove(path)
+
+
+# --- Queue ---
+class WriteQueue:
+    def __init__(self, max_depth=None, batch_size=None, flush_interval=None,
+                 spool_dir=None, fsync=None):
+        self.max_depth = config.WRITE_QUEUE_SIZE if max_depth is None else max_depth
+        self.batch_size = config.WRITE_BATCH_SIZE if batch_size is None else batch_size
+        self.flush_interval = config.WRITE_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.spool_dir = config.WRITE_SPOOL_DIR if spool_dir is None else spool_dir
+        self.fsync = config.WRITE_SPOOL_FSYNC if fsync is None else fsync
+        # Guards the spool, sequence numbers and the queue's capacity check
+        self._lock = threading.Lock()
+        # Guards and signals _pending (rows not yet committed)
+        self._done = threading.Condition()
+        self._pending = 0
+        self._seq = 0
+        self._queue = None
+        self._backlog = deque()  # recovered rows, inserted before the queue
+        self._spool = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._stats = {'flushed': 0, 'batches': 0, 'failures': 0,
+                       'recovered': 0, 'rejected': 0, 'last_flush_ms': 0.0}
+
+    def start(self):
+        """Open this process's spool, take over dead processes' rows, start the writer."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First call in this process (possibly a forked server worker)
+            self._queue = queue.Queue(self.max_depth)
+            self._backlog.clear()
+            self._pending = 0
+            self._spool = _Spool(self.spool_dir, self.fsync)
+            for path, entries in self._spool.orphans():
+                for entry in entries:
+                    self._seq += 1
+                    entry['seq'] = self._seq
+                    self._spool.append(entry)
+                    self._backlog.append(entry)
+                if entries:
+                    log.warning("recovered unwritten submissions",
+                                extra={'rows': len(entries), 'spool': path})
+            self._pending = len(self._backlog)
+            self._stats['recovered'] += len(self._backlog)
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, kind, row):
+        """Spool and queue one row for TABLES[kind]; raise QueueFull when backed up."""
+        _, fields = TABLES[kind]
+        self.start()
+        entry = {'kind': kind, 'id': uuid.uuid4().hex,
+                 'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                 'row': {field: row.get(field) for field in fields}}
+        with self._lock:
+            if self._queue.full():
+                self._stats['rejected'] += 1
+                raise QueueFull(f"{self.max_depth} submissions already waiting")
+            self._seq += 1
+            entry['seq'] = self._seq
+            self._spool.append(entry)
+            with self._done:
+                self._pending += 1
+            self._queue.put_nowait((time.monotonic(), entry))
+
+    # --- writer thread ---
+    def _take(self):
+        batch = []
+        while self._backlog and len(batch) < self.batch_size:
+            batch.append((None, self._backlog.popleft()))
+        if batch:
+            return batch
+        try:
+            batch.append(self._queue.get(timeout=0.5))
+        except queue.Empty:
+            return batch
+        # Give a burst a moment to arrive so it goes in as one batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                # Past the deadline, still take whatever is already queued
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0
+                             else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _insert(self, batch):
+        by_kind = {}
+        for _, entry in batch:
+            by_kind.setdefault(entry['kind'], []).append(entry)
+        conn = db.get_pool().acquire()
+        try:
+            cursor = conn.cursor()
+            try:
+                for kind, entries in by_kind.items():
+                    _, fields = TABLES[kind]
+                    cursor.executemany(insert_sql(kind), [
+                        (e['id'],) + tuple(e['row'][f] for f in fields) + (e['at'],)
+                        for e in entries])
+                conn.commit()
+            finally:
+                cursor.close()
+        finally:
+            conn.close()
+
+    def _ack(self, batch):
+        now = time.monotonic()
+        for queued_at, _ in batch:
+            if queued_at is not None:
+                WRITE_LATENCY_SECONDS.observe(now - queued_at)
+        with self._lock:
+            # Batches are written in sequence order, so one ack covers all before it
+            self._spool.append({'ack': max(entry['seq'] for _, entry in batch)})
+            with self._done:
+                self._pending -= len(batch)
+                if self._pending == 0:
+                    self._spool.truncate()  # all committed: start the file afresh
+                self._done.notify_all()
+
+    def _run(self):
+        backoff = 0.5
+        while True:
+            batch = self._take()
+            if not batch:
+                if self._stop.is_set():
+                    return
+                continue
+            while True:
+                start = time.perf_counter()
+                try:
+                    self._insert(batch)
+                    break
+                except Exception:
+                    self._stats['failures'] += 1
+                    log.exception("Writing submissions failed, retrying", extra={'rows': len(batch)})
+                    # The rows stay in the spool if we are stopped meanwhile
+                    if self._stop.wait(backoff):
+                        return
+                    backoff = min(backoff * 2, 30)
+            backoff = 0.5
+            elapsed = time.perf_counter() - start
+            WRITE_FLUSH_SECONDS.observe(elapsed)
+            self._stats['flushed'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['last_flush_ms'] = round(elapsed * 1000, 3)
+            self._ack(batch)
+
+    # --- control ---
+    def flush(self, timeout=None):
+        """Wait until every submitted row is committed; False on timeout."""
+        with self._done:
+            return self._done.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout=5):
+        """Write what is queued (up to ``timeout`` seconds) and stop the writer."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self.flush(timeout)
+        self._stop.set()
+        self._thread.join(timeout)
+
+    def stats(self):
+        with self._done:
+            pending = self._pending
+        data = dict(self._stats)
+        data.update({
+            'depth': pending,
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'capacity': self.max_depth,
+            'spool_bytes': self._spool.size() if self._spool is not None else 0,
+        })
+        return data